@@ -0,0 +1,31 @@
+"""add_table_versions
+
+Revision ID: a3d8f1c6e297
+Revises: f7c2e5a9d314
+Create Date: 2026-10-18 19:12:48.206519
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3d8f1c6e297'
+down_revision: Union[str, None] = 'f7c2e5a9d314'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Contador de escritas por tabela usado nas ETags das listagens
+    op.create_table(
+        'table_versions',
+        sa.Column('name', sa.String(length=64), primary_key=True),
+        sa.Column('version', sa.BigInteger(), nullable=False, server_default='0'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('table_versions')
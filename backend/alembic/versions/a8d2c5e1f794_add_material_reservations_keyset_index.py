@@ -0,0 +1,31 @@
+"""add_material_reservations_keyset_index
+
+Revision ID: a8d2c5e1f794
+Revises: f1c9d4b7a263
+Create Date: 2026-10-18 12:41:09.663218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8d2c5e1f794'
+down_revision: Union[str, None] = 'f1c9d4b7a263'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Paginação por cursor da listagem de reservas: ORDER BY reservation_date, start_time, id
+    op.create_index(
+        'idx_material_reservations_date_time_id',
+        'material_reservations',
+        ['reservation_date', 'start_time', 'id'],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_material_reservations_date_time_id', 'material_reservations')
@@ -0,0 +1,36 @@
+"""add_material_reservations_slot_gist_index
+
+Revision ID: b5e7f2a9c416
+Revises: a8d2c5e1f794
+Create Date: 2026-10-18 13:27:48.105923
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e7f2a9c416'
+down_revision: Union[str, None] = 'a8d2c5e1f794'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # btree_gist permite combinar igualdade de texto e sobreposição de intervalos no mesmo índice GiST
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    # Detecção de conflitos de reserva: lower(material_name) = ? AND tsrange(...) && tsrange(?, ?)
+    op.execute("""
+        CREATE INDEX idx_material_reservations_slot ON material_reservations
+        USING gist (
+            lower(material_name),
+            tsrange(reservation_date + start_time, reservation_date + end_time, '[)')
+        )
+        WHERE status <> 'cancelled' AND end_time > start_time
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_material_reservations_slot', 'material_reservations')
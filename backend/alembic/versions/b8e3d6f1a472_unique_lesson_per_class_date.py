@@ -0,0 +1,103 @@
+"""unique_lesson_per_class_date
+
+Revision ID: b8e3d6f1a472
+Revises: a3d8f1c6e297
+Create Date: 2026-10-18 21:05:14.583920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e3d6f1a472'
+down_revision: Union[str, None] = 'a3d8f1c6e297'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Aulas repetidas da mesma turma/data (mantém a mais antiga de cada grupo)
+DUPLICATE_LESSONS = """
+    SELECT id FROM lessons
+    WHERE class_id IS NOT NULL AND id NOT IN (
+        SELECT MIN(id) FROM lessons WHERE class_id IS NOT NULL GROUP BY class_id, date
+    )
+"""
+
+
+def _keeper(table: str) -> str:
+    return f"""(
+        SELECT MIN(keeper.id) FROM lessons keeper
+        JOIN lessons duplicate ON duplicate.class_id = keeper.class_id AND duplicate.date = keeper.date
+        WHERE duplicate.id = {table}.lesson_id
+    )"""
+
+
+# Recalcula os resumos das turmas informadas (mesmo agregado de app.core.summaries)
+REBUILD_SUMMARIES = """
+    INSERT INTO enrollment_summaries (
+        student_id, class_id, present_count, absent_count, late_count,
+        assessments_count, weighted_grade_sum, weight_sum, last_lesson_date
+    )
+    SELECT student_id, class_id, SUM(present), SUM(absent), SUM(late),
+           SUM(assessments), SUM(weighted), SUM(weight), MAX(lesson_date)
+    FROM (
+        SELECT a.student_id, l.class_id,
+               CASE WHEN a.status = 'present' THEN 1 ELSE 0 END AS present,
+               CASE WHEN a.status = 'absent' THEN 1 ELSE 0 END AS absent,
+               CASE WHEN a.status = 'late' THEN 1 ELSE 0 END AS late,
+               0 AS assessments, 0.0 AS weighted, 0.0 AS weight, l.date AS lesson_date
+        FROM attendances a JOIN lessons l ON l.id = a.lesson_id
+        WHERE l.class_id IN :class_ids
+        UNION ALL
+        SELECT s.student_id, l.class_id, 0, 0, 0, 1,
+               s.grade / COALESCE(NULLIF(s.max_grade, 0), 10.0) * COALESCE(s.weight, 1.0),
+               COALESCE(s.weight, 1.0), NULL
+        FROM assessments s JOIN lessons l ON l.id = s.lesson_id
+        WHERE s.grade IS NOT NULL AND l.class_id IN :class_ids
+    ) AS history
+    WHERE student_id IS NOT NULL AND class_id IS NOT NULL
+    GROUP BY student_id, class_id
+"""
+
+
+def upgrade() -> None:
+    connection = op.get_bind()
+    # Turmas com aulas duplicadas: só os resumos delas mudam com a fusão abaixo
+    class_ids = connection.execute(
+        sa.text(f"SELECT DISTINCT class_id FROM lessons WHERE id IN ({DUPLICATE_LESSONS})")
+    ).scalars().all()
+
+    # Presença repetida do aluno entre aulas duplicadas: mantém o registro mais recente
+    op.execute("""
+        DELETE FROM attendances
+        WHERE lesson_id IN (SELECT id FROM lessons WHERE class_id IS NOT NULL)
+        AND id NOT IN (
+            SELECT MAX(attendances.id) FROM attendances
+            JOIN lessons ON lessons.id = attendances.lesson_id
+            WHERE lessons.class_id IS NOT NULL
+            GROUP BY lessons.class_id, lessons.date, attendances.student_id
+        )
+    """)
+    # Presenças, notas e planos das aulas duplicadas passam para a aula mantida
+    for table in ('attendances', 'assessments', 'lesson_plans'):
+        op.execute(f"UPDATE {table} SET lesson_id = {_keeper(table)} WHERE lesson_id IN ({DUPLICATE_LESSONS})")
+    op.execute(f"DELETE FROM lessons WHERE id IN ({DUPLICATE_LESSONS})")
+
+    # Presenças removidas acima alteram os contadores das turmas afetadas
+    if class_ids:
+        expanding = sa.bindparam('class_ids', value=list(class_ids), expanding=True)
+        connection.execute(
+            sa.text("DELETE FROM enrollment_summaries WHERE class_id IN :class_ids").bindparams(expanding)
+        )
+        connection.execute(sa.text(REBUILD_SUMMARIES).bindparams(expanding))
+
+    # A constraint única substitui o índice composto não-único
+    op.drop_index('idx_lessons_class_date', 'lessons')
+    op.create_unique_constraint('uq_lessons_class_date', 'lessons', ['class_id', 'date'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_lessons_class_date', 'lessons', type_='unique')
+    op.create_index('idx_lessons_class_date', 'lessons', ['class_id', 'date'])
@@ -0,0 +1,33 @@
+"""add_schedules_weekday_room_index
+
+Revision ID: c3f8a1d6e925
+Revises: b5e7f2a9c416
+Create Date: 2026-10-18 14:10:52.387604
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f8a1d6e925'
+down_revision: Union[str, None] = 'b5e7f2a9c416'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Conflitos de horário e salas livres: weekday = ? AND lower(trim(room)) IN (...)
+    op.create_index(
+        'idx_schedules_weekday_room',
+        'schedules',
+        ['weekday', sa.text('lower(trim(room))'), 'start_time'],
+    )
+    op.create_index('idx_schedules_class_id', 'schedules', ['class_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_schedules_class_id', 'schedules')
+    op.drop_index('idx_schedules_weekday_room', 'schedules')
@@ -0,0 +1,27 @@
+"""add_user_token_version
+
+Revision ID: c4a1d2e8f013
+Revises: performance_indexes_001
+Create Date: 2026-10-18 09:12:40.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4a1d2e8f013'
+down_revision: Union[str, None] = 'performance_indexes_001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Versão dos tokens do usuário: incrementar invalida os JWT já emitidos
+    op.add_column('users', sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'token_version')
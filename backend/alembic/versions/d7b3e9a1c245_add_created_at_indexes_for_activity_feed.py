@@ -0,0 +1,35 @@
+"""add_created_at_indexes_for_activity_feed
+
+Revision ID: d7b3e9a1c245
+Revises: c4a1d2e8f013
+Create Date: 2026-10-18 10:04:11.532870
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7b3e9a1c245'
+down_revision: Union[str, None] = 'c4a1d2e8f013'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Feed de atividades recentes: cada ramo do UNION ALL lê created_at DESC com LIMIT
+    op.create_index('idx_students_created_at', 'students', ['created_at', 'id'])
+    op.create_index('idx_classes_created_at', 'classes', ['created_at', 'id'])
+    op.create_index('idx_lessons_created_at', 'lessons', ['created_at', 'id'])
+    op.create_index('idx_assessments_created_at', 'assessments', ['created_at', 'id'])
+    op.create_index('idx_enrollments_created_at', 'enrollments', ['created_at', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_enrollments_created_at', 'enrollments')
+    op.drop_index('idx_assessments_created_at', 'assessments')
+    op.drop_index('idx_lessons_created_at', 'lessons')
+    op.drop_index('idx_classes_created_at', 'classes')
+    op.drop_index('idx_students_created_at', 'students')
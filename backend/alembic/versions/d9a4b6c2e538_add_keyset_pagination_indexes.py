@@ -0,0 +1,30 @@
+"""add_keyset_pagination_indexes
+
+Revision ID: d9a4b6c2e538
+Revises: c3f8a1d6e925
+Create Date: 2026-10-18 14:52:16.740213
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9a4b6c2e538'
+down_revision: Union[str, None] = 'c3f8a1d6e925'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Paginação por cursor: listagem de alunos ativos ordenada por (name, id)
+    op.create_index('idx_students_active_name_id', 'students', ['is_active', 'name', 'id'])
+    # Paginação por cursor: listagem de aulas ordenada por (date, id)
+    op.create_index('idx_lessons_date_id', 'lessons', ['date', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_lessons_date_id', 'lessons')
+    op.drop_index('idx_students_active_name_id', 'students')
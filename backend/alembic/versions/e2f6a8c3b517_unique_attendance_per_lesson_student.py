@@ -0,0 +1,36 @@
+"""unique_attendance_per_lesson_student
+
+Revision ID: e2f6a8c3b517
+Revises: d7b3e9a1c245
+Create Date: 2026-10-18 11:20:37.904112
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2f6a8c3b517'
+down_revision: Union[str, None] = 'd7b3e9a1c245'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Remover presenças duplicadas, mantendo o registro mais recente de cada aluno/aula
+    op.execute("""
+        DELETE FROM attendances
+        WHERE id NOT IN (
+            SELECT MAX(id) FROM attendances GROUP BY lesson_id, student_id
+        )
+    """)
+    # A constraint única substitui o índice composto não-único
+    op.drop_index('idx_attendances_lesson_student', 'attendances')
+    op.create_unique_constraint('uq_attendances_lesson_student', 'attendances', ['lesson_id', 'student_id'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_attendances_lesson_student', 'attendances', type_='unique')
+    op.create_index('idx_attendances_lesson_student', 'attendances', ['lesson_id', 'student_id'])
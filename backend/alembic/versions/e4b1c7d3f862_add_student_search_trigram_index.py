@@ -0,0 +1,48 @@
+"""add_student_search_trigram_index
+
+Revision ID: e4b1c7d3f862
+Revises: d9a4b6c2e538
+Create Date: 2026-10-18 15:36:02.518479
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b1c7d3f862'
+down_revision: Union[str, None] = 'd9a4b6c2e538'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    # unaccent() é STABLE; o wrapper IMMUTABLE permite usá-lo em índices
+    op.execute("""
+        CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+        AS $$ SELECT public.unaccent('public.unaccent', $1) $$
+    """)
+    # Busca de alunos (/students/search): mesma expressão de student_search_document()
+    op.execute("""
+        CREATE INDEX idx_students_search_trgm ON students
+        USING gin (
+            f_unaccent(lower(
+                name || ' ' || cpf
+                || ' ' || coalesce(email, '')
+                || ' ' || coalesce(guardian_name, '')
+            )) gin_trgm_ops
+        )
+    """)
+    # Ordenação por prefixo do nome
+    op.execute("CREATE INDEX idx_students_name_unaccent ON students (f_unaccent(lower(name)) text_pattern_ops)")
+
+
+def downgrade() -> None:
+    op.drop_index('idx_students_name_unaccent', 'students')
+    op.drop_index('idx_students_search_trgm', 'students')
+    op.execute("DROP FUNCTION IF EXISTS f_unaccent(text)")
@@ -0,0 +1,27 @@
+"""add_events_active_date_index
+
+Revision ID: f1c9d4b7a263
+Revises: e2f6a8c3b517
+Create Date: 2026-10-18 12:03:55.271640
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1c9d4b7a263'
+down_revision: Union[str, None] = 'e2f6a8c3b517'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Listagem do calendário: is_active = true AND event_date BETWEEN ... ORDER BY event_date, start_time
+    op.create_index('idx_events_active_date_time', 'events', ['is_active', 'event_date', 'start_time'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_events_active_date_time', 'events')
@@ -0,0 +1,66 @@
+"""add_enrollment_summaries
+
+Revision ID: f7c2e5a9d314
+Revises: e4b1c7d3f862
+Create Date: 2026-10-18 18:05:12.418337
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7c2e5a9d314'
+down_revision: Union[str, None] = 'e4b1c7d3f862'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'enrollment_summaries',
+        sa.Column('student_id', sa.Integer(), sa.ForeignKey('students.id'), primary_key=True),
+        sa.Column('class_id', sa.Integer(), sa.ForeignKey('classes.id'), primary_key=True),
+        sa.Column('present_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('absent_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('late_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('assessments_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('weighted_grade_sum', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('weight_sum', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('last_lesson_date', sa.Date(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+    )
+    op.create_index('idx_enrollment_summaries_class', 'enrollment_summaries', ['class_id'])
+
+    # Backfill com o histórico existente (mesmo agregado de app.core.summaries)
+    op.execute("""
+        INSERT INTO enrollment_summaries (
+            student_id, class_id, present_count, absent_count, late_count,
+            assessments_count, weighted_grade_sum, weight_sum, last_lesson_date
+        )
+        SELECT student_id, class_id, SUM(present), SUM(absent), SUM(late),
+               SUM(assessments), SUM(weighted), SUM(weight), MAX(lesson_date)
+        FROM (
+            SELECT a.student_id, l.class_id,
+                   CASE WHEN a.status = 'present' THEN 1 ELSE 0 END AS present,
+                   CASE WHEN a.status = 'absent' THEN 1 ELSE 0 END AS absent,
+                   CASE WHEN a.status = 'late' THEN 1 ELSE 0 END AS late,
+                   0 AS assessments, 0.0 AS weighted, 0.0 AS weight, l.date AS lesson_date
+            FROM attendances a JOIN lessons l ON l.id = a.lesson_id
+            UNION ALL
+            SELECT s.student_id, l.class_id, 0, 0, 0, 1,
+                   s.grade / COALESCE(NULLIF(s.max_grade, 0), 10.0) * COALESCE(s.weight, 1.0),
+                   COALESCE(s.weight, 1.0), NULL
+            FROM assessments s JOIN lessons l ON l.id = s.lesson_id
+            WHERE s.grade IS NOT NULL
+        ) AS history
+        WHERE student_id IS NOT NULL AND class_id IS NOT NULL
+        GROUP BY student_id, class_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_enrollment_summaries_class', 'enrollment_summaries')
+    op.drop_table('enrollment_summaries')
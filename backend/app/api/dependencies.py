@@ -1,16 +1,110 @@
-from fastapi import Depends, HTTPException, status
+from dataclasses import dataclass
+from typing import Optional
+from fastapi import Depends, HTTPException, Request, Response, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from app.core.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.database import get_db, get_async_db
 from app.core.security import decode_access_token
+from app.core.versions import compute_etag, etag_matches, request_table_versions
+from app.core.write_tracking import on_tables_committed
 from app.models import User, UserRole
 
 security = HTTPBearer()
 
+# Usuário autenticado (com Teacher carregado) por email do token.
+# Guarda cópias desanexadas da sessão; cada requisição recebe uma cópia via merge sem consulta.
+_user_cache = TTLCache(ttl=settings.AUTH_CACHE_TTL_SECONDS)
+
+# Versão atual dos tokens por email (None = usuário inexistente ou inativo)
+_token_version_cache = TTLCache(ttl=settings.AUTH_CACHE_TTL_SECONDS)
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Identidade do usuário construída apenas a partir das claims do JWT"""
+    id: int
+    email: str
+    role: UserRole
+    teacher_id: Optional[int] = None
+
+
+def invalidate_cached_user(email: str) -> None:
+    """Remove o usuário do cache (desativação, exclusão ou alteração do Teacher)"""
+    _user_cache.delete(email)
+    _token_version_cache.delete(email)
+
+
+@on_tables_committed
+def _forget_users_with_new_access(session, tables):
+    # Role/status alterados (token_version já incrementado pelo evento do modelo User)
+    for email in session.info.pop("access_changed_emails", ()):
+        invalidate_cached_user(email)
+
+
+async def update_user_access(
+    db: AsyncSession,
+    user: User,
+    role: Optional[UserRole] = None,
+    is_active: Optional[bool] = None,
+) -> bool:
+    """
+    Altera a role e/ou o status do usuário e confirma. Qualquer alteração desses campos
+    (aqui ou direto no modelo) invalida os tokens já emitidos. Retorna False se nada mudou.
+    """
+    changed = False
+    if role is not None and role != user.role:
+        user.role = role
+        changed = True
+    if is_active is not None and is_active != user.is_active:
+        user.is_active = is_active
+        changed = True
+    if changed:
+        await db.commit()
+    return changed
+
+
+async def _current_token_version(db: AsyncSession, email: str) -> Optional[int]:
+    cached = _user_cache.get(email)
+    if cached is not None:
+        return cached.token_version or 0
+
+    missing = object()
+    version = _token_version_cache.get(email, missing)
+    if version is missing:
+        row = (await db.execute(
+            select(User.token_version, User.is_active).where(User.email == email)
+        )).first()
+        version = (row.token_version or 0) if row and row.is_active else None
+        _token_version_cache.set(email, version)
+    return version
+
+
+async def _load_user(db: AsyncSession, email: str):
+    cached = _user_cache.get(email)
+    if cached is not None:
+        return await db.merge(cached, load=False)
+
+    user = await db.scalar(
+        select(User).options(joinedload(User.teacher)).where(User.email == email)
+    )
+    if user is None or not user.is_active:
+        return user
+
+    # Desanexa da sessão atual para que o commit/rollback da requisição não altere o cache
+    if user.teacher is not None:
+        db.expunge(user.teacher)
+    db.expunge(user)
+    _user_cache.set(email, user)
+    return await db.merge(user, load=False)
+
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ) -> User:
     token = credentials.credentials
     payload = decode_access_token(token)
@@ -28,7 +122,7 @@ async def get_current_user(
             detail="Token inválido",
         )
 
-    user = db.query(User).filter(User.email == email).first()
+    user = await _load_user(db, email)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -41,16 +135,74 @@ async def get_current_user(
             detail="Usuário inativo",
         )
 
+    if "tv" in payload and payload["tv"] != (user.token_version or 0):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token desatualizado, faça login novamente",
+        )
+
     return user
 
 
+async def get_current_principal(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db),
+) -> Principal:
+    """
+    Identidade leve a partir das claims do token (uid, role, tid).
+    Não consulta User/Teacher; apenas a versão do token, em cache por TTL.
+    """
+    payload = decode_access_token(credentials.credentials)
+
+    if payload is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token inválido ou expirado",
+        )
+
+    # Tokens emitidos antes das claims de role/professor precisam ser renovados
+    if payload.get("sub") is None or payload.get("uid") is None or payload.get("role") is None or "tv" not in payload:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token desatualizado, faça login novamente",
+        )
+
+    current_version = await _current_token_version(db, payload["sub"])
+    if current_version is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Usuário não encontrado ou inativo",
+        )
+    if payload["tv"] != current_version:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token desatualizado, faça login novamente",
+        )
+
+    try:
+        role = UserRole(payload["role"])
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token inválido",
+        )
+
+    return Principal(
+        id=payload["uid"],
+        email=payload["sub"],
+        role=role,
+        teacher_id=payload.get("tid"),
+    )
+
+
 def require_role(*allowed_roles: UserRole):
     """
     Dependency para verificar se o usuário tem uma das roles permitidas.
     Aceita uma ou múltiplas roles como argumentos.
+    Retorna o Principal do token (id, email, role, teacher_id), sem consultar o banco.
     Uso: Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY))
     """
-    async def role_checker(current_user: User = Depends(get_current_user)) -> User:
+    async def role_checker(current_user: Principal = Depends(get_current_principal)) -> Principal:
         if current_user.role not in allowed_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -64,3 +216,33 @@ def require_role(*allowed_roles: UserRole):
 def require_roles(*allowed_roles: UserRole):
     """Alias para require_role (compatibilidade)"""
     return require_role(*allowed_roles)
+
+
+def conditional_etag(*tables: str):
+    """
+    Dependency de GET condicional: ETag a partir da URL, do escopo do usuário (role/professor)
+    e das versões das tabelas lidas pela rota. Com If-None-Match igual, responde 304
+    antes de a rota carregar ou serializar qualquer objeto.
+    Uso: @router.get("/", dependencies=[Depends(conditional_etag("classes", "schedules"))])
+    """
+    async def check_etag(
+        request: Request,
+        response: Response,
+        db: AsyncSession = Depends(get_async_db),
+        current_user: Principal = Depends(get_current_principal),
+    ) -> None:
+        versions = await request_table_versions(request, db, tables)
+        etag = compute_etag(
+            request.url.path,
+            sorted(request.query_params.multi_items()),
+            current_user.role.value,
+            current_user.teacher_id,
+            versions,
+        )
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and etag_matches(if_none_match, etag):
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+
+    return check_etag
@@ -1,109 +1,137 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, union_all, select, literal
-from typing import List
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy import desc, union_all, select, literal, cast, null, or_, and_, String, Text, Float
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 from datetime import datetime
 
-from app.api.dependencies import get_db, get_current_user
-from app.models import User, Student, Class, Enrollment, Lesson, Assessment
+from app.api.dependencies import get_async_db, get_current_principal, Principal
+from app.core.pagination import encode_cursor, decode_cursor, set_next_cursor
+from app.core.query_metrics import query_budget
+from app.models import Student, Class, Enrollment, Lesson, Assessment
 
 router = APIRouter()
 
+ACTIVITY_TITLES = {
+    "student": ("Novo aluno matriculado", "UserPlus"),
+    "class": ("Turma criada", "Users"),
+    "lesson": ("Aula registrada", "BookOpen"),
+    "assessment": ("Avaliação lançada", "FileText"),
+    "enrollment": ("Matrícula realizada", "UserPlus"),
+}
 
-@router.get("/recent")
-def get_recent_activities(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    limit: int = 10
+
+def _feed_branch(kind: str, created_at, id_column, name, detail, grade, limit: int, cursor: Optional[list], *joins):
+    """
+    Um ramo do UNION ALL: colunas (kind, id, time, name, detail, grade) já ordenadas e limitadas,
+    para que cada tabela leia apenas as linhas mais recentes antes do cursor
+    """
+    query = select(
+        literal(kind, String).label("kind"),
+        id_column.label("id"),
+        created_at.label("time"),
+        cast(name, String).label("name") if name is not None else cast(null(), String).label("name"),
+        cast(detail, Text).label("detail") if detail is not None else cast(null(), Text).label("detail"),
+        cast(grade, Float).label("grade") if grade is not None else cast(null(), Float).label("grade"),
+    ).where(created_at.isnot(None))
+    for target, onclause in joins:
+        query = query.outerjoin(target, onclause)
+
+    if cursor:
+        cursor_time, cursor_kind, cursor_id = cursor
+        # Equivalente a (time, kind, id) < cursor em ordem decrescente; kind é constante no ramo
+        if kind > cursor_kind:
+            query = query.where(created_at < cursor_time)
+        elif kind == cursor_kind:
+            query = query.where(or_(
+                created_at < cursor_time,
+                and_(created_at == cursor_time, id_column < cursor_id),
+            ))
+        else:
+            query = query.where(created_at <= cursor_time)
+
+    return select(query.order_by(desc(created_at), desc(id_column)).limit(limit).subquery())
+
+
+def _describe(row) -> str:
+    if row.kind == "student":
+        return f"{row.name}"
+    if row.kind == "class":
+        return f"{row.name} - {row.detail}"
+    if row.kind == "lesson":
+        return f"{row.name or 'Turma'} - {row.detail[:50] if row.detail else 'Conteúdo'}"
+    if row.kind == "assessment":
+        return f"{row.detail} - {row.name or 'Aluno'} - Nota: {row.grade}"
+    return f"{row.name or 'Aluno'} - {row.detail or 'Turma'}"
+
+
+def _relative_time(moment: datetime) -> str:
+    now = datetime.now(moment.tzinfo)
+    time_diff = now - moment
+    if time_diff.days == 0:
+        if time_diff.seconds < 3600:
+            minutes = time_diff.seconds // 60
+            return f"Há {minutes} minuto{'s' if minutes != 1 else ''}"
+        hours = time_diff.seconds // 3600
+        return f"Há {hours} hora{'s' if hours != 1 else ''}"
+    if time_diff.days == 1:
+        return "Ontem"
+    if time_diff.days < 7:
+        return f"Há {time_diff.days} dia{'s' if time_diff.days != 1 else ''}"
+    return moment.strftime("%d/%m/%Y")
+
+
+@router.get("/recent", dependencies=[Depends(query_budget(2))])
+async def get_recent_activities(
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal),
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor da página anterior"),
 ):
     """
-    Retorna as atividades recentes do sistema
+    Retorna as atividades recentes do sistema em uma única consulta (UNION ALL).
+    Para carregar mais, envie o header X-Next-Cursor da resposta anterior em `cursor`.
     """
+    after = decode_cursor(cursor, 3) if cursor else None
+    fetch = limit + 1
+
+    feed = union_all(
+        _feed_branch("student", Student.created_at, Student.id, Student.name, None, None, fetch, after),
+        _feed_branch("class", Class.created_at, Class.id, Class.name, Class.level, None, fetch, after),
+        _feed_branch(
+            "lesson", Lesson.created_at, Lesson.id, Class.name, Lesson.content, None, fetch, after,
+            (Class, Class.id == Lesson.class_id),
+        ),
+        _feed_branch(
+            "assessment", Assessment.created_at, Assessment.id, Student.name, Assessment.type, Assessment.grade, fetch, after,
+            (Student, Student.id == Assessment.student_id),
+        ),
+        _feed_branch(
+            "enrollment", Enrollment.created_at, Enrollment.id, Student.name, Class.name, None, fetch, after,
+            (Student, Student.id == Enrollment.student_id),
+            (Class, Class.id == Enrollment.class_id),
+        ),
+    ).subquery()
+
+    result = await db.execute(
+        select(feed).order_by(desc(feed.c.time), desc(feed.c.kind), desc(feed.c.id)).limit(fetch)
+    )
+    rows = result.all()
+
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        set_next_cursor(response, encode_cursor([last.time, last.kind, last.id]))
+
     activities = []
-    
-    # Buscar últimos alunos criados
-    recent_students = db.query(Student).order_by(desc(Student.created_at)).limit(5).all()
-    for student in recent_students:
-        activities.append({
-            "id": f"student-{student.id}",
-            "type": "student",
-            "title": "Novo aluno matriculado",
-            "description": f"{student.name}",
-            "time": student.created_at,
-            "icon": "UserPlus"
-        })
-    
-    # Buscar últimas turmas criadas
-    recent_classes = db.query(Class).order_by(desc(Class.created_at)).limit(5).all()
-    for cls in recent_classes:
-        activities.append({
-            "id": f"class-{cls.id}",
-            "type": "class",
-            "title": "Turma criada",
-            "description": f"{cls.name} - {cls.level}",
-            "time": cls.created_at,
-            "icon": "Users"
-        })
-    
-    # Buscar últimas aulas registradas
-    recent_lessons = db.query(Lesson).order_by(desc(Lesson.created_at)).limit(5).all()
-    for lesson in recent_lessons:
-        class_info = db.query(Class).filter(Class.id == lesson.class_id).first()
+    for row in rows[:limit]:
+        title, icon = ACTIVITY_TITLES[row.kind]
         activities.append({
-            "id": f"lesson-{lesson.id}",
-            "type": "lesson",
-            "title": "Aula registrada",
-            "description": f"{class_info.name if class_info else 'Turma'} - {lesson.content[:50] if lesson.content else 'Conteúdo'}",
-            "time": lesson.created_at,
-            "icon": "BookOpen"
+            "id": f"{row.kind}-{row.id}",
+            "type": row.kind,
+            "title": title,
+            "description": _describe(row),
+            "time": _relative_time(row.time),
+            "icon": icon,
         })
-    
-    # Buscar últimas avaliações lançadas
-    recent_assessments = db.query(Assessment).order_by(desc(Assessment.created_at)).limit(5).all()
-    for assessment in recent_assessments:
-        student = db.query(Student).filter(Student.id == assessment.student_id).first()
-        activities.append({
-            "id": f"assessment-{assessment.id}",
-            "type": "assessment",
-            "title": "Avaliação lançada",
-            "description": f"{assessment.type} - {student.name if student else 'Aluno'} - Nota: {assessment.grade}",
-            "time": assessment.created_at,
-            "icon": "FileText"
-        })
-    
-    # Buscar últimas matrículas
-    recent_enrollments = db.query(Enrollment).order_by(desc(Enrollment.created_at)).limit(5).all()
-    for enrollment in recent_enrollments:
-        student = db.query(Student).filter(Student.id == enrollment.student_id).first()
-        class_info = db.query(Class).filter(Class.id == enrollment.class_id).first()
-        activities.append({
-            "id": f"enrollment-{enrollment.id}",
-            "type": "enrollment",
-            "title": "Matrícula realizada",
-            "description": f"{student.name if student else 'Aluno'} - {class_info.name if class_info else 'Turma'}",
-            "time": enrollment.created_at,
-            "icon": "UserPlus"
-        })
-    
-    # Ordenar todas as atividades por data (mais recente primeiro)
-    activities.sort(key=lambda x: x['time'], reverse=True)
-    
-    # Formatar tempo relativo
-    now = datetime.now()
-    for activity in activities[:limit]:
-        time_diff = now - activity['time']
-        if time_diff.days == 0:
-            if time_diff.seconds < 3600:
-                minutes = time_diff.seconds // 60
-                activity['time'] = f"Há {minutes} minuto{'s' if minutes != 1 else ''}"
-            else:
-                hours = time_diff.seconds // 3600
-                activity['time'] = f"Há {hours} hora{'s' if hours != 1 else ''}"
-        elif time_diff.days == 1:
-            activity['time'] = "Ontem"
-        elif time_diff.days < 7:
-            activity['time'] = f"Há {time_diff.days} dia{'s' if time_diff.days != 1 else ''}"
-        else:
-            activity['time'] = activity['time'].strftime("%d/%m/%Y")
-    
-    return activities[:limit]
+
+    return activities
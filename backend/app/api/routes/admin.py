@@ -1,33 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List
-from datetime import date
-from app.core.database import get_db
-from app.api.dependencies import require_role
-from app.models import User, UserRole, Class, Teacher, Student, Lesson
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_async_db
+from app.core.query_metrics import query_budget
+from app.core.stats import get_dashboard_stats
+from app.api.dependencies import require_role, Principal
+from app.models import UserRole
 from app.schemas import DashboardStats
 
 router = APIRouter()
 
 
-@router.get("/stats", response_model=DashboardStats)
-async def get_dashboard_stats(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY, UserRole.COORDINATOR)),
+@router.get("/stats", response_model=DashboardStats, dependencies=[Depends(query_budget(2))])
+async def read_dashboard_stats(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY, UserRole.COORDINATOR)),
 ):
     """
-    Obter estatísticas do dashboard administrativo
+    Obter estatísticas do dashboard administrativo (cache de DASHBOARD_STATS_TTL_SECONDS)
     """
-    total_classes = db.query(func.count(Class.id)).filter(Class.is_active == True).scalar()
-    total_teachers = db.query(func.count(Teacher.id)).scalar()
-    total_students = db.query(func.count(Student.id)).filter(Student.is_active == True).scalar()
-    total_lessons_today = db.query(func.count(Lesson.id)).filter(Lesson.date == date.today()).scalar()
-
-    return {
-        "total_classes": total_classes or 0,
-        "total_teachers": total_teachers or 0,
-        "total_students": total_students or 0,
-        "total_lessons_today": total_lessons_today or 0,
-    }
+    return await get_dashboard_stats(db)
 
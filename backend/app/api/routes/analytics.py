@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.analytics import DEFAULT_RISK_THRESHOLD, DEFAULT_ROLLING_WINDOW, class_attendance_analytics
+from app.core.database import get_async_db
+from app.core.query_metrics import query_budget
+from app.api.dependencies import require_role, Principal
+from app.models import UserRole, Class
+from app.schemas import AttendanceAnalytics
+
+router = APIRouter()
+
+
+@router.get("/attendance", response_model=AttendanceAnalytics, dependencies=[Depends(query_budget(4))])
+async def get_attendance_analytics(
+    class_id: int = Query(...),
+    window: int = Query(DEFAULT_ROLLING_WINDOW, ge=1, le=100, description="Aulas na taxa móvel"),
+    threshold: float = Query(DEFAULT_RISK_THRESHOLD, gt=0, le=1, description="Taxa de faltas que indica risco"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY, UserRole.COORDINATOR, UserRole.TEACHER)),
+):
+    """
+    Frequência da turma: taxa de faltas acumulada e móvel por aluno, alunos em risco
+    e mapa de faltas por dia da semana (resultado em cache por turma)
+    """
+    class_obj = await db.scalar(select(Class).where(Class.id == class_id))
+    if not class_obj:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Turma não encontrada",
+        )
+
+    if current_user.role == UserRole.TEACHER:
+        if not current_user.teacher_id or class_obj.teacher_id != current_user.teacher_id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Você não tem permissão para acessar esta turma",
+            )
+
+    return await class_attendance_analytics(db, class_id, window, threshold)
@@ -1,8 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from app.core.database import get_db
-from app.api.dependencies import require_role, get_current_user
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from typing import List, Optional
+from app.core.database import get_async_db
+from app.core.pagination import fetch_page
+from app.core.summaries import refresh_enrollment_summaries
+from app.api.dependencies import require_role, get_current_principal, Principal
 from app.models import User, UserRole, Assessment, Lesson, Teacher, Class
 from app.schemas import AssessmentCreate, AssessmentResponse, AssessmentUpdate
 
@@ -11,54 +15,63 @@ router = APIRouter()
 
 @router.get("/", response_model=List[AssessmentResponse])
 async def list_assessments(
+    response: Response,
     class_id: int = None,
     lesson_id: int = None,
     student_id: int = None,
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY, UserRole.COORDINATOR, UserRole.TEACHER)),
+    skip: int = Query(0, ge=0, deprecated=True),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor da página anterior"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY, UserRole.COORDINATOR, UserRole.TEACHER)),
 ):
     """
-    Listar avaliações com filtros opcionais
+    Listar avaliações com filtros opcionais (paginação por cursor via X-Next-Cursor)
     """
-    query = db.query(Assessment)
+    query = select(Assessment)
     
     # Always join with Lesson to enable filters
     query = query.join(Lesson)
     
     # Filtrar por turma (class_id)
     if class_id:
-        query = query.filter(Lesson.class_id == class_id)
+        query = query.where(Lesson.class_id == class_id)
     
     # Filtrar por aula específica
     if lesson_id:
-        query = query.filter(Assessment.lesson_id == lesson_id)
+        query = query.where(Assessment.lesson_id == lesson_id)
     
     # Filtrar por aluno
     if student_id:
-        query = query.filter(Assessment.student_id == student_id)
+        query = query.where(Assessment.student_id == student_id)
     
     # Teacher pode ver apenas suas turmas
     if current_user.role == UserRole.TEACHER:
-        teacher = db.query(Teacher).filter(Teacher.user_id == current_user.id).first()
-        if teacher:
-            query = query.join(Class).filter(Class.teacher_id == teacher.id)
-    
-    assessments = query.offset(skip).limit(limit).all()
-    return assessments
+        if current_user.teacher_id:
+            query = query.join(Class).where(Class.teacher_id == current_user.teacher_id)
+    
+    return await fetch_page(
+        db, query,
+        order_by=(Assessment.id,),
+        limit=limit,
+        cursor=cursor,
+        response=response,
+        skip=skip,
+    )
 
 
 @router.post("/", response_model=AssessmentResponse, status_code=status.HTTP_201_CREATED)
 async def create_assessment(
     assessment_data: AssessmentCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(UserRole.TEACHER, UserRole.DIRECTOR, UserRole.SECRETARY)),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_role(UserRole.TEACHER, UserRole.DIRECTOR, UserRole.SECRETARY)),
 ):
     """
     Criar nova avaliação (lançar nota)
     """
-    lesson = db.query(Lesson).filter(Lesson.id == assessment_data.lesson_id).first()
+    lesson = await db.scalar(
+        select(Lesson).options(joinedload(Lesson.class_)).where(Lesson.id == assessment_data.lesson_id)
+    )
     if not lesson:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -67,8 +80,7 @@ async def create_assessment(
     
     # Check teacher permission (apenas para professores)
     if current_user.role == UserRole.TEACHER:
-        teacher = db.query(Teacher).filter(Teacher.user_id == current_user.id).first()
-        if not teacher or lesson.class_.teacher_id != teacher.id:
+        if not current_user.teacher_id or lesson.class_.teacher_id != current_user.teacher_id:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Você não tem permissão para lançar notas nesta aula",
@@ -76,8 +88,9 @@ async def create_assessment(
     
     new_assessment = Assessment(**assessment_data.dict())
     db.add(new_assessment)
-    db.commit()
-    db.refresh(new_assessment)
+    await refresh_enrollment_summaries(db, [(new_assessment.student_id, lesson.class_id)])
+    await db.commit()
+    await db.refresh(new_assessment)
     
     return new_assessment
 
@@ -86,13 +99,17 @@ async def create_assessment(
 async def update_assessment(
     assessment_id: int,
     assessment_data: AssessmentUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(UserRole.TEACHER, UserRole.DIRECTOR, UserRole.SECRETARY)),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_role(UserRole.TEACHER, UserRole.DIRECTOR, UserRole.SECRETARY)),
 ):
     """
     Atualizar uma avaliação
     """
-    assessment = db.query(Assessment).filter(Assessment.id == assessment_id).first()
+    assessment = await db.scalar(
+        select(Assessment).options(
+            joinedload(Assessment.lesson).joinedload(Lesson.class_)
+        ).where(Assessment.id == assessment_id)
+    )
     if not assessment:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -101,8 +118,7 @@ async def update_assessment(
     
     # Check teacher permission (apenas para professores)
     if current_user.role == UserRole.TEACHER:
-        teacher = db.query(Teacher).filter(Teacher.user_id == current_user.id).first()
-        if not teacher or assessment.lesson.class_.teacher_id != teacher.id:
+        if not current_user.teacher_id or assessment.lesson.class_.teacher_id != current_user.teacher_id:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Você não tem permissão para editar esta avaliação",
@@ -112,23 +128,24 @@ async def update_assessment(
     for field, value in update_data.items():
         setattr(assessment, field, value)
     
-    db.commit()
-    db.refresh(assessment)
+    await refresh_enrollment_summaries(db, [(assessment.student_id, assessment.lesson.class_id)])
+    await db.commit()
+    await db.refresh(assessment)
     return assessment
 
 
 @router.delete("/{assessment_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_assessment(
     assessment_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal),
 ):
     """
     Deletar uma avaliação
     - DIRECTOR e SECRETARY: podem deletar qualquer avaliação
     - TEACHER: pode deletar avaliações de suas próprias turmas
     """
-    assessment = db.query(Assessment).filter(Assessment.id == assessment_id).first()
+    assessment = await db.scalar(select(Assessment).where(Assessment.id == assessment_id))
     if not assessment:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -136,7 +153,7 @@ async def delete_assessment(
         )
     
     # Buscar a lição para verificar a turma
-    lesson = db.query(Lesson).filter(Lesson.id == assessment.lesson_id).first()
+    lesson = await db.scalar(select(Lesson).where(Lesson.id == assessment.lesson_id))
     if not lesson:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -144,7 +161,7 @@ async def delete_assessment(
         )
     
     # Buscar a turma
-    class_ = db.query(Class).filter(Class.id == lesson.class_id).first()
+    class_ = await db.scalar(select(Class).where(Class.id == lesson.class_id))
     if not class_:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -154,15 +171,14 @@ async def delete_assessment(
     # Verificar permissões
     if current_user.role == UserRole.TEACHER:
         # Buscar o registro de Teacher associado ao user
-        teacher = db.query(Teacher).filter(Teacher.user_id == current_user.id).first()
-        if not teacher:
+        if not current_user.teacher_id:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Registro de professor não encontrado",
             )
         
         # Verificar se o professor é o dono da turma
-        if class_.teacher_id != teacher.id:
+        if class_.teacher_id != current_user.teacher_id:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Você não tem permissão para excluir esta avaliação",
@@ -173,8 +189,9 @@ async def delete_assessment(
             detail="Você não tem permissão para excluir avaliações",
         )
     
-    db.delete(assessment)
-    db.commit()
+    await db.delete(assessment)
+    await refresh_enrollment_summaries(db, [(assessment.student_id, class_.id)])
+    await db.commit()
     
     return None
 
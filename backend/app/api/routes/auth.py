@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 from datetime import timedelta
-from app.core.database import get_db
-from app.core.security import verify_password, create_access_token, get_password_hash
+from app.core.database import get_async_db
+from app.core.security import verify_password_async, create_access_token, get_password_hash_async, get_user_token_claims
 from app.core.config import settings
 from app.schemas import LoginRequest, Token, UserResponse
 from app.models import User
@@ -12,13 +14,15 @@ router = APIRouter()
 
 
 @router.post("/login", response_model=Token)
-async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
+async def login(login_data: LoginRequest, db: AsyncSession = Depends(get_async_db)):
     """
     Autenticar usuário e retornar token JWT
     """
-    user = db.query(User).filter(User.email == login_data.email).first()
+    user = await db.scalar(
+        select(User).options(joinedload(User.teacher)).where(User.email == login_data.email)
+    )
 
-    if not user or not verify_password(login_data.password, user.hashed_password):
+    if not user or not await verify_password_async(login_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Email ou senha incorretos",
@@ -32,7 +36,7 @@ async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
 
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data=get_user_token_claims(user), expires_delta=access_token_expires
     )
 
     return {
@@ -57,13 +61,13 @@ async def register(
     name: str,
     email: str,
     password: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Registrar novo usuário admin (apenas para setup inicial)
     """
     # Verificar se já existe usuário com este email
-    existing_user = db.query(User).filter(User.email == email).first()
+    existing_user = await db.scalar(select(User).where(User.email == email))
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -71,7 +75,7 @@ async def register(
         )
 
     # Criar novo usuário
-    hashed_password = get_password_hash(password)
+    hashed_password = await get_password_hash_async(password)
     new_user = User(
         name=name,
         email=email,
@@ -81,7 +85,7 @@ async def register(
     )
 
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
 
     return UserResponse.from_orm(new_user)
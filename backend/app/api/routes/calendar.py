@@ -1,9 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from datetime import date
-
-from app.api.dependencies import get_db, get_current_user
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from typing import List, Optional, Tuple
+from datetime import date, time, timedelta
+
+from app.api.dependencies import get_async_db, get_current_user
+from app.core.availability import CANCELLED_STATUS, find_conflicts, lock_material
+from app.core.pagination import fetch_page
+from app.core.query_metrics import query_budget
+from app.core.streaming import stream_json_array
 from app.models import User, Event, MaterialReservation, Class
 from app.schemas.calendar import (
     EventCreate,
@@ -12,83 +18,121 @@ from app.schemas.calendar import (
     MaterialReservationCreate,
     MaterialReservationUpdate,
     MaterialReservationResponse,
+    MaterialAvailabilityResponse,
 )
 
 router = APIRouter()
 
+# Relacionamentos usados na resposta (evita lazy load na sessão assíncrona)
+EVENT_OPTIONS = (joinedload(Event.creator), joinedload(Event.class_))
+RESERVATION_OPTIONS = (joinedload(MaterialReservation.reserver), joinedload(MaterialReservation.class_))
+
 
 # ==================== EVENTS ====================
 
-@router.get("/events", response_model=List[EventResponse])
-def list_events(
+MAX_EVENT_WINDOW_DAYS = 366
+
+
+def resolve_date_window(start_date: Optional[date], end_date: Optional[date]) -> Tuple[date, date]:
+    """
+    Completa o intervalo de datas da listagem: sem datas, o ano corrente;
+    com apenas uma das pontas, MAX_EVENT_WINDOW_DAYS a partir dela
+    """
+    if start_date is None and end_date is None:
+        today = date.today()
+        return date(today.year, 1, 1), date(today.year, 12, 31)
+    if start_date is None:
+        start_date = end_date - timedelta(days=MAX_EVENT_WINDOW_DAYS)
+    if end_date is None:
+        end_date = start_date + timedelta(days=MAX_EVENT_WINDOW_DAYS)
+
+    if end_date < start_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A data final deve ser posterior à data inicial",
+        )
+    if (end_date - start_date).days > MAX_EVENT_WINDOW_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"O intervalo de datas deve ter no máximo {MAX_EVENT_WINDOW_DAYS} dias",
+        )
+    return start_date, end_date
+
+
+@router.get("/events", response_model=List[EventResponse], dependencies=[Depends(query_budget(2))])
+async def list_events(
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
     event_type: Optional[str] = Query(None),
     class_id: Optional[int] = Query(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """
     Listar eventos
     - Professores: eventos gerais + eventos da suas turmas
     - Secretários/Pedagogos/Diretores: todos os eventos
+    - Sem datas, retorna o ano corrente; o intervalo máximo é de MAX_EVENT_WINDOW_DAYS dias
     """
-    query = db.query(Event).filter(Event.is_active == True)
-
-    # Filtros de data
-    if start_date:
-        query = query.filter(Event.event_date >= start_date)
-    if end_date:
-        query = query.filter(Event.event_date <= end_date)
+    start_date, end_date = resolve_date_window(start_date, end_date)
+
+    # Nomes do criador e da turma na mesma consulta (índice is_active, event_date, start_time)
+    query = (
+        select(Event, User.name.label("creator_name"), Class.name.label("class_name"))
+        .outerjoin(User, User.id == Event.created_by)
+        .outerjoin(Class, Class.id == Event.class_id)
+        .where(
+            Event.is_active == True,
+            Event.event_date >= start_date,
+            Event.event_date <= end_date,
+        )
+    )
 
     # Filtro de tipo
     if event_type:
-        query = query.filter(Event.event_type == event_type)
+        query = query.where(Event.event_type == event_type)
 
     # Filtro de turma
     if class_id:
-        query = query.filter(Event.class_id == class_id)
+        query = query.where(Event.class_id == class_id)
 
     # Filtro por papel do usuário
     if current_user.role == "TEACHER":
         # Professores veem eventos gerais + eventos das suas turmas
-        teacher_classes = db.query(Class.id).filter(Class.teacher_id == current_user.teacher.id).all()
-        class_ids = [c[0] for c in teacher_classes]
-        query = query.filter(
-            (Event.class_id == None) | (Event.class_id.in_(class_ids))
+        teacher_classes = select(Class.id).where(Class.teacher_id == current_user.teacher.id)
+        query = query.where(
+            (Event.class_id == None) | (Event.class_id.in_(teacher_classes))
         )
 
-    events = query.order_by(Event.event_date, Event.start_time).all()
-
-    # Enriquecer com informações do criador e turma
-    result = []
-    for event in events:
-        event_dict = {
-            "id": event.id,
-            "title": event.title,
-            "description": event.description,
-            "event_date": event.event_date,
-            "start_time": event.start_time,
-            "end_time": event.end_time,
-            "location": event.location,
-            "class_id": event.class_id,
-            "event_type": event.event_type,
-            "created_by": event.created_by,
-            "is_active": event.is_active,
-            "created_at": event.created_at,
-            "updated_at": event.updated_at,
-            "creator_name": event.creator.name if event.creator else None,
-            "class_name": event.class_.name if event.class_ else None,
-        }
-        result.append(event_dict)
-
-    return result
+    result = await db.execute(query.order_by(Event.event_date, Event.start_time, Event.id))
+    rows = result.all()
+
+    return stream_json_array(
+        EventResponse(
+            id=event.id,
+            title=event.title,
+            description=event.description,
+            event_date=event.event_date,
+            start_time=event.start_time,
+            end_time=event.end_time,
+            location=event.location,
+            class_id=event.class_id,
+            event_type=event.event_type,
+            created_by=event.created_by,
+            is_active=event.is_active,
+            created_at=event.created_at,
+            updated_at=event.updated_at,
+            creator_name=creator_name,
+            class_name=class_name,
+        )
+        for event, creator_name, class_name in rows
+    )
 
 
 @router.post("/events", response_model=EventResponse, status_code=status.HTTP_201_CREATED)
-def create_event(
+async def create_event(
     event_in: EventCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """
@@ -100,8 +144,9 @@ def create_event(
         created_by=current_user.id
     )
     db.add(event)
-    db.commit()
-    db.refresh(event)
+    await db.commit()
+    await db.refresh(event)
+    await db.refresh(event, ["class_"])
 
     return {
         **event.__dict__,
@@ -111,23 +156,27 @@ def create_event(
 
 
 @router.get("/events/{event_id}", response_model=EventResponse)
-def get_event(
+async def get_event(
     event_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Obter detalhes de um evento"""
-    event = db.query(Event).filter(Event.id == event_id, Event.is_active == True).first()
+    event = await db.scalar(
+        select(Event).options(*EVENT_OPTIONS).where(Event.id == event_id, Event.is_active == True)
+    )
     if not event:
         raise HTTPException(status_code=404, detail="Evento não encontrado")
 
     # Verificar permissão para professores
     if current_user.role == "TEACHER":
         if event.class_id:
-            teacher_class = db.query(Class).filter(
-                Class.id == event.class_id,
-                Class.teacher_id == current_user.teacher.id
-            ).first()
+            teacher_class = await db.scalar(
+                select(Class).where(
+                    Class.id == event.class_id,
+                    Class.teacher_id == current_user.teacher.id
+                )
+            )
             if not teacher_class:
                 raise HTTPException(status_code=403, detail="Sem permissão para acessar este evento")
 
@@ -139,10 +188,10 @@ def get_event(
 
 
 @router.patch("/events/{event_id}", response_model=EventResponse)
-def update_event(
+async def update_event(
     event_id: int,
     event_update: EventUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """
@@ -150,7 +199,9 @@ def update_event(
     - Criador do evento pode editar
     - Secretários, Pedagogos e Diretores podem editar qualquer evento
     """
-    event = db.query(Event).filter(Event.id == event_id, Event.is_active == True).first()
+    event = await db.scalar(
+        select(Event).options(*EVENT_OPTIONS).where(Event.id == event_id, Event.is_active == True)
+    )
     if not event:
         raise HTTPException(status_code=404, detail="Evento não encontrado")
 
@@ -163,8 +214,8 @@ def update_event(
     for field, value in event_update.model_dump(exclude_unset=True).items():
         setattr(event, field, value)
 
-    db.commit()
-    db.refresh(event)
+    await db.commit()
+    await db.refresh(event)
 
     return {
         **event.__dict__,
@@ -174,9 +225,9 @@ def update_event(
 
 
 @router.delete("/events/{event_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_event(
+async def delete_event(
     event_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """
@@ -184,7 +235,7 @@ def delete_event(
     - Criador do evento pode deletar
     - Secretários, Pedagogos e Diretores podem deletar qualquer evento
     """
-    event = db.query(Event).filter(Event.id == event_id, Event.is_active == True).first()
+    event = await db.scalar(select(Event).where(Event.id == event_id, Event.is_active == True))
     if not event:
         raise HTTPException(status_code=404, detail="Evento não encontrado")
 
@@ -194,45 +245,64 @@ def delete_event(
             raise HTTPException(status_code=403, detail="Apenas o criador pode deletar este evento")
 
     event.is_active = False
-    db.commit()
+    await db.commit()
     return
 
 
 # ==================== MATERIAL RESERVATIONS ====================
 
-@router.get("/material-reservations", response_model=List[MaterialReservationResponse])
-def list_material_reservations(
+@router.get(
+    "/material-reservations",
+    response_model=List[MaterialReservationResponse],
+    dependencies=[Depends(query_budget(2))],
+)
+async def list_material_reservations(
+    response: Response,
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
     status_filter: Optional[str] = Query(None, alias="status"),
-    db: Session = Depends(get_db),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor da página anterior"),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """
     Listar reservas de material
     - Todos os usuários podem ver todas as reservas
+    - Paginação por cursor em (reservation_date, start_time, id): a próxima página
+      é indicada no header X-Next-Cursor
     """
-    query = db.query(MaterialReservation)
+    order_columns = (MaterialReservation.reservation_date, MaterialReservation.start_time, MaterialReservation.id)
+
+    # Nomes de quem reservou e da turma na mesma consulta
+    query = (
+        select(MaterialReservation, User.name.label("reserver_name"), Class.name.label("class_name"))
+        .outerjoin(User, User.id == MaterialReservation.reserved_by)
+        .outerjoin(Class, Class.id == MaterialReservation.class_id)
+    )
 
     # Filtros de data
     if start_date:
-        query = query.filter(MaterialReservation.reservation_date >= start_date)
+        query = query.where(MaterialReservation.reservation_date >= start_date)
     if end_date:
-        query = query.filter(MaterialReservation.reservation_date <= end_date)
+        query = query.where(MaterialReservation.reservation_date <= end_date)
 
     # Filtro de status
     if status_filter:
-        query = query.filter(MaterialReservation.status == status_filter)
-
-    reservations = query.order_by(
-        MaterialReservation.reservation_date,
-        MaterialReservation.start_time
-    ).all()
+        query = query.where(MaterialReservation.status == status_filter)
+
+    rows = await fetch_page(
+        db, query,
+        order_by=order_columns,
+        limit=limit,
+        cursor=cursor,
+        response=response,
+        key=lambda row: [row[0].reservation_date, row[0].start_time, row[0].id],
+        scalars=False,
+    )
 
-    # Enriquecer com informações
-    result = []
-    for reservation in reservations:
-        reservation_dict = {
+    return [
+        {
             "id": reservation.id,
             "material_name": reservation.material_name,
             "description": reservation.description,
@@ -247,12 +317,74 @@ def list_material_reservations(
             "status": reservation.status,
             "created_at": reservation.created_at,
             "updated_at": reservation.updated_at,
-            "reserver_name": reservation.reserver.name if reservation.reserver else None,
-            "class_name": reservation.class_.name if reservation.class_ else None,
+            "reserver_name": reserver_name,
+            "class_name": class_name,
         }
-        result.append(reservation_dict)
+        for reservation, reserver_name, class_name in rows
+    ]
+
+
+def validate_reservation_times(start_time: time, end_time: time) -> None:
+    if end_time <= start_time:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="O horário final deve ser posterior ao horário inicial",
+        )
 
-    return result
+
+async def ensure_material_available(
+    db: AsyncSession,
+    material_name: str,
+    reservation_date: date,
+    start_time: time,
+    end_time: time,
+    exclude_id: Optional[int] = None,
+) -> None:
+    """
+    Bloqueia o material até o commit e rejeita (409) reservas sobrepostas,
+    para que duas requisições simultâneas não reservem o mesmo horário
+    """
+    validate_reservation_times(start_time, end_time)
+    await lock_material(db, material_name)
+    conflicts = await find_conflicts(db, material_name, reservation_date, start_time, end_time, exclude_id)
+    if conflicts:
+        taken = ", ".join(
+            f"{c.start_time.strftime('%H:%M')}-{c.end_time.strftime('%H:%M')}" for c in conflicts
+        )
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Material já reservado neste horário ({taken})",
+        )
+
+
+@router.get(
+    "/material-reservations/availability",
+    response_model=MaterialAvailabilityResponse,
+    dependencies=[Depends(query_budget(2))],
+)
+async def check_material_availability(
+    material_name: str = Query(..., min_length=1),
+    reservation_date: date = Query(...),
+    start_time: time = Query(...),
+    end_time: time = Query(...),
+    exclude_id: Optional[int] = Query(None, description="Reserva ignorada (ao editar)"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Verificar se um material está livre no horário.
+    Cada nome de material é um recurso único: qualquer reserva ativa sobreposta é conflito.
+    """
+    validate_reservation_times(start_time, end_time)
+    conflicts = await find_conflicts(db, material_name, reservation_date, start_time, end_time, exclude_id)
+    return {
+        "material_name": material_name,
+        "reservation_date": reservation_date,
+        "start_time": start_time,
+        "end_time": end_time,
+        "available": not conflicts,
+        "conflicts": conflicts,
+    }
 
 
 @router.post(
@@ -260,20 +392,29 @@ def list_material_reservations(
     response_model=MaterialReservationResponse,
     status_code=status.HTTP_201_CREATED
 )
-def create_material_reservation(
+async def create_material_reservation(
     reservation_in: MaterialReservationCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Criar reserva de material - qualquer usuário pode criar"""
+    """Criar reserva de material - qualquer usuário pode criar (409 se o horário estiver ocupado)"""
+    await ensure_material_available(
+        db,
+        reservation_in.material_name,
+        reservation_in.reservation_date,
+        reservation_in.start_time,
+        reservation_in.end_time,
+    )
+
     reservation = MaterialReservation(
         **reservation_in.model_dump(),
         reserved_by=current_user.id,
         status="pending"
     )
     db.add(reservation)
-    db.commit()
-    db.refresh(reservation)
+    await db.commit()
+    await db.refresh(reservation)
+    await db.refresh(reservation, ["class_"])
 
     return {
         **reservation.__dict__,
@@ -283,15 +424,17 @@ def create_material_reservation(
 
 
 @router.get("/material-reservations/{reservation_id}", response_model=MaterialReservationResponse)
-def get_material_reservation(
+async def get_material_reservation(
     reservation_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Obter detalhes de uma reserva"""
-    reservation = db.query(MaterialReservation).filter(
-        MaterialReservation.id == reservation_id
-    ).first()
+    reservation = await db.scalar(
+        select(MaterialReservation).options(*RESERVATION_OPTIONS).where(
+            MaterialReservation.id == reservation_id
+        )
+    )
     if not reservation:
         raise HTTPException(status_code=404, detail="Reserva não encontrada")
 
@@ -303,10 +446,10 @@ def get_material_reservation(
 
 
 @router.patch("/material-reservations/{reservation_id}", response_model=MaterialReservationResponse)
-def update_material_reservation(
+async def update_material_reservation(
     reservation_id: int,
     reservation_update: MaterialReservationUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """
@@ -314,9 +457,11 @@ def update_material_reservation(
     - Quem reservou pode editar
     - Secretários, Pedagogos e Diretores podem editar qualquer reserva
     """
-    reservation = db.query(MaterialReservation).filter(
-        MaterialReservation.id == reservation_id
-    ).first()
+    reservation = await db.scalar(
+        select(MaterialReservation).options(*RESERVATION_OPTIONS).where(
+            MaterialReservation.id == reservation_id
+        )
+    )
     if not reservation:
         raise HTTPException(status_code=404, detail="Reserva não encontrada")
 
@@ -325,12 +470,26 @@ def update_material_reservation(
         if reservation.reserved_by != current_user.id:
             raise HTTPException(status_code=403, detail="Apenas quem reservou pode editar")
 
+    changes = reservation_update.model_dump(exclude_unset=True)
+
+    # Verificar conflito quando material, data, horário ou status mudam
+    slot_fields = {"material_name", "reservation_date", "start_time", "end_time", "status"}
+    if slot_fields & changes.keys() and changes.get("status", reservation.status) != CANCELLED_STATUS:
+        await ensure_material_available(
+            db,
+            changes.get("material_name", reservation.material_name),
+            changes.get("reservation_date", reservation.reservation_date),
+            changes.get("start_time", reservation.start_time),
+            changes.get("end_time", reservation.end_time),
+            exclude_id=reservation.id,
+        )
+
     # Atualizar campos
-    for field, value in reservation_update.model_dump(exclude_unset=True).items():
+    for field, value in changes.items():
         setattr(reservation, field, value)
 
-    db.commit()
-    db.refresh(reservation)
+    await db.commit()
+    await db.refresh(reservation)
 
     return {
         **reservation.__dict__,
@@ -340,9 +499,9 @@ def update_material_reservation(
 
 
 @router.delete("/material-reservations/{reservation_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_material_reservation(
+async def delete_material_reservation(
     reservation_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """
@@ -350,9 +509,9 @@ def delete_material_reservation(
     - Quem reservou pode deletar
     - Secretários, Pedagogos e Diretores podem deletar qualquer reserva
     """
-    reservation = db.query(MaterialReservation).filter(
-        MaterialReservation.id == reservation_id
-    ).first()
+    reservation = await db.scalar(
+        select(MaterialReservation).where(MaterialReservation.id == reservation_id)
+    )
     if not reservation:
         raise HTTPException(status_code=404, detail="Reserva não encontrada")
 
@@ -361,6 +520,6 @@ def delete_material_reservation(
         if reservation.reserved_by != current_user.id:
             raise HTTPException(status_code=403, detail="Apenas quem reservou pode deletar")
 
-    db.delete(reservation)
-    db.commit()
+    await db.delete(reservation)
+    await db.commit()
     return
@@ -1,125 +1,262 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
-from typing import List
-from app.core.database import get_db
-from app.api.dependencies import require_role
-from app.models import User, UserRole, Class, Teacher, Enrollment
-from app.schemas import ClassCreate, ClassResponse, ClassUpdate
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+from typing import List, Optional
+from datetime import time
+from app.core.database import get_async_db
+from app.core.pagination import fetch_page
+from app.api.dependencies import conditional_etag, require_role, Principal
+from app.core.query_metrics import query_budget
+from app.core.reports import build_gradebook, class_gradebook_rows
+from app.core.response_cache import cached_response
+from app.core.versions import request_table_versions
+from app.core.scheduling import (
+    ROOM_TABLES, find_schedule_conflicts, free_slots, load_room_index, load_schedule_index, room_key,
+)
+from app.models import User, UserRole, Class, Teacher, Enrollment, Schedule
+from app.schemas import ClassCreate, ClassResponse, ClassUpdate, FreeRoomsResponse, FreeSlot, Gradebook
 
 router = APIRouter()
 
+# Tabelas lidas pela listagem/detalhe de turmas (invalidam o cache de respostas)
+CLASS_ENTITIES = ("classes", "schedules", "teachers", "users", "enrollments")
 
-@router.get("/", response_model=List[ClassResponse])
+
+def select_classes_with_student_count():
+    """
+    Turmas com professor, horários e contagem de alunos ativos em uma única consulta
+    (contagem via subquery agrupada por turma, sem N+1)
+    """
+    student_counts = select(
+        Enrollment.class_id,
+        func.count(Enrollment.id).label("student_count"),
+    ).where(Enrollment.is_active == True).group_by(Enrollment.class_id).subquery()
+
+    return select(
+        Class,
+        func.coalesce(student_counts.c.student_count, 0),
+    ).outerjoin(
+        student_counts, student_counts.c.class_id == Class.id
+    ).options(
+        selectinload(Class.schedules),
+        joinedload(Class.teacher).joinedload(Teacher.user)
+    )
+
+
+def class_to_dict(class_obj: Class, student_count: int) -> dict:
+    """Monta a resposta da turma com nome do professor e contagem de alunos"""
+    return {
+        "id": class_obj.id,
+        "name": class_obj.name,
+        "description": class_obj.description,
+        "level": class_obj.level,
+        "teacher_id": class_obj.teacher_id,
+        "teacher_name": class_obj.teacher.user.name if class_obj.teacher else None,
+        "max_capacity": class_obj.max_capacity,
+        "current_students": student_count,
+        "start_date": class_obj.start_date,
+        "end_date": class_obj.end_date,
+        "is_active": class_obj.is_active,
+        "created_at": class_obj.created_at,
+        "schedules": class_obj.schedules
+    }
+
+
+@router.get(
+    "/",
+    response_model=List[ClassResponse],
+    dependencies=[
+        Depends(query_budget(4)),
+        Depends(conditional_etag(*CLASS_ENTITIES)),
+    ],
+)
+@cached_response(*CLASS_ENTITIES, model=List[ClassResponse])
 async def list_classes(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY, UserRole.COORDINATOR, UserRole.TEACHER)),
+    response: Response,
+    skip: int = Query(0, ge=0, deprecated=True),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor da página anterior"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY, UserRole.COORDINATOR, UserRole.TEACHER)),
 ):
     """
     Listar todas as turmas (Admin vê todas, Professor vê apenas as suas)
+    Paginação por cursor via X-Next-Cursor; 304 quando o If-None-Match confere com a ETag atual
     """
-    query = db.query(Class).options(
-        joinedload(Class.schedules),
-        joinedload(Class.teacher).joinedload(Teacher.user)
-    ).filter(Class.is_active == True)
+    query = select_classes_with_student_count().where(Class.is_active == True)
     
     if current_user.role == UserRole.TEACHER:
-        teacher = db.query(Teacher).filter(Teacher.user_id == current_user.id).first()
-        if teacher:
-            query = query.filter(Class.teacher_id == teacher.id)
+        if current_user.teacher_id:
+            query = query.where(Class.teacher_id == current_user.teacher_id)
     
-    classes = query.offset(skip).limit(limit).all()
+    rows = await fetch_page(
+        db, query,
+        order_by=(Class.id,),
+        limit=limit,
+        cursor=cursor,
+        response=response,
+        key=lambda row: [row[0].id],
+        skip=skip,
+        scalars=False,
+    )
     
     # Adicionar nome do professor e contagem de alunos na resposta
-    result = []
-    for class_obj in classes:
-        # Contar alunos matriculados ativos na turma
-        student_count = db.query(func.count(Enrollment.id)).filter(
-            Enrollment.class_id == class_obj.id,
-            Enrollment.is_active == True
-        ).scalar() or 0
-        
-        class_dict = {
-            "id": class_obj.id,
-            "name": class_obj.name,
-            "description": class_obj.description,
-            "level": class_obj.level,
-            "teacher_id": class_obj.teacher_id,
-            "teacher_name": class_obj.teacher.user.name if class_obj.teacher else None,
-            "max_capacity": class_obj.max_capacity,
-            "current_students": student_count,
-            "start_date": class_obj.start_date,
-            "end_date": class_obj.end_date,
-            "is_active": class_obj.is_active,
-            "created_at": class_obj.created_at,
-            "schedules": class_obj.schedules
-        }
-        result.append(class_dict)
-    
-    return result
+    return [class_to_dict(class_obj, student_count) for class_obj, student_count in rows]
+
+
+def validate_time_range(start_time: time, end_time: time) -> None:
+    if end_time <= start_time:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="O horário final deve ser posterior ao horário inicial",
+        )
+
+
+async def ensure_no_schedule_conflicts(
+    db: AsyncSession,
+    class_name: str,
+    teacher_id: Optional[int],
+    schedules,
+    class_id: Optional[int] = None,
+) -> None:
+    """Rejeita (409) horários que usam sala ou professor já ocupados por outra turma ativa"""
+    for schedule in schedules:
+        validate_time_range(schedule.start_time, schedule.end_time)
+    conflicts = await find_schedule_conflicts(db, class_name, teacher_id, schedules, class_id)
+    if conflicts:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Conflito de horário: " + "; ".join(conflicts),
+        )
+
+
+@router.get("/free-rooms", response_model=FreeRoomsResponse, dependencies=[Depends(query_budget(3))])
+async def list_free_rooms(
+    request: Request,
+    weekday: int = Query(..., ge=0, le=6),
+    start_time: time = Query(...),
+    end_time: time = Query(...),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY, UserRole.COORDINATOR)),
+):
+    """
+    Salas livres no dia/horário (salas conhecidas = salas usadas por turmas ativas)
+    Horários das salas em cache por versão de classes/schedules
+    """
+    validate_time_range(start_time, end_time)
+    index = await load_room_index(db, await request_table_versions(request, db, ROOM_TABLES))
+
+    return {
+        "weekday": weekday,
+        "start_time": start_time,
+        "end_time": end_time,
+        "rooms": index.free_rooms(weekday, start_time, end_time),
+    }
+
+
+@router.get("/free-slots", response_model=List[FreeSlot], dependencies=[Depends(query_budget(3))])
+async def list_free_slots(
+    room: Optional[str] = Query(None),
+    teacher_id: Optional[int] = Query(None),
+    weekday: Optional[int] = Query(None, ge=0, le=6),
+    day_start: time = Query(time(7, 0)),
+    day_end: time = Query(time(22, 0)),
+    min_minutes: int = Query(60, ge=1),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY, UserRole.COORDINATOR)),
+):
+    """
+    Horários livres de uma sala e/ou professor (todos os dias da semana ou apenas `weekday`)
+    """
+    if not room_key(room) and not teacher_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Informe a sala ou o professor",
+        )
+    validate_time_range(day_start, day_end)
 
+    weekdays = [weekday] if weekday is not None else list(range(7))
+    index = await load_schedule_index(db, weekdays, rooms=[room] if room else [], teacher_id=teacher_id)
 
-@router.get("/{class_id}", response_model=ClassResponse)
+    slots = []
+    for day in weekdays:
+        busy = (index.busy_room(day, room) if room_key(room) else []) + \
+            (index.busy_teacher(day, teacher_id) if teacher_id else [])
+        slots.extend(
+            {"weekday": day, "start_time": start, "end_time": end}
+            for start, end in free_slots(busy, day_start, day_end, min_minutes)
+        )
+    return slots
+
+
+@router.get("/{class_id}", response_model=ClassResponse, dependencies=[Depends(query_budget(4))])
+@cached_response(*CLASS_ENTITIES, model=ClassResponse)
 async def get_class(
     class_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY, UserRole.COORDINATOR, UserRole.TEACHER)),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY, UserRole.COORDINATOR, UserRole.TEACHER)),
 ):
     """
     Obter detalhes de uma turma específica
     """
-    class_obj = db.query(Class).options(
-        joinedload(Class.schedules),
-        joinedload(Class.teacher).joinedload(Teacher.user)
-    ).filter(Class.id == class_id).first()
+    row = (await db.execute(
+        select_classes_with_student_count().where(Class.id == class_id)
+    )).first()
     
-    if not class_obj:
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Turma não encontrada",
         )
     
+    class_obj, student_count = row
+    
     # Teacher can only view their own classes
     if current_user.role == UserRole.TEACHER:
-        teacher = db.query(Teacher).filter(Teacher.user_id == current_user.id).first()
-        if not teacher or class_obj.teacher_id != teacher.id:
+        if not current_user.teacher_id or class_obj.teacher_id != current_user.teacher_id:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Você não tem permissão para acessar esta turma",
             )
     
-    # Contar alunos matriculados ativos na turma
-    student_count = db.query(func.count(Enrollment.id)).filter(
-        Enrollment.class_id == class_obj.id,
-        Enrollment.is_active == True
-    ).scalar() or 0
-    
-    class_dict = {
-        "id": class_obj.id,
-        "name": class_obj.name,
-        "description": class_obj.description,
-        "level": class_obj.level,
-        "teacher_id": class_obj.teacher_id,
-        "teacher_name": class_obj.teacher.user.name if class_obj.teacher else None,
-        "max_capacity": class_obj.max_capacity,
-        "current_students": student_count,
-        "start_date": class_obj.start_date,
-        "end_date": class_obj.end_date,
-        "is_active": class_obj.is_active,
-        "created_at": class_obj.created_at,
-        "schedules": class_obj.schedules
-    }
-    
-    return class_dict
+    return class_to_dict(class_obj, student_count)
+
+
+@router.get("/{class_id}/gradebook", response_model=Gradebook, dependencies=[Depends(query_budget(3))])
+async def get_class_gradebook(
+    class_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY, UserRole.COORDINATOR, UserRole.TEACHER)),
+):
+    """
+    Diário de notas da turma: matriz alunos x avaliações, médias ponderadas por aluno
+    e estatísticas por avaliação (uma consulta + pivot em memória)
+    """
+    class_obj = await db.scalar(select(Class).where(Class.id == class_id))
+    if not class_obj:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Turma não encontrada",
+        )
+
+    # Teacher can only view their own classes
+    if current_user.role == UserRole.TEACHER:
+        if not current_user.teacher_id or class_obj.teacher_id != current_user.teacher_id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Você não tem permissão para acessar esta turma",
+            )
+
+    rows = await class_gradebook_rows(db, class_id)
+    return build_gradebook(class_obj, rows)
 
 
 @router.post("/", response_model=ClassResponse, status_code=status.HTTP_201_CREATED)
 async def create_class(
     class_data: ClassCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY)),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY)),
 ):
     """
     Criar nova turma (apenas Admin)
@@ -127,17 +264,21 @@ async def create_class(
     """
     # Check if teacher exists (if provided)
     if class_data.teacher_id:
-        teacher = db.query(Teacher).filter(Teacher.id == class_data.teacher_id).first()
+        teacher = await db.scalar(select(Teacher).where(Teacher.id == class_data.teacher_id))
         if not teacher:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Professor não encontrado",
             )
 
-    new_class = Class(**class_data.dict())
+    await ensure_no_schedule_conflicts(db, class_data.name, class_data.teacher_id, class_data.schedules)
+
+    new_class = Class(**class_data.dict(exclude={"schedules"}))
+    new_class.schedules = [Schedule(**schedule.dict()) for schedule in class_data.schedules]
     db.add(new_class)
-    db.commit()
-    db.refresh(new_class)
+    await db.commit()
+    await db.refresh(new_class)
+    await db.refresh(new_class, ["schedules"])
 
     return new_class
 
@@ -146,13 +287,13 @@ async def create_class(
 async def update_class(
     class_id: int,
     class_data: ClassUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY)),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY)),
 ):
     """
     Atualizar dados de uma turma (Diretor ou Secretário)
     """
-    class_ = db.query(Class).filter(Class.id == class_id).first()
+    class_ = await db.scalar(select(Class).where(Class.id == class_id))
     if not class_:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -161,7 +302,7 @@ async def update_class(
 
     # If updating teacher, check if new teacher exists
     if class_data.teacher_id:
-        teacher = db.query(Teacher).filter(Teacher.id == class_data.teacher_id).first()
+        teacher = await db.scalar(select(Teacher).where(Teacher.id == class_data.teacher_id))
         if not teacher:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -169,11 +310,33 @@ async def update_class(
             )
 
     update_data = class_data.dict(exclude_unset=True)
+    new_schedules = class_data.schedules
+    update_data.pop("schedules", None)
+
+    # Revalidar horários quando mudam os horários, o professor ou a turma é reativada
+    revalidate = new_schedules is not None or {"teacher_id", "is_active"} & update_data.keys()
+    if revalidate and update_data.get("is_active", class_.is_active):
+        schedules = new_schedules
+        if schedules is None:
+            schedules = (await db.scalars(select(Schedule).where(Schedule.class_id == class_.id))).all()
+        await ensure_no_schedule_conflicts(
+            db,
+            update_data.get("name", class_.name),
+            update_data.get("teacher_id", class_.teacher_id),
+            schedules,
+            class_id=class_.id,
+        )
+
     for field, value in update_data.items():
         setattr(class_, field, value)
 
-    db.commit()
-    db.refresh(class_)
+    if new_schedules is not None:
+        await db.execute(delete(Schedule).where(Schedule.class_id == class_.id))
+        db.add_all(Schedule(class_id=class_.id, **schedule.dict()) for schedule in new_schedules)
+
+    await db.commit()
+    await db.refresh(class_)
+    await db.refresh(class_, ["schedules"])
 
     return class_
 
@@ -181,13 +344,13 @@ async def update_class(
 @router.delete("/{class_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_class(
     class_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(UserRole.DIRECTOR)),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_role(UserRole.DIRECTOR)),
 ):
     """
     Desativar uma turma (soft delete)
     """
-    class_ = db.query(Class).filter(Class.id == class_id).first()
+    class_ = await db.scalar(select(Class).where(Class.id == class_id))
     if not class_:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -195,7 +358,7 @@ async def delete_class(
         )
 
     class_.is_active = False
-    db.commit()
+    await db.commit()
 
     return None
 
@@ -1,47 +1,89 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from app.core.database import get_db
-from app.api.dependencies import require_role
-from app.models import User, UserRole, Enrollment, Student
-from app.schemas import EnrollmentResponse, EnrollmentCreate
+from sqlalchemy import func, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from typing import Dict, List
+from app.core.database import get_async_db
+from app.api.dependencies import require_role, Principal
+from app.models import User, UserRole, Enrollment, Student, Class
+from app.schemas import BulkEnrollmentCreate, BulkEnrollmentResult, EnrollmentResponse, EnrollmentCreate
 
 router = APIRouter()
 
 
+def select_class_roster(class_id: int):
+    """Matrículas ativas da turma com o aluno carregado, em ordem alfabética"""
+    return select(Enrollment).options(
+        joinedload(Enrollment.student)
+    ).where(
+        Enrollment.class_id == class_id,
+        Enrollment.is_active == True
+    ).join(Student).order_by(Student.name)
+
+
+async def lock_class(db: AsyncSession, class_id: int) -> Class:
+    """
+    Bloqueia a linha da turma até o fim da transação: matrículas simultâneas na mesma
+    turma são serializadas e a verificação de capacidade não sofre corrida
+    """
+    class_obj = await db.scalar(select(Class).where(Class.id == class_id).with_for_update())
+    if not class_obj:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Turma não encontrada"
+        )
+    return class_obj
+
+
+def ensure_capacity(class_obj: Class, active_count: int, requested: int) -> None:
+    if class_obj.max_capacity is None or requested <= 0:
+        return
+    available = max(class_obj.max_capacity - active_count, 0)
+    if requested > available:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Capacidade da turma excedida: {available} vaga(s) disponível(is), {requested} solicitada(s)"
+        )
+
+
+async def _active_count(db: AsyncSession, class_id: int) -> int:
+    return await db.scalar(
+        select(func.count(Enrollment.id)).where(Enrollment.class_id == class_id, Enrollment.is_active == True)
+    )
+
+
 @router.get("/class/{class_id}/students", response_model=List[EnrollmentResponse])
 async def list_class_students(
     class_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY, UserRole.COORDINATOR, UserRole.TEACHER)),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY, UserRole.COORDINATOR, UserRole.TEACHER)),
 ):
     """
     Listar alunos matriculados em uma turma
     """
-    from sqlalchemy.orm import joinedload
-    enrollments = db.query(Enrollment).options(
-        joinedload(Enrollment.student)
-    ).filter(
-        Enrollment.class_id == class_id,
-        Enrollment.is_active == True
-    ).join(Student).order_by(Student.name).all()
+    result = await db.execute(select_class_roster(class_id))
+    enrollments = result.scalars().all()
     return enrollments
 
 
 @router.post("/", response_model=EnrollmentResponse, status_code=status.HTTP_201_CREATED)
 async def create_enrollment(
     enrollment_data: EnrollmentCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY)),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY)),
 ):
     """
-    Matricular aluno em turma
+    Matricular aluno em turma (respeitando a capacidade máxima)
     """
+    class_obj = await lock_class(db, enrollment_data.class_id)
+
     # Check if enrollment already exists
-    existing = db.query(Enrollment).filter(
-        Enrollment.student_id == enrollment_data.student_id,
-        Enrollment.class_id == enrollment_data.class_id
-    ).first()
+    existing = await db.scalar(
+        select(Enrollment).options(joinedload(Enrollment.student)).where(
+            Enrollment.student_id == enrollment_data.student_id,
+            Enrollment.class_id == enrollment_data.class_id
+        )
+    )
     
     if existing:
         if existing.is_active:
@@ -51,28 +93,94 @@ async def create_enrollment(
             )
         else:
             # Reativar matrícula
+            ensure_capacity(class_obj, await _active_count(db, class_obj.id), 1)
             existing.is_active = True
-            db.commit()
-            db.refresh(existing)
+            await db.commit()
             return existing
     
+    ensure_capacity(class_obj, await _active_count(db, class_obj.id), 1)
     new_enrollment = Enrollment(**enrollment_data.dict())
     db.add(new_enrollment)
-    db.commit()
-    db.refresh(new_enrollment)
+    await db.commit()
+    await db.refresh(new_enrollment)
+    await db.refresh(new_enrollment, ["student"])
     return new_enrollment
 
 
+@router.post("/bulk", response_model=BulkEnrollmentResult)
+async def create_bulk_enrollments(
+    enrollment_data: BulkEnrollmentCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY)),
+):
+    """
+    Matricular vários alunos em uma turma em uma única transação.
+    Matrículas inativas são reativadas; se não houver vagas para todos, nada é gravado (409).
+    Retorna o resultado por aluno e a lista de alunos da turma.
+    """
+    student_ids = list(dict.fromkeys(enrollment_data.student_ids))
+    class_obj = await lock_class(db, enrollment_data.class_id)
+
+    found = set((await db.scalars(
+        select(Student.id).where(Student.id.in_(student_ids), Student.is_active == True)
+    )).all())
+    missing = [student_id for student_id in student_ids if student_id not in found]
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Alunos não encontrados ou inativos: {', '.join(map(str, missing))}"
+        )
+
+    # Uma consulta: matrículas dos alunos pedidos e todas as ativas da turma (para a capacidade)
+    rows = (await db.execute(
+        select(Enrollment.id, Enrollment.student_id, Enrollment.is_active).where(
+            Enrollment.class_id == class_obj.id,
+            or_(Enrollment.student_id.in_(student_ids), Enrollment.is_active == True),
+        ).order_by(Enrollment.id)
+    )).all()
+    active_students = {row.student_id for row in rows if row.is_active}
+    # Matrícula inativa mais recente de cada aluno
+    inactive: Dict[int, int] = {row.student_id: row.id for row in rows if not row.is_active}
+
+    already_enrolled = [student_id for student_id in student_ids if student_id in active_students]
+    reactivated = [student_id for student_id in student_ids if student_id not in active_students and student_id in inactive]
+    created = [student_id for student_id in student_ids if student_id not in active_students and student_id not in inactive]
+    ensure_capacity(class_obj, len(active_students), len(reactivated) + len(created))
+
+    if reactivated:
+        await db.execute(
+            update(Enrollment)
+            .where(Enrollment.id.in_([inactive[student_id] for student_id in reactivated]))
+            .values(is_active=True)
+        )
+    if created:
+        values = {"class_id": class_obj.id, "is_active": True}
+        if enrollment_data.enrollment_date:
+            values["enrollment_date"] = enrollment_data.enrollment_date
+        await db.execute(insert(Enrollment).values([{**values, "student_id": student_id} for student_id in created]))
+    await db.commit()
+
+    roster = (await db.execute(select_class_roster(class_obj.id))).scalars().all()
+    return {
+        "class_id": class_obj.id,
+        "created": created,
+        "reactivated": reactivated,
+        "already_enrolled": already_enrolled,
+        "max_capacity": class_obj.max_capacity,
+        "roster": roster,
+    }
+
+
 @router.delete("/{enrollment_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_enrollment(
     enrollment_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY)),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY)),
 ):
     """
     Remover matrícula (soft delete)
     """
-    enrollment = db.query(Enrollment).filter(Enrollment.id == enrollment_id).first()
+    enrollment = await db.scalar(select(Enrollment).where(Enrollment.id == enrollment_id))
     if not enrollment:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -80,5 +188,5 @@ async def delete_enrollment(
         )
     
     enrollment.is_active = False
-    db.commit()
+    await db.commit()
     return None
@@ -0,0 +1,68 @@
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from app.api.dependencies import require_role, Principal
+from app.core.exports import (
+    ASSESSMENT_COLUMNS,
+    ATTENDANCE_COLUMNS,
+    assessment_export_query,
+    attendance_export_query,
+    ensure_export_format,
+    export_response,
+)
+from app.models import UserRole
+
+router = APIRouter()
+
+EXPORT_ROLES = (UserRole.DIRECTOR, UserRole.SECRETARY, UserRole.COORDINATOR)
+
+
+def validate_export_params(start_date: Optional[date], end_date: Optional[date], export_format: str) -> None:
+    ensure_export_format(export_format)
+    if start_date and end_date and end_date < start_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A data final deve ser posterior à data inicial",
+        )
+
+
+@router.get("/attendances")
+async def export_attendances(
+    export_format: str = Query("csv", alias="format", description="csv ou parquet"),
+    start_date: Optional[date] = Query(None, description="Aulas a partir desta data"),
+    end_date: Optional[date] = Query(None, description="Aulas até esta data"),
+    class_id: Optional[int] = None,
+    current_user: Principal = Depends(require_role(*EXPORT_ROLES)),
+):
+    """
+    Exportar presenças (com aluno, aula e turma) em CSV ou Parquet.
+    O arquivo é gerado em streaming, lote a lote, sem carregar tudo em memória.
+    """
+    validate_export_params(start_date, end_date, export_format)
+    return export_response(
+        attendance_export_query(start_date, end_date, class_id),
+        ATTENDANCE_COLUMNS,
+        export_format,
+        filename="presencas",
+    )
+
+
+@router.get("/assessments")
+async def export_assessments(
+    export_format: str = Query("csv", alias="format", description="csv ou parquet"),
+    start_date: Optional[date] = Query(None, description="Aulas a partir desta data"),
+    end_date: Optional[date] = Query(None, description="Aulas até esta data"),
+    class_id: Optional[int] = None,
+    current_user: Principal = Depends(require_role(*EXPORT_ROLES)),
+):
+    """
+    Exportar notas (com aluno, aula e turma) em CSV ou Parquet.
+    O arquivo é gerado em streaming, lote a lote, sem carregar tudo em memória.
+    """
+    validate_export_params(start_date, end_date, export_format)
+    return export_response(
+        assessment_export_query(start_date, end_date, class_id),
+        ASSESSMENT_COLUMNS,
+        export_format,
+        filename="notas",
+    )
@@ -2,11 +2,15 @@
 API Routes for Lesson Planning
 Rotas para gerenciamento de planejamento pedagógico
 """
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from app.core.database import get_db
-from app.api.dependencies import get_current_user
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import List, Optional
+from app.core.database import get_async_db
+from app.core.pagination import fetch_page
+from app.core.response_cache import cached_response
+from app.api.dependencies import conditional_etag, get_current_principal, Principal
 from app.models import User, UserRole, Teacher, Class
 from app.models.lesson_planning import Book, UnitContent, ClassBookAssignment, LessonPlan
 from app.schemas.lesson_planning import (
@@ -18,30 +22,43 @@ from app.schemas.lesson_planning import (
 
 router = APIRouter()
 
+# Relacionamentos serializados nas respostas (evita lazy load na sessão assíncrona)
+BOOK_OPTIONS = (selectinload(Book.units),)
+ASSIGNMENT_OPTIONS = (selectinload(ClassBookAssignment.book).selectinload(Book.units),)
+
 
 # ============= BOOKS =============
 
-@router.get("/books", response_model=List[BookSchema])
+@router.get("/books", response_model=List[BookSchema], dependencies=[Depends(conditional_etag("books", "unit_contents"))])
+@cached_response("books", "unit_contents", model=List[BookSchema])
 async def list_books(
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    skip: int = Query(0, ge=0, deprecated=True),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor da página anterior"),
     level: str = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
-    """Listar livros didáticos"""
-    query = db.query(Book)
+    """Listar livros didáticos (ETag: 304 com If-None-Match enquanto nada mudar)"""
+    query = select(Book).options(*BOOK_OPTIONS)
     if level:
-        query = query.filter(Book.level == level)
-    books = query.offset(skip).limit(limit).all()
-    return books
+        query = query.where(Book.level == level)
+    return await fetch_page(
+        db, query,
+        order_by=(Book.id,),
+        limit=limit,
+        cursor=cursor,
+        response=response,
+        skip=skip,
+    )
 
 
 @router.post("/books", response_model=BookSchema, status_code=status.HTTP_201_CREATED)
 async def create_book(
     book: BookCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     """Criar novo livro (apenas DIRECTOR/COORDINATOR)"""
     if current_user.role not in [UserRole.DIRECTOR, UserRole.COORDINATOR]:
@@ -52,19 +69,21 @@ async def create_book(
     
     db_book = Book(**book.dict())
     db.add(db_book)
-    db.commit()
-    db.refresh(db_book)
+    await db.commit()
+    await db.refresh(db_book)
+    await db.refresh(db_book, ["units"])
     return db_book
 
 
 @router.get("/books/{book_id}", response_model=BookSchema)
+@cached_response("books", "unit_contents", model=BookSchema)
 async def get_book(
     book_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     """Obter detalhes de um livro"""
-    book = db.query(Book).filter(Book.id == book_id).first()
+    book = await db.scalar(select(Book).options(*BOOK_OPTIONS).where(Book.id == book_id))
     if not book:
         raise HTTPException(status_code=404, detail="Livro não encontrado")
     return book
@@ -74,8 +93,8 @@ async def get_book(
 async def update_book(
     book_id: int,
     book: BookUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     """Atualizar livro (apenas DIRECTOR/COORDINATOR)"""
     if current_user.role not in [UserRole.DIRECTOR, UserRole.COORDINATOR]:
@@ -84,23 +103,23 @@ async def update_book(
             detail="Apenas diretores e pedagogos podem editar livros"
         )
     
-    db_book = db.query(Book).filter(Book.id == book_id).first()
+    db_book = await db.scalar(select(Book).options(*BOOK_OPTIONS).where(Book.id == book_id))
     if not db_book:
         raise HTTPException(status_code=404, detail="Livro não encontrado")
     
     for key, value in book.dict(exclude_unset=True).items():
         setattr(db_book, key, value)
     
-    db.commit()
-    db.refresh(db_book)
+    await db.commit()
+    await db.refresh(db_book)
     return db_book
 
 
 @router.delete("/books/{book_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_book(
     book_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     """Deletar livro (apenas DIRECTOR)"""
     if current_user.role != UserRole.DIRECTOR:
@@ -109,12 +128,12 @@ async def delete_book(
             detail="Apenas diretores podem deletar livros"
         )
     
-    db_book = db.query(Book).filter(Book.id == book_id).first()
+    db_book = await db.scalar(select(Book).where(Book.id == book_id))
     if not db_book:
         raise HTTPException(status_code=404, detail="Livro não encontrado")
     
-    db.delete(db_book)
-    db.commit()
+    await db.delete(db_book)
+    await db.commit()
 
 
 # ============= UNIT CONTENTS =============
@@ -123,8 +142,8 @@ async def delete_book(
 async def create_unit_content(
     book_id: int,
     unit: UnitContentCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     """Criar conteúdo de unidade (apenas DIRECTOR/COORDINATOR)"""
     if current_user.role not in [UserRole.DIRECTOR, UserRole.COORDINATOR]:
@@ -134,15 +153,17 @@ async def create_unit_content(
         )
     
     # Verificar se livro existe
-    book = db.query(Book).filter(Book.id == book_id).first()
+    book = await db.scalar(select(Book).where(Book.id == book_id))
     if not book:
         raise HTTPException(status_code=404, detail="Livro não encontrado")
     
     # Verificar se já existe esta unidade para este livro
-    existing = db.query(UnitContent).filter(
-        UnitContent.book_id == book_id,
-        UnitContent.unit_number == unit.unit_number
-    ).first()
+    existing = await db.scalar(
+        select(UnitContent).where(
+            UnitContent.book_id == book_id,
+            UnitContent.unit_number == unit.unit_number
+        )
+    )
     if existing:
         raise HTTPException(
             status_code=400,
@@ -151,21 +172,25 @@ async def create_unit_content(
     
     db_unit = UnitContent(**unit.dict(), book_id=book_id)
     db.add(db_unit)
-    db.commit()
-    db.refresh(db_unit)
+    await db.commit()
+    await db.refresh(db_unit)
     return db_unit
 
 
-@router.get("/books/{book_id}/units", response_model=List[UnitContentSchema])
+@router.get("/books/{book_id}/units", response_model=List[UnitContentSchema], dependencies=[Depends(conditional_etag("unit_contents"))])
+@cached_response("unit_contents", model=List[UnitContentSchema])
 async def list_book_units(
     book_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     """Listar unidades de um livro"""
-    units = db.query(UnitContent).filter(
-        UnitContent.book_id == book_id
-    ).order_by(UnitContent.unit_number).all()
+    result = await db.execute(
+        select(UnitContent).where(
+            UnitContent.book_id == book_id
+        ).order_by(UnitContent.unit_number)
+    )
+    units = result.scalars().all()
     return units
 
 
@@ -173,8 +198,8 @@ async def list_book_units(
 async def update_unit_content(
     unit_id: int,
     unit: UnitContentUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     """Atualizar conteúdo de unidade"""
     if current_user.role not in [UserRole.DIRECTOR, UserRole.PEDAGOGUE]:
@@ -183,15 +208,15 @@ async def update_unit_content(
             detail="Apenas diretores e pedagogos podem editar unidades"
         )
     
-    db_unit = db.query(UnitContent).filter(UnitContent.id == unit_id).first()
+    db_unit = await db.scalar(select(UnitContent).where(UnitContent.id == unit_id))
     if not db_unit:
         raise HTTPException(status_code=404, detail="Unidade não encontrada")
     
     for key, value in unit.dict(exclude_unset=True).items():
         setattr(db_unit, key, value)
     
-    db.commit()
-    db.refresh(db_unit)
+    await db.commit()
+    await db.refresh(db_unit)
     return db_unit
 
 
@@ -201,8 +226,8 @@ async def update_unit_content(
 async def assign_book_to_class(
     class_id: int,
     assignment: ClassBookAssignmentCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     """Atribuir livro a uma turma"""
     if current_user.role not in [UserRole.DIRECTOR, UserRole.COORDINATOR, UserRole.TEACHER]:
@@ -210,16 +235,17 @@ async def assign_book_to_class(
     
     # Verificar se é professor da turma
     if current_user.role == UserRole.TEACHER:
-        teacher = db.query(Teacher).filter(Teacher.user_id == current_user.id).first()
-        class_ = db.query(Class).filter(Class.id == class_id).first()
-        if not class_ or class_.teacher_id != teacher.id:
+        class_ = await db.scalar(select(Class).where(Class.id == class_id))
+        if not class_ or not current_user.teacher_id or class_.teacher_id != current_user.teacher_id:
             raise HTTPException(status_code=403, detail="Você não é professor desta turma")
     
     # Verificar se já existe atribuição ativa
-    existing = db.query(ClassBookAssignment).filter(
-        ClassBookAssignment.class_id == class_id,
-        ClassBookAssignment.end_date == None
-    ).first()
+    existing = await db.scalar(
+        select(ClassBookAssignment).where(
+            ClassBookAssignment.class_id == class_id,
+            ClassBookAssignment.end_date == None
+        )
+    )
     if existing:
         raise HTTPException(
             status_code=400,
@@ -228,22 +254,28 @@ async def assign_book_to_class(
     
     db_assignment = ClassBookAssignment(**assignment.dict())
     db.add(db_assignment)
-    db.commit()
-    db.refresh(db_assignment)
+    await db.commit()
+    await db.refresh(db_assignment)
+    await db.refresh(db_assignment, ["book"])
+    if db_assignment.book:
+        await db.refresh(db_assignment.book, ["units"])
     return db_assignment
 
 
 @router.get("/classes/{class_id}/book", response_model=ClassBookAssignmentSchema)
+@cached_response("class_book_assignments", "books", "unit_contents", model=ClassBookAssignmentSchema)
 async def get_class_current_book(
     class_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     """Obter livro atual de uma turma"""
-    assignment = db.query(ClassBookAssignment).filter(
-        ClassBookAssignment.class_id == class_id,
-        ClassBookAssignment.end_date == None
-    ).first()
+    assignment = await db.scalar(
+        select(ClassBookAssignment).options(*ASSIGNMENT_OPTIONS).where(
+            ClassBookAssignment.class_id == class_id,
+            ClassBookAssignment.end_date == None
+        )
+    )
     
     if not assignment:
         raise HTTPException(status_code=404, detail="Turma não possui livro atribuído")
@@ -255,28 +287,29 @@ async def get_class_current_book(
 async def update_class_book_assignment(
     assignment_id: int,
     assignment: ClassBookAssignmentUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     """Atualizar atribuição de livro (ex: mudar unidade atual)"""
-    db_assignment = db.query(ClassBookAssignment).filter(
-        ClassBookAssignment.id == assignment_id
-    ).first()
+    db_assignment = await db.scalar(
+        select(ClassBookAssignment).options(*ASSIGNMENT_OPTIONS).where(
+            ClassBookAssignment.id == assignment_id
+        )
+    )
     if not db_assignment:
         raise HTTPException(status_code=404, detail="Atribuição não encontrada")
     
     # Verificar permissão
     if current_user.role == UserRole.TEACHER:
-        teacher = db.query(Teacher).filter(Teacher.user_id == current_user.id).first()
-        class_ = db.query(Class).filter(Class.id == db_assignment.class_id).first()
-        if not class_ or class_.teacher_id != teacher.id:
+        class_ = await db.scalar(select(Class).where(Class.id == db_assignment.class_id))
+        if not class_ or not current_user.teacher_id or class_.teacher_id != current_user.teacher_id:
             raise HTTPException(status_code=403, detail="Sem permissão")
     
     for key, value in assignment.dict(exclude_unset=True).items():
         setattr(db_assignment, key, value)
     
-    db.commit()
-    db.refresh(db_assignment)
+    await db.commit()
+    await db.refresh(db_assignment)
     return db_assignment
 
 
@@ -285,22 +318,21 @@ async def update_class_book_assignment(
 @router.post("/lesson-plans", response_model=LessonPlanSchema, status_code=status.HTTP_201_CREATED)
 async def create_lesson_plan(
     plan: LessonPlanCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     """Criar planejamento de aula"""
     # Verificar permissão
     if current_user.role == UserRole.TEACHER:
-        teacher = db.query(Teacher).filter(Teacher.user_id == current_user.id).first()
-        class_ = db.query(Class).filter(Class.id == plan.class_id).first()
-        if not class_ or class_.teacher_id != teacher.id:
+        class_ = await db.scalar(select(Class).where(Class.id == plan.class_id))
+        if not class_ or not current_user.teacher_id or class_.teacher_id != current_user.teacher_id:
             raise HTTPException(status_code=403, detail="Você não é professor desta turma")
     
     from datetime import date
     db_plan = LessonPlan(**plan.dict(), created_at=date.today())
     db.add(db_plan)
-    db.commit()
-    db.refresh(db_plan)
+    await db.commit()
+    await db.refresh(db_plan)
     return db_plan
 
 
@@ -308,25 +340,26 @@ async def create_lesson_plan(
 async def list_class_lesson_plans(
     class_id: int,
     unit_number: int = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     """Listar planejamentos de uma turma"""
-    query = db.query(LessonPlan).filter(LessonPlan.class_id == class_id)
+    query = select(LessonPlan).where(LessonPlan.class_id == class_id)
     if unit_number:
-        query = query.filter(LessonPlan.unit_number == unit_number)
-    plans = query.order_by(LessonPlan.created_at.desc()).all()
+        query = query.where(LessonPlan.unit_number == unit_number)
+    result = await db.execute(query.order_by(LessonPlan.created_at.desc()))
+    plans = result.scalars().all()
     return plans
 
 
 @router.get("/lesson-plans/{plan_id}", response_model=LessonPlanSchema)
 async def get_lesson_plan(
     plan_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     """Obter planejamento específico"""
-    plan = db.query(LessonPlan).filter(LessonPlan.id == plan_id).first()
+    plan = await db.scalar(select(LessonPlan).where(LessonPlan.id == plan_id))
     if not plan:
         raise HTTPException(status_code=404, detail="Planejamento não encontrado")
     return plan
@@ -336,46 +369,44 @@ async def get_lesson_plan(
 async def update_lesson_plan(
     plan_id: int,
     plan: LessonPlanUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     """Atualizar planejamento"""
-    db_plan = db.query(LessonPlan).filter(LessonPlan.id == plan_id).first()
+    db_plan = await db.scalar(select(LessonPlan).where(LessonPlan.id == plan_id))
     if not db_plan:
         raise HTTPException(status_code=404, detail="Planejamento não encontrado")
     
     # Verificar permissão
     if current_user.role == UserRole.TEACHER:
-        teacher = db.query(Teacher).filter(Teacher.user_id == current_user.id).first()
-        class_ = db.query(Class).filter(Class.id == db_plan.class_id).first()
-        if not class_ or class_.teacher_id != teacher.id:
+        class_ = await db.scalar(select(Class).where(Class.id == db_plan.class_id))
+        if not class_ or not current_user.teacher_id or class_.teacher_id != current_user.teacher_id:
             raise HTTPException(status_code=403, detail="Sem permissão")
     
     for key, value in plan.dict(exclude_unset=True).items():
         setattr(db_plan, key, value)
     
-    db.commit()
-    db.refresh(db_plan)
+    await db.commit()
+    await db.refresh(db_plan)
     return db_plan
 
 
 @router.delete("/lesson-plans/{plan_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_lesson_plan(
     plan_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     """Deletar planejamento"""
-    db_plan = db.query(LessonPlan).filter(LessonPlan.id == plan_id).first()
+    db_plan = await db.scalar(select(LessonPlan).where(LessonPlan.id == plan_id))
     if not db_plan:
         raise HTTPException(status_code=404, detail="Planejamento não encontrado")
     
     # Verificar permissão
     if current_user.role == UserRole.TEACHER:
-        teacher = db.query(Teacher).filter(Teacher.user_id == current_user.id).first()
-        class_ = db.query(Class).filter(Class.id == db_plan.class_id).first()
-        if not class_ or class_.teacher_id != teacher.id:
+        class_ = await db.scalar(select(Class).where(Class.id == db_plan.class_id))
+        if not class_ or not current_user.teacher_id or class_.teacher_id != current_user.teacher_id:
             raise HTTPException(status_code=403, detail="Sem permissão")
     
-    db.delete(db_plan)
-    db.commit()
+    await db.delete(db_plan)
+    await db.commit()
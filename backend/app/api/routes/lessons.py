@@ -1,10 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import func, select, delete
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from typing import List, Optional
 from datetime import date
-from app.core.database import get_db
-from app.api.dependencies import require_role
+from app.core.analytics import invalidate_attendance_analytics
+from app.core.database import get_async_db
+from app.core.pagination import fetch_page
+from app.core.summaries import lesson_student_pairs, refresh_enrollment_summaries
+from app.api.dependencies import require_role, Principal
 from app.models import User, UserRole, Lesson, Class, Teacher, Attendance, Student, Enrollment
 from app.schemas import LessonCreate, LessonResponse, LessonUpdate, AttendanceCreate, AttendanceResponse, BulkAttendanceCreate
 
@@ -13,45 +18,52 @@ router = APIRouter()
 
 @router.get("/", response_model=List[LessonResponse])
 async def list_lessons(
+    response: Response,
     class_id: int = None,
     date: date = None,
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY, UserRole.COORDINATOR, UserRole.TEACHER)),
+    skip: int = Query(0, ge=0, deprecated=True),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor da página anterior"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY, UserRole.COORDINATOR, UserRole.TEACHER)),
 ):
     """
-    Listar aulas com filtros opcionais
+    Listar aulas com filtros opcionais (por data; paginação por cursor via X-Next-Cursor)
     """
-    query = db.query(Lesson)
+    query = select(Lesson)
     
     if class_id:
-        query = query.filter(Lesson.class_id == class_id)
+        query = query.where(Lesson.class_id == class_id)
     
     if date:
-        query = query.filter(Lesson.date == date)
+        query = query.where(Lesson.date == date)
     
     # Teacher can only see lessons from their classes
     if current_user.role == UserRole.TEACHER:
-        teacher = db.query(Teacher).filter(Teacher.user_id == current_user.id).first()
-        if teacher:
-            query = query.join(Class).filter(Class.teacher_id == teacher.id)
+        if current_user.teacher_id:
+            query = query.join(Class).where(Class.teacher_id == current_user.teacher_id)
     
-    lessons = query.offset(skip).limit(limit).all()
-    return lessons
+    return await fetch_page(
+        db, query,
+        order_by=(Lesson.date, Lesson.id),
+        limit=limit,
+        cursor=cursor,
+        response=response,
+        skip=skip,
+    )
 
 
 @router.post("/", response_model=LessonResponse, status_code=status.HTTP_201_CREATED)
 async def create_lesson(
     lesson_data: LessonCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY, UserRole.COORDINATOR, UserRole.TEACHER)),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY, UserRole.COORDINATOR, UserRole.TEACHER)),
 ):
     """
     Criar nova aula
     """
     # Check if class exists
-    class_ = db.query(Class).filter(Class.id == lesson_data.class_id).first()
+    class_ = await db.scalar(select(Class).where(Class.id == lesson_data.class_id))
     if not class_:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -60,17 +72,25 @@ async def create_lesson(
     
     # Teacher can only create lessons for their classes
     if current_user.role == UserRole.TEACHER:
-        teacher = db.query(Teacher).filter(Teacher.user_id == current_user.id).first()
-        if not teacher or class_.teacher_id != teacher.id:
+        if not current_user.teacher_id or class_.teacher_id != current_user.teacher_id:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Você não tem permissão para criar aula nesta turma",
             )
     
+    existing_lesson = await db.scalar(
+        select(Lesson.id).where(Lesson.class_id == lesson_data.class_id, Lesson.date == lesson_data.date)
+    )
+    if existing_lesson:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Já existe uma aula desta turma nesta data",
+        )
+    
     new_lesson = Lesson(**lesson_data.dict())
     db.add(new_lesson)
-    db.commit()
-    db.refresh(new_lesson)
+    await db.commit()
+    await db.refresh(new_lesson)
     
     return new_lesson
 
@@ -79,13 +99,15 @@ async def create_lesson(
 async def update_lesson(
     lesson_id: int,
     lesson_data: LessonUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY, UserRole.COORDINATOR, UserRole.TEACHER)),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY, UserRole.COORDINATOR, UserRole.TEACHER)),
 ):
     """
     Atualizar dados de uma aula
     """
-    lesson = db.query(Lesson).filter(Lesson.id == lesson_id).first()
+    lesson = await db.scalar(
+        select(Lesson).options(joinedload(Lesson.class_)).where(Lesson.id == lesson_id)
+    )
     if not lesson:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -94,8 +116,7 @@ async def update_lesson(
     
     # Teacher can only edit lessons from their classes
     if current_user.role == UserRole.TEACHER:
-        teacher = db.query(Teacher).filter(Teacher.user_id == current_user.id).first()
-        if not teacher or lesson.class_.teacher_id != teacher.id:
+        if not current_user.teacher_id or lesson.class_.teacher_id != current_user.teacher_id:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Você não tem permissão para editar esta aula",
@@ -105,8 +126,8 @@ async def update_lesson(
     for field, value in update_data.items():
         setattr(lesson, field, value)
     
-    db.commit()
-    db.refresh(lesson)
+    await db.commit()
+    await db.refresh(lesson)
     
     return lesson
 
@@ -114,13 +135,15 @@ async def update_lesson(
 @router.delete("/{lesson_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_lesson(
     lesson_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY, UserRole.COORDINATOR, UserRole.TEACHER)),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY, UserRole.COORDINATOR, UserRole.TEACHER)),
 ):
     """
     Deletar uma aula
     """
-    lesson = db.query(Lesson).filter(Lesson.id == lesson_id).first()
+    lesson = await db.scalar(
+        select(Lesson).options(joinedload(Lesson.class_)).where(Lesson.id == lesson_id)
+    )
     if not lesson:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -129,40 +152,78 @@ async def delete_lesson(
     
     # Teacher can only delete lessons from their classes
     if current_user.role == UserRole.TEACHER:
-        teacher = db.query(Teacher).filter(Teacher.user_id == current_user.id).first()
-        if not teacher or lesson.class_.teacher_id != teacher.id:
+        if not current_user.teacher_id or lesson.class_.teacher_id != current_user.teacher_id:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Você não tem permissão para deletar esta aula",
             )
     
-    db.delete(lesson)
-    db.commit()
+    # Presenças e notas da aula deixam de contar nos resumos dos alunos
+    affected = await lesson_student_pairs(db, lesson)
+    await db.delete(lesson)
+    await refresh_enrollment_summaries(db, affected)
+    await db.commit()
+    invalidate_attendance_analytics(lesson.class_id)
     
     return None
 
 
+async def upsert_attendances(db: AsyncSession, rows: List[dict]) -> None:
+    """
+    Grava presenças com um único INSERT ... ON CONFLICT (lesson_id, student_id) DO UPDATE.
+    As colunas atualizadas no conflito são as presentes nas linhas (além da chave).
+    """
+    if not rows:
+        return
+
+    # Um aluno repetido na mesma aula faria o ON CONFLICT atualizar a linha duas vezes
+    unique_rows = list({(row["lesson_id"], row["student_id"]): row for row in rows}.values())
+
+    dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(Attendance).values(unique_rows)
+    update_columns = [key for key in unique_rows[0] if key not in ("lesson_id", "student_id")]
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Attendance.lesson_id, Attendance.student_id],
+        set_={key: stmt.excluded[key] for key in update_columns},
+    )
+    await db.execute(stmt)
+
+
 # Attendance endpoints
 @router.post("/attendance/", response_model=AttendanceResponse, status_code=status.HTTP_201_CREATED)
 async def create_attendance(
     attendance_data: AttendanceCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(UserRole.TEACHER, UserRole.DIRECTOR, UserRole.SECRETARY)),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_role(UserRole.TEACHER, UserRole.DIRECTOR, UserRole.SECRETARY)),
 ):
     """
     Registrar chamada (presença) de um aluno
     """
-    lesson = db.query(Lesson).filter(Lesson.id == attendance_data.lesson_id).first()
+    lesson = await db.scalar(select(Lesson).where(Lesson.id == attendance_data.lesson_id))
     if not lesson:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Aula não encontrada",
         )
     
+    existing = await db.scalar(
+        select(Attendance.id).where(
+            Attendance.lesson_id == attendance_data.lesson_id,
+            Attendance.student_id == attendance_data.student_id,
+        )
+    )
+    if existing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Presença já registrada para este aluno nesta aula",
+        )
+    
     new_attendance = Attendance(**attendance_data.dict())
     db.add(new_attendance)
-    db.commit()
-    db.refresh(new_attendance)
+    await refresh_enrollment_summaries(db, [(new_attendance.student_id, lesson.class_id)])
+    await db.commit()
+    invalidate_attendance_analytics(lesson.class_id)
+    await db.refresh(new_attendance)
     
     return new_attendance
 
@@ -170,11 +231,11 @@ async def create_attendance(
 @router.post("/attendance/bulk", status_code=status.HTTP_201_CREATED)
 async def create_bulk_attendances(
     attendances: List[AttendanceCreate],
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(UserRole.TEACHER, UserRole.DIRECTOR, UserRole.SECRETARY)),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_role(UserRole.TEACHER, UserRole.DIRECTOR, UserRole.SECRETARY)),
 ):
     """
-    Registrar múltiplas presenças de uma vez
+    Registrar múltiplas presenças de uma vez (presenças já existentes são atualizadas)
     """
     if not attendances:
         raise HTTPException(
@@ -184,85 +245,93 @@ async def create_bulk_attendances(
     
     # Verificar se a aula existe
     lesson_id = attendances[0].lesson_id
-    lesson = db.query(Lesson).filter(Lesson.id == lesson_id).first()
+    lesson = await db.scalar(select(Lesson).where(Lesson.id == lesson_id))
     if not lesson:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Aula não encontrada",
         )
     
-    # Criar todas as presenças
-    for attendance_data in attendances:
-        new_attendance = Attendance(**attendance_data.dict())
-        db.add(new_attendance)
-    
-    db.commit()
+    # Criar ou atualizar todas as presenças em um único statement
+    await upsert_attendances(db, [
+        {**attendance_data.dict(), "status": attendance_data.status.value}
+        for attendance_data in attendances
+    ])
+    await refresh_enrollment_summaries(db, [(att.student_id, lesson.class_id) for att in attendances])
+    await db.commit()
+    invalidate_attendance_analytics(lesson.class_id)
     return {"message": f"{len(attendances)} presenças registradas com sucesso"}
 
 
 @router.post("/bulk-attendance", status_code=status.HTTP_201_CREATED)
 async def create_bulk_attendance(
     attendance_data: BulkAttendanceCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(UserRole.TEACHER, UserRole.DIRECTOR, UserRole.SECRETARY)),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_role(UserRole.TEACHER, UserRole.DIRECTOR, UserRole.SECRETARY)),
 ):
     """
     Criar aula e registrar frequência de múltiplos alunos de uma vez
     """
     # Verificar se a turma existe
-    class_obj = db.query(Class).filter(Class.id == attendance_data.class_id).first()
+    class_obj = await db.scalar(select(Class).where(Class.id == attendance_data.class_id))
     if not class_obj:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Turma não encontrada"
         )
     
-    # Verificar se já existe uma aula nessa data para essa turma
-    existing_lesson = db.query(Lesson).filter(
-        Lesson.class_id == attendance_data.class_id,
-        Lesson.date == attendance_data.date
-    ).first()
+    # Criar a aula, se ainda não existir. A constraint única (class_id, date) decide entre
+    # duas primeiras chamadas simultâneas: a segunda não insere nada e usa a aula existente.
+    dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    lesson = await db.scalar(
+        dialect.insert(Lesson)
+        .values(class_id=attendance_data.class_id, date=attendance_data.date, notes=attendance_data.notes)
+        .on_conflict_do_nothing(index_elements=[Lesson.class_id, Lesson.date])
+        .returning(Lesson)
+    )
     
-    if existing_lesson:
-        # Se já existe, vamos atualizar as presenças e as observações
-        lesson = existing_lesson
+    if lesson is None:
+        # A aula já existe: o lock serializa reenvios simultâneos da mesma chamada
+        lesson = await db.scalar(
+            select(Lesson).where(
+                Lesson.class_id == attendance_data.class_id,
+                Lesson.date == attendance_data.date
+            ).with_for_update()
+        )
         if attendance_data.notes is not None:
             lesson.notes = attendance_data.notes
-            db.commit()
-        # Deletar presenças antigas
-        db.query(Attendance).filter(Attendance.lesson_id == lesson.id).delete()
-    else:
-        # Criar nova aula
-        lesson = Lesson(
-            class_id=attendance_data.class_id,
-            date=attendance_data.date,
-            notes=attendance_data.notes
-        )
-        db.add(lesson)
-        db.commit()
-        db.refresh(lesson)
     
-    # Criar registros de presença se não for "sem frequência"
-    if not attendance_data.without_attendance:
-        for att_record in attendance_data.attendances:
-            # Verificar se o aluno está matriculado na turma
-            enrollment = db.query(Enrollment).filter(
-                Enrollment.student_id == att_record.student_id,
+    # Apenas alunos com matrícula ativa na turma (uma consulta para toda a chamada)
+    enrolled_ids = set()
+    if not attendance_data.without_attendance and attendance_data.attendances:
+        enrolled_ids = set((await db.scalars(
+            select(Enrollment.student_id).where(
                 Enrollment.class_id == attendance_data.class_id,
-                Enrollment.is_active == True
-            ).first()
-            
-            if not enrollment:
-                continue  # Pular se o aluno não está matriculado
-            
-            attendance = Attendance(
-                lesson_id=lesson.id,
-                student_id=att_record.student_id,
-                status=att_record.status.value
+                Enrollment.is_active == True,
+                Enrollment.student_id.in_([att.student_id for att in attendance_data.attendances]),
             )
-            db.add(attendance)
-        
-        db.commit()
+        )).all())
+    
+    # Remover presenças de alunos que não fazem mais parte da chamada
+    stale = delete(Attendance).where(Attendance.lesson_id == lesson.id)
+    if enrolled_ids:
+        stale = stale.where(Attendance.student_id.not_in(enrolled_ids))
+    removed_ids = (await db.execute(stale.returning(Attendance.student_id))).scalars().all()
+    
+    # Criar ou atualizar as presenças dos alunos matriculados
+    await upsert_attendances(db, [
+        {"lesson_id": lesson.id, "student_id": att.student_id, "status": att.status.value}
+        for att in attendance_data.attendances
+        if att.student_id in enrolled_ids
+    ])
+    
+    await refresh_enrollment_summaries(db, [
+        (student_id, attendance_data.class_id) for student_id in {*enrolled_ids, *removed_ids}
+    ])
+    
+    # Aula, remoções, presenças e resumos em uma única transação
+    await db.commit()
+    invalidate_attendance_analytics(attendance_data.class_id)
     
     return {
         "message": "Frequência registrada com sucesso",
@@ -275,21 +344,24 @@ async def create_bulk_attendance(
 @router.get("/{lesson_id}/attendances", response_model=List[AttendanceResponse])
 async def list_attendances(
     lesson_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY, UserRole.COORDINATOR, UserRole.TEACHER)),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY, UserRole.COORDINATOR, UserRole.TEACHER)),
 ):
     """
     Listar chamadas de uma aula
     """
-    lesson = db.query(Lesson).filter(Lesson.id == lesson_id).first()
+    lesson = await db.scalar(select(Lesson).where(Lesson.id == lesson_id))
     if not lesson:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Aula não encontrada",
         )
     
-    attendances = db.query(Attendance).options(
-        joinedload(Attendance.student)
-    ).filter(Attendance.lesson_id == lesson_id).join(Student).order_by(Student.name).all()
+    result = await db.execute(
+        select(Attendance).options(
+            joinedload(Attendance.student)
+        ).where(Attendance.lesson_id == lesson_id).join(Student).order_by(Student.name)
+    )
+    attendances = result.scalars().all()
     return attendances
 
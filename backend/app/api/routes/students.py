@@ -1,38 +1,67 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from app.core.database import get_db
-from app.api.dependencies import require_role
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Response, UploadFile, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app.core.database import get_async_db
+from app.core.pagination import fetch_page
+from app.core.query_metrics import query_budget
+from app.core.reports import build_student_report, student_report_rows
+from app.core.search import search_students
+from app.core.student_import import import_students
+from app.api.dependencies import require_role, Principal
 from app.models import User, UserRole, Student
-from app.schemas import StudentCreate, StudentResponse, StudentUpdate
+from app.schemas import StudentCreate, StudentImportResult, StudentResponse, StudentUpdate, StudentReport
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[StudentResponse])
 async def list_students(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY, UserRole.COORDINATOR)),
+    response: Response,
+    skip: int = Query(0, ge=0, deprecated=True),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor da página anterior"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY, UserRole.COORDINATOR)),
 ):
     """
-    Listar todos os alunos
+    Listar todos os alunos (ordem alfabética, paginação por cursor via X-Next-Cursor)
     """
-    students = db.query(Student).filter(Student.is_active == True).order_by(Student.name).offset(skip).limit(limit).all()
-    return students
+    return await fetch_page(
+        db,
+        select(Student).where(Student.is_active == True),
+        order_by=(Student.name, Student.id),
+        limit=limit,
+        cursor=cursor,
+        response=response,
+        skip=skip,
+    )
+
+
+@router.get("/search", response_model=List[StudentResponse], dependencies=[Depends(query_budget(2))])
+async def search_students_endpoint(
+    q: str = Query(..., min_length=1, max_length=100, description="Nome, CPF, email ou responsável"),
+    limit: int = Query(20, ge=1, le=100),
+    include_inactive: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY, UserRole.COORDINATOR)),
+):
+    """
+    Buscar alunos (type-ahead): prefixo, sem acentos e aproximada
+    """
+    return await search_students(db, q, limit, include_inactive)
 
 
 @router.get("/{student_id}", response_model=StudentResponse)
 async def get_student(
     student_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY, UserRole.COORDINATOR, UserRole.TEACHER)),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY, UserRole.COORDINATOR, UserRole.TEACHER)),
 ):
     """
     Obter detalhes de um aluno específico
     """
-    student = db.query(Student).filter(Student.id == student_id).first()
+    student = await db.scalar(select(Student).where(Student.id == student_id))
     if not student:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -41,17 +70,47 @@ async def get_student(
     return student
 
 
+@router.get("/{student_id}/report", response_model=StudentReport, dependencies=[Depends(query_budget(3))])
+async def get_student_report(
+    student_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY, UserRole.COORDINATOR, UserRole.TEACHER)),
+):
+    """
+    Boletim do aluno: frequência por status e média ponderada por turma (uma consulta agregada).
+    Professores veem apenas as suas turmas.
+    """
+    student = await db.scalar(select(Student).where(Student.id == student_id))
+    if not student:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Aluno não encontrado",
+        )
+
+    teacher_id = None
+    if current_user.role == UserRole.TEACHER:
+        if not current_user.teacher_id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Você não tem permissão para acessar este aluno",
+            )
+        teacher_id = current_user.teacher_id
+
+    rows = await student_report_rows(db, student_id, teacher_id)
+    return build_student_report(student, rows)
+
+
 @router.post("/", response_model=StudentResponse, status_code=status.HTTP_201_CREATED)
 async def create_student(
     student_data: StudentCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY)),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY)),
 ):
     """
     Criar novo aluno
     """
     # Check if student with this CPF already exists
-    existing_student = db.query(Student).filter(Student.cpf == student_data.cpf).first()
+    existing_student = await db.scalar(select(Student).where(Student.cpf == student_data.cpf))
     if existing_student:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -60,7 +119,7 @@ async def create_student(
 
     # Check if student with this email already exists (if provided)
     if student_data.email:
-        existing_email = db.query(Student).filter(Student.email == student_data.email).first()
+        existing_email = await db.scalar(select(Student).where(Student.email == student_data.email))
         if existing_email:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -69,23 +128,39 @@ async def create_student(
 
     new_student = Student(**student_data.dict())
     db.add(new_student)
-    db.commit()
-    db.refresh(new_student)
+    await db.commit()
+    await db.refresh(new_student)
 
     return new_student
 
 
+@router.post("/import", response_model=StudentImportResult)
+async def import_students_file(
+    file: UploadFile = File(..., description="CSV (separado por vírgula ou ponto e vírgula) ou XLSX"),
+    update_existing: bool = Query(True, description="Atualizar alunos cujo CPF já está cadastrado"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY)),
+):
+    """
+    Importar alunos em lote a partir de uma planilha com cabeçalho
+    (nome/name e cpf obrigatórios; email, data_nascimento, telefone, endereco,
+    responsavel, telefone_responsavel opcionais).
+    As linhas são gravadas em lotes; as rejeitadas voltam no relatório de erros.
+    """
+    return await import_students(db, file, update_existing=update_existing)
+
+
 @router.put("/{student_id}", response_model=StudentResponse)
 async def update_student(
     student_id: int,
     student_data: StudentUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY)),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY)),
 ):
     """
     Atualizar dados de um aluno
     """
-    student = db.query(Student).filter(Student.id == student_id).first()
+    student = await db.scalar(select(Student).where(Student.id == student_id))
     if not student:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -96,8 +171,8 @@ async def update_student(
     for field, value in update_data.items():
         setattr(student, field, value)
 
-    db.commit()
-    db.refresh(student)
+    await db.commit()
+    await db.refresh(student)
 
     return student
 
@@ -105,13 +180,13 @@ async def update_student(
 @router.delete("/{student_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_student(
     student_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(UserRole.DIRECTOR)),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_role(UserRole.DIRECTOR)),
 ):
     """
     Desativar um aluno (soft delete)
     """
-    student = db.query(Student).filter(Student.id == student_id).first()
+    student = await db.scalar(select(Student).where(Student.id == student_id))
     if not student:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -119,6 +194,6 @@ async def delete_student(
         )
 
     student.is_active = False
-    db.commit()
+    await db.commit()
 
     return None
@@ -1,39 +1,54 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from app.core.database import get_db
-from app.core.security import get_password_hash
-from app.api.dependencies import require_role
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import List, Optional
+from app.core.database import get_async_db
+from app.core.pagination import fetch_page
+from app.core.security import get_password_hash_async
+from app.api.dependencies import conditional_etag, require_role, invalidate_cached_user, Principal
 from app.models import User, UserRole, Teacher
 from app.schemas import TeacherCreate, TeacherResponse, TeacherUpdate
 
 router = APIRouter()
 
 
-@router.get("/", response_model=List[TeacherResponse])
+@router.get("/", response_model=List[TeacherResponse], dependencies=[Depends(conditional_etag("teachers", "users"))])
 async def list_teachers(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY, UserRole.COORDINATOR)),
+    response: Response,
+    skip: int = Query(0, ge=0, deprecated=True),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor da página anterior"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY, UserRole.COORDINATOR)),
 ):
     """
-    Listar todos os professores
+    Listar todos os professores (paginação por cursor via X-Next-Cursor)
+    Responde 304 quando o If-None-Match confere com a ETag atual
     """
-    teachers = db.query(Teacher).offset(skip).limit(limit).all()
-    return teachers
+    return await fetch_page(
+        db,
+        select(Teacher).options(selectinload(Teacher.user)),
+        order_by=(Teacher.id,),
+        limit=limit,
+        cursor=cursor,
+        response=response,
+        skip=skip,
+    )
 
 
 @router.get("/{teacher_id}", response_model=TeacherResponse)
 async def get_teacher(
     teacher_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY, UserRole.COORDINATOR, UserRole.TEACHER)),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY, UserRole.COORDINATOR, UserRole.TEACHER)),
 ):
     """
     Obter detalhes de um professor específico
     """
-    teacher = db.query(Teacher).filter(Teacher.id == teacher_id).first()
+    teacher = await db.scalar(
+        select(Teacher).options(selectinload(Teacher.user)).where(Teacher.id == teacher_id)
+    )
     if not teacher:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -45,14 +60,14 @@ async def get_teacher(
 @router.post("/", response_model=TeacherResponse, status_code=status.HTTP_201_CREATED)
 async def create_teacher(
     teacher_data: TeacherCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY)),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY)),
 ):
     """
     Criar novo professor
     """
     # Check if user with this email already exists
-    existing_user = db.query(User).filter(User.email == teacher_data.user.email).first()
+    existing_user = await db.scalar(select(User).where(User.email == teacher_data.user.email))
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -60,7 +75,7 @@ async def create_teacher(
         )
 
     # Check if teacher with this CPF already exists
-    existing_teacher = db.query(Teacher).filter(Teacher.cpf == teacher_data.cpf).first()
+    existing_teacher = await db.scalar(select(Teacher).where(Teacher.cpf == teacher_data.cpf))
     if existing_teacher:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -68,7 +83,7 @@ async def create_teacher(
         )
 
     # Create user
-    hashed_password = get_password_hash(teacher_data.user.password)
+    hashed_password = await get_password_hash_async(teacher_data.user.password)
     new_user = User(
         name=teacher_data.user.name,
         email=teacher_data.user.email,
@@ -77,7 +92,7 @@ async def create_teacher(
         is_active=True,
     )
     db.add(new_user)
-    db.flush()
+    await db.flush()
 
     # Create teacher
     new_teacher = Teacher(
@@ -88,8 +103,9 @@ async def create_teacher(
         hire_date=teacher_data.hire_date,
     )
     db.add(new_teacher)
-    db.commit()
-    db.refresh(new_teacher)
+    await db.commit()
+    await db.refresh(new_teacher)
+    await db.refresh(new_teacher, ["user"])
 
     return new_teacher
 
@@ -98,13 +114,15 @@ async def create_teacher(
 async def update_teacher(
     teacher_id: int,
     teacher_data: TeacherUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY)),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_role(UserRole.DIRECTOR, UserRole.SECRETARY)),
 ):
     """
     Atualizar dados de um professor
     """
-    teacher = db.query(Teacher).filter(Teacher.id == teacher_id).first()
+    teacher = await db.scalar(
+        select(Teacher).options(selectinload(Teacher.user)).where(Teacher.id == teacher_id)
+    )
     if not teacher:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -115,8 +133,9 @@ async def update_teacher(
     for field, value in update_data.items():
         setattr(teacher, field, value)
 
-    db.commit()
-    db.refresh(teacher)
+    await db.commit()
+    await db.refresh(teacher)
+    invalidate_cached_user(teacher.user.email)
 
     return teacher
 
@@ -124,14 +143,16 @@ async def update_teacher(
 @router.delete("/{teacher_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_teacher(
     teacher_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(UserRole.DIRECTOR)),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_role(UserRole.DIRECTOR)),
 ):
     """
     Excluir permanentemente um professor (apenas Diretor)
     Remove o professor e suas turmas ficam sem professor atribuído
     """
-    teacher = db.query(Teacher).filter(Teacher.id == teacher_id).first()
+    teacher = await db.scalar(
+        select(Teacher).options(selectinload(Teacher.user)).where(Teacher.id == teacher_id)
+    )
     if not teacher:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -140,15 +161,18 @@ async def delete_teacher(
 
     # Remover professor das turmas (teacher_id = NULL)
     from app.models import Class
-    db.query(Class).filter(Class.teacher_id == teacher_id).update(
-        {"teacher_id": None},
-        synchronize_session=False
+    await db.execute(
+        update(Class)
+        .where(Class.teacher_id == teacher_id)
+        .values(teacher_id=None)
+        .execution_options(synchronize_session=False)
     )
 
     # Delete teacher and associated user
     user = teacher.user
-    db.delete(teacher)
-    db.delete(user)
-    db.commit()
+    await db.delete(teacher)
+    await db.delete(user)
+    await db.commit()
+    invalidate_cached_user(user.email)
 
     return None
@@ -0,0 +1,139 @@
+"""
+Análise de frequência por turma: taxas de falta acumulada e móvel por aluno
+(funções de janela) e mapa de faltas por dia da semana, com cache por turma
+"""
+from typing import Dict, List
+from sqlalchemy import Float, case, cast, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models import Attendance, Lesson, Student
+
+# Frequência mínima de 75%: acima de 25% de faltas o aluno está em risco
+DEFAULT_RISK_THRESHOLD = 0.25
+DEFAULT_ROLLING_WINDOW = 10  # últimas N aulas registradas do aluno
+
+_analytics_cache = TTLCache(ttl=settings.ANALYTICS_CACHE_TTL_SECONDS, maxsize=256)
+
+
+def invalidate_attendance_analytics(class_id: int) -> None:
+    """Chamado após gravar ou remover presenças/aulas de uma turma"""
+    _analytics_cache.delete(class_id)
+
+
+def _absent_flag():
+    # Atrasos contam como presença, como no boletim
+    return case((Attendance.status == "absent", 1), else_=0)
+
+
+async def _student_rates(db: AsyncSession, class_id: int, window: int) -> List[dict]:
+    marks = (
+        select(
+            Attendance.student_id.label("student_id"),
+            Lesson.date.label("date"),
+            Lesson.id.label("lesson_id"),
+            cast(_absent_flag(), Float).label("absent"),
+        )
+        .join(Lesson, Lesson.id == Attendance.lesson_id)
+        .where(Lesson.class_id == class_id)
+        .subquery()
+    )
+    by_student = {"partition_by": marks.c.student_id}
+    chronological = {**by_student, "order_by": (marks.c.date, marks.c.lesson_id)}
+    windowed = select(
+        marks.c.student_id,
+        func.avg(marks.c.absent).over(**chronological, rows=(-(window - 1), 0)).label("rolling_rate"),
+        func.avg(marks.c.absent).over(**by_student).label("absence_rate"),
+        func.sum(marks.c.absent).over(**by_student).label("absences"),
+        func.count().over(**by_student).label("recorded"),
+        func.row_number().over(
+            **by_student, order_by=(marks.c.date.desc(), marks.c.lesson_id.desc())
+        ).label("recency"),
+    ).subquery()
+
+    rows = (await db.execute(
+        select(windowed, Student.name.label("student_name"))
+        .join(Student, Student.id == windowed.c.student_id)
+        .where(windowed.c.recency == 1)
+    )).all()
+
+    return [
+        {
+            "student_id": row.student_id,
+            "student_name": row.student_name,
+            "lessons_recorded": row.recorded,
+            "absences": int(row.absences or 0),
+            "absence_rate": round(float(row.absence_rate or 0), 4),
+            "rolling_absence_rate": round(float(row.rolling_rate or 0), 4),
+        }
+        for row in rows
+    ]
+
+
+async def _weekday_heatmap(db: AsyncSession, class_id: int) -> List[dict]:
+    # Agregado por data no banco; o dia da semana é derivado em Python (portável entre bancos)
+    rows = (await db.execute(
+        select(
+            Lesson.date,
+            func.count(Attendance.id).label("records"),
+            func.sum(_absent_flag()).label("absences"),
+        )
+        .join(Lesson, Lesson.id == Attendance.lesson_id)
+        .where(Lesson.class_id == class_id)
+        .group_by(Lesson.date)
+    )).all()
+
+    weekdays: Dict[int, dict] = {}
+    for row in rows:
+        day = weekdays.setdefault(row.date.weekday(), {"lessons": 0, "records": 0, "absences": 0})
+        day["lessons"] += 1
+        day["records"] += row.records
+        day["absences"] += int(row.absences or 0)
+
+    return [
+        {
+            "weekday": weekday,
+            **day,
+            "absence_rate": round(day["absences"] / day["records"], 4) if day["records"] else None,
+        }
+        for weekday, day in sorted(weekdays.items())
+    ]
+
+
+async def class_attendance_analytics(
+    db: AsyncSession,
+    class_id: int,
+    window: int = DEFAULT_ROLLING_WINDOW,
+    threshold: float = DEFAULT_RISK_THRESHOLD,
+) -> dict:
+    """Taxas por aluno e mapa por dia da semana (cacheados); o limiar de risco é aplicado depois"""
+    # Uma entrada por turma, com os resultados de cada tamanho de janela já calculado
+    by_window = _analytics_cache.get(class_id)
+    if by_window is None:
+        by_window = {}
+        _analytics_cache.set(class_id, by_window)
+    cached = by_window.get(window)
+    if cached is None:
+        cached = {
+            "students": await _student_rates(db, class_id, window),
+            "weekdays": await _weekday_heatmap(db, class_id),
+        }
+        by_window[window] = cached
+
+    students = [
+        {
+            **student,
+            "at_risk": student["absence_rate"] > threshold or student["rolling_absence_rate"] > threshold,
+        }
+        for student in cached["students"]
+    ]
+    students.sort(key=lambda s: (-s["rolling_absence_rate"], -s["absence_rate"], s["student_name"]))
+
+    return {
+        "class_id": class_id,
+        "window": window,
+        "threshold": threshold,
+        "students": students,
+        "at_risk_count": sum(1 for s in students if s["at_risk"]),
+        "weekdays": cached["weekdays"],
+    }
@@ -0,0 +1,67 @@
+"""
+Disponibilidade de materiais: detecção de reservas sobrepostas
+Postgres usa tsrange + índice GiST; outros bancos (SQLite em testes) carregam as
+reservas do dia e consultam uma árvore de intervalos em memória
+"""
+from datetime import date, datetime, time
+from typing import List, Optional
+from sqlalchemy import func, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.intervals import IntervalIndex
+from app.models import MaterialReservation
+
+# Reservas com este status não ocupam o material
+CANCELLED_STATUS = "cancelled"
+
+# Limites [início, fim) como literal, para a expressão coincidir com a do índice
+HALF_OPEN = literal_column("'[)'")
+
+
+def _is_postgres(db: AsyncSession) -> bool:
+    return db.bind.dialect.name == "postgresql"
+
+
+async def lock_material(db: AsyncSession, material_name: str) -> None:
+    """
+    Serializa verificação + escrita de reservas do mesmo material até o fim da transação
+    (advisory lock no Postgres; SQLite já serializa escritas)
+    """
+    if _is_postgres(db):
+        await db.execute(select(func.pg_advisory_xact_lock(func.hashtext(material_name.strip().lower()))))
+
+
+async def find_conflicts(
+    db: AsyncSession,
+    material_name: str,
+    reservation_date: date,
+    start_time: time,
+    end_time: time,
+    exclude_id: Optional[int] = None,
+) -> List[MaterialReservation]:
+    """Reservas ativas do mesmo material (nome sem diferenciar maiúsculas) que se sobrepõem ao horário"""
+    query = select(MaterialReservation).where(
+        func.lower(MaterialReservation.material_name) == material_name.strip().lower(),
+        MaterialReservation.status != CANCELLED_STATUS,
+        MaterialReservation.end_time > MaterialReservation.start_time,
+    )
+    if exclude_id is not None:
+        query = query.where(MaterialReservation.id != exclude_id)
+
+    if _is_postgres(db):
+        # Mesma expressão do índice GiST idx_material_reservations_slot
+        slot = func.tsrange(
+            MaterialReservation.reservation_date + MaterialReservation.start_time,
+            MaterialReservation.reservation_date + MaterialReservation.end_time,
+            HALF_OPEN,
+        )
+        requested = func.tsrange(
+            datetime.combine(reservation_date, start_time),
+            datetime.combine(reservation_date, end_time),
+            HALF_OPEN,
+        )
+        query = query.where(slot.op("&&")(requested)).order_by(MaterialReservation.start_time)
+        return list((await db.scalars(query)).all())
+
+    reservations = (await db.scalars(query.where(MaterialReservation.reservation_date == reservation_date))).all()
+    index = IntervalIndex((r.start_time, r.end_time, r) for r in reservations)
+    return sorted(index.overlapping(start_time, end_time), key=lambda r: (r.start_time, r.id))
@@ -1,11 +1,84 @@
-from sqlalchemy import create_engine
+import logging
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 from app.core.config import settings
 
-engine = create_engine(settings.DATABASE_URL)
+logger = logging.getLogger(__name__)
+
+
+def get_async_database_url(url: str) -> str:
+    """Converte a URL síncrona do banco para o driver assíncrono equivalente"""
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    if url.startswith("postgresql://") or url.startswith("postgresql+psycopg2://"):
+        return "postgresql+asyncpg://" + url.split("://", 1)[1]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url.split("://", 1)[1]
+    return url
+
+
+def get_engine_options(url: str) -> dict:
+    """Parâmetros do pool de conexões definidos em Settings"""
+    options = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+    # SQLite (testes locais) não usa pool dimensionado
+    if not url.startswith("sqlite"):
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+        )
+    return options
+
+
+def get_pool_status(pool) -> dict:
+    """Retorna contadores do pool: conexões em uso, ociosas e overflow"""
+    if not isinstance(pool, QueuePool):
+        return {"pool": pool.status()}
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+    }
+
+
+def _watch_pool_saturation(engine, name: str):
+    """Registra um aviso quando todas as conexões do pool (incluindo overflow) estão em uso"""
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        pool = engine.pool
+        if not isinstance(pool, QueuePool):
+            return
+        if pool.checkedout() >= pool.size() + settings.DB_MAX_OVERFLOW:
+            logger.warning("Pool de conexões '%s' saturado: %s", name, get_pool_status(pool))
+
+
+# Engine síncrono: scripts (seed, reset) e migrações do Alembic
+engine = create_engine(settings.DATABASE_URL, **get_engine_options(settings.DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Engine assíncrono: rotas da API (não bloqueia o event loop)
+async_engine = create_async_engine(
+    get_async_database_url(settings.DATABASE_URL),
+    **get_engine_options(settings.DATABASE_URL),
+)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+_watch_pool_saturation(engine, "sync")
+_watch_pool_saturation(async_engine.sync_engine, "async")
+
 Base = declarative_base()
 
 
@@ -15,3 +88,16 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_pools_status() -> dict:
+    """Status dos pools síncrono e assíncrono"""
+    return {
+        "sync": get_pool_status(engine.pool),
+        "async": get_pool_status(async_engine.sync_engine.pool),
+    }
@@ -0,0 +1,178 @@
+"""
+Exportação de presenças e notas (CSV ou Parquet) em streaming
+As linhas vêm de um cursor no servidor (yield_per) e cada lote é convertido e enviado
+antes do próximo ser lido: a memória do worker não cresce com o tamanho da exportação.
+"""
+import csv
+import io
+from datetime import date
+from typing import AsyncIterator, List, Optional, Sequence, Tuple
+from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from app.core.database import AsyncSessionLocal
+from app.models import Assessment, Attendance, Class, Lesson, Student
+
+EXPORT_BATCH_SIZE = 2000  # linhas por lote do cursor (e por row group no Parquet)
+EXPORT_FORMATS = ("csv", "parquet")
+
+# (nome da coluna, expressão, tipo no Parquet)
+ATTENDANCE_COLUMNS = (
+    ("attendance_id", Attendance.id, "int"),
+    ("lesson_id", Lesson.id, "int"),
+    ("lesson_date", Lesson.date, "date"),
+    ("class_id", Class.id, "int"),
+    ("class_name", Class.name, "str"),
+    ("student_id", Student.id, "int"),
+    ("student_name", Student.name, "str"),
+    ("student_cpf", Student.cpf, "str"),
+    ("status", Attendance.status, "str"),
+    ("note", Attendance.note, "str"),
+)
+
+ASSESSMENT_COLUMNS = (
+    ("assessment_id", Assessment.id, "int"),
+    ("assessment_date", Assessment.assessment_date, "date"),
+    ("lesson_id", Lesson.id, "int"),
+    ("lesson_date", Lesson.date, "date"),
+    ("class_id", Class.id, "int"),
+    ("class_name", Class.name, "str"),
+    ("student_id", Student.id, "int"),
+    ("student_name", Student.name, "str"),
+    ("student_cpf", Student.cpf, "str"),
+    ("type", Assessment.type, "str"),
+    ("grade", Assessment.grade, "float"),
+    ("max_grade", Assessment.max_grade, "float"),
+    ("weight", Assessment.weight, "float"),
+    ("note", Assessment.note, "str"),
+)
+
+Columns = Sequence[Tuple[str, object, str]]
+
+
+def _export_query(model, columns: Columns, start_date: Optional[date], end_date: Optional[date], class_id: Optional[int]):
+    query = (
+        select(*(expression.label(name) for name, expression, _ in columns))
+        .select_from(model)
+        .join(Lesson, Lesson.id == model.lesson_id)
+        .join(Class, Class.id == Lesson.class_id)
+        .join(Student, Student.id == model.student_id)
+    )
+    if start_date:
+        query = query.where(Lesson.date >= start_date)
+    if end_date:
+        query = query.where(Lesson.date <= end_date)
+    if class_id:
+        query = query.where(Lesson.class_id == class_id)
+    return query.order_by(Lesson.date, Class.name, Student.name, model.id)
+
+
+def attendance_export_query(start_date=None, end_date=None, class_id=None):
+    return _export_query(Attendance, ATTENDANCE_COLUMNS, start_date, end_date, class_id)
+
+
+def assessment_export_query(start_date=None, end_date=None, class_id=None):
+    return _export_query(Assessment, ASSESSMENT_COLUMNS, start_date, end_date, class_id)
+
+
+async def _row_batches(query) -> AsyncIterator[List[tuple]]:
+    """
+    Lotes de linhas via cursor no servidor. A sessão é aberta aqui, e não recebida da rota:
+    as dependências com yield são encerradas antes de o corpo do streaming ser enviado.
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for batch in result.partitions():
+            yield [tuple(row) for row in batch]
+
+
+async def _csv_chunks(query, columns: Columns) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM para o Excel reconhecer UTF-8 (acentos nos nomes)
+    buffer.write("\ufeff")
+    writer.writerow([name for name, _, _ in columns])
+    async for batch in _row_batches(query):
+        writer.writerows(batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Destino do ParquetWriter que acumula os bytes escritos até serem enviados"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        # Posição absoluta: o rodapé do Parquet guarda os offsets dos row groups
+        return self._position
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def _arrow_schema(pa, columns: Columns):
+    types = {"int": pa.int64(), "str": pa.string(), "date": pa.date32(), "float": pa.float64()}
+    return pa.schema([(name, types[kind]) for name, _, kind in columns])
+
+
+async def _parquet_chunks(query, columns: Columns) -> AsyncIterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(pa, columns)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="snappy")
+    try:
+        async for batch in _row_batches(query):
+            # Um row group por lote do cursor
+            writer.write_table(pa.Table.from_pylist(
+                [dict(zip(schema.names, row)) for row in batch], schema=schema
+            ))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def ensure_export_format(export_format: str) -> None:
+    """Validado na rota, antes de iniciar o streaming (depois não há como responder 400)"""
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Formato inválido; use {' ou '.join(EXPORT_FORMATS)}",
+        )
+    if export_format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Exportação Parquet indisponível (pacote pyarrow não instalado); use csv",
+            )
+
+
+def export_response(query, columns: Columns, export_format: str, filename: str) -> StreamingResponse:
+    if export_format == "parquet":
+        body, media_type = _parquet_chunks(query, columns), "application/vnd.apache.parquet"
+    else:
+        body, media_type = _csv_chunks(query, columns), "text/csv; charset=utf-8"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format}"'},
+    )
@@ -0,0 +1,78 @@
+"""
+Estruturas de intervalos em memória (horários, reservas)
+"""
+from typing import Any, Iterable, List, Tuple
+
+
+class IntervalIndex:
+    """
+    Árvore de intervalos estática: intervalos ordenados pelo início, cada nó guarda
+    o maior fim da sua subárvore. Intervalos semiabertos [início, fim).
+    """
+
+    def __init__(self, intervals: Iterable[Tuple[Any, Any, Any]]):
+        self._items = sorted(intervals, key=lambda item: (item[0], item[1]))
+        self._max_end: List[Any] = [None] * len(self._items)
+        if self._items:
+            self._build(0, len(self._items) - 1)
+
+    def _build(self, lo: int, hi: int):
+        mid = (lo + hi) // 2
+        max_end = self._items[mid][1]
+        if lo < mid:
+            max_end = max(max_end, self._build(lo, mid - 1))
+        if mid < hi:
+            max_end = max(max_end, self._build(mid + 1, hi))
+        self._max_end[mid] = max_end
+        return max_end
+
+    def overlapping(self, start, end) -> List[Any]:
+        """Payloads dos intervalos que se sobrepõem a [start, end)"""
+        found: List[Any] = []
+        if self._items:
+            self._search(0, len(self._items) - 1, start, end, found)
+        return found
+
+    def _search(self, lo: int, hi: int, start, end, found: List[Any]) -> None:
+        if lo > hi:
+            return
+        mid = (lo + hi) // 2
+        # Nenhum intervalo desta subárvore termina depois de `start`
+        if self._max_end[mid] <= start:
+            return
+        self._search(lo, mid - 1, start, end, found)
+        item_start, item_end, payload = self._items[mid]
+        # À direita todos começam em item_start ou depois
+        if item_start >= end:
+            return
+        if start < item_end:
+            found.append(payload)
+        self._search(mid + 1, hi, start, end, found)
+
+
+def merge_intervals(intervals: Iterable[Tuple[Any, Any]]) -> List[Tuple[Any, Any]]:
+    """Une intervalos sobrepostos ou encostados, em ordem"""
+    merged: List[Tuple[Any, Any]] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def free_intervals(busy: Iterable[Tuple[Any, Any]], window_start, window_end) -> List[Tuple[Any, Any]]:
+    """Lacunas de [window_start, window_end) não cobertas por `busy`"""
+    gaps: List[Tuple[Any, Any]] = []
+    cursor = window_start
+    for start, end in merge_intervals(busy):
+        if end <= cursor:
+            continue
+        if start >= window_end:
+            break
+        if start > cursor:
+            gaps.append((cursor, start))
+        cursor = max(cursor, end)
+    if cursor < window_end:
+        gaps.append((cursor, window_end))
+    return gaps
@@ -0,0 +1,110 @@
+"""
+Paginação por cursor (keyset)
+O cursor é opaco para o cliente: base64 de um JSON com os valores da chave de ordenação
+"""
+import base64
+import json
+from datetime import date, datetime, time
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+from fastapi import HTTPException, Response, status
+from sqlalchemy import tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    if isinstance(value, time):
+        return {"t": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+        if "t" in value:
+            return time.fromisoformat(value["t"])
+    return value
+
+
+def encode_cursor(values: List[Any]) -> str:
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """Decodifica o cursor; 400 se estiver corrompido ou não tiver `size` valores"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(values, list) or len(values) != size:
+            raise ValueError
+        return [_decode_value(v) for v in values]
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor de paginação inválido",
+        )
+
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]) -> None:
+    """Informa o cursor da próxima página no header X-Next-Cursor (ausente na última página)"""
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+
+def keyset_after(columns: Sequence[Any], values: Sequence[Any], descending: bool = False):
+    """Condição (col1, col2, ...) > cursor (ou < em ordem decrescente) como row value"""
+    row = tuple_(*columns)
+    cursor_row = tuple_(*values)
+    return row < cursor_row if descending else row > cursor_row
+
+
+def split_page(rows: Sequence[Any], limit: int, key: Callable[[Any], List[Any]]) -> Tuple[List[Any], Optional[str]]:
+    """
+    Recebe limit + 1 linhas; devolve a página e o cursor da próxima
+    (None quando não há mais linhas)
+    """
+    page = list(rows[:limit])
+    if len(rows) > limit:
+        return page, encode_cursor(key(page[-1]))
+    return page, None
+
+
+async def fetch_page(
+    db,
+    query,
+    order_by: Sequence[Any],
+    limit: int,
+    cursor: Optional[str],
+    response: Response,
+    key: Optional[Callable[[Any], List[Any]]] = None,
+    skip: int = 0,
+    scalars: bool = True,
+) -> List[Any]:
+    """
+    Executa `query` paginada por cursor sobre `order_by` (chave estável terminando no id).
+    `key` extrai os valores da chave de um item; por padrão, os atributos de mesmo nome.
+    `skip` (offset) só é aplicado sem cursor, por compatibilidade com clientes antigos.
+    """
+    if cursor:
+        query = query.where(keyset_after(order_by, decode_cursor(cursor, len(order_by))))
+    elif skip:
+        query = query.offset(skip)
+
+    result = await db.execute(query.order_by(*order_by).limit(limit + 1))
+    rows = result.scalars().all() if scalars else result.all()
+
+    if key is None:
+        names = [column.key for column in order_by]
+        key = lambda item: [getattr(item, name) for name in names]
+
+    page, next_cursor = split_page(rows, limit, key)
+    set_next_cursor(response, next_cursor)
+    return page
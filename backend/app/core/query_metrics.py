@@ -0,0 +1,120 @@
+"""
+Instrumentação de consultas SQL por requisição
+Conta statements e tempo de banco via eventos de cursor do SQLAlchemy
+"""
+import logging
+import time
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStats:
+    """Estatísticas de banco de uma requisição"""
+
+    def __init__(self):
+        self.count = 0
+        self.db_time = 0.0  # segundos
+        self.budget: Optional[int] = None
+
+    @property
+    def over_budget(self) -> bool:
+        return self.budget is not None and self.count > self.budget
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """Rota executou mais consultas que o orçamento declarado (modo estrito)"""
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_start_time"].pop()
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.db_time += time.perf_counter() - started
+
+
+def instrument_engine(engine) -> None:
+    """Registra os eventos de cursor em um engine síncrono (ou no sync_engine de um AsyncEngine)"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def query_budget(max_queries: int):
+    """
+    Dependency que declara o orçamento de consultas da rota.
+    Uso: @router.get("/", dependencies=[Depends(query_budget(3))])
+    """
+    def set_budget():
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.budget = max_queries
+
+    return set_budget
+
+
+class QueryMetricsMiddleware:
+    """
+    Middleware ASGI: mede consultas e tempo por requisição, adiciona os headers
+    X-DB-Query-Count, X-DB-Time-Ms e X-Response-Time-Ms e registra uma linha de log.
+    Com QUERY_BUDGET_STRICT=True, exceder o orçamento da rota gera QueryBudgetExceeded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current_stats.set(stats)
+        started = time.perf_counter()
+
+        async def send_with_metrics(message):
+            if message["type"] == "http.response.start":
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                self._report(scope, message["status"], stats, elapsed_ms)
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-query-count", str(stats.count).encode()))
+                headers.append((b"x-db-time-ms", f"{stats.db_time * 1000:.1f}".encode()))
+                headers.append((b"x-response-time-ms", f"{elapsed_ms:.1f}".encode()))
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            _current_stats.reset(token)
+
+    @staticmethod
+    def _report(scope, status_code: int, stats: QueryStats, elapsed_ms: float) -> None:
+        route = scope.get("route")
+        path = getattr(route, "path", scope.get("path"))
+        logger.info(
+            "request method=%s path=%s status=%s queries=%d db_ms=%.1f total_ms=%.1f",
+            scope["method"], path, status_code, stats.count, stats.db_time * 1000, elapsed_ms,
+        )
+        if stats.over_budget:
+            message = (
+                f"{scope['method']} {path} executou {stats.count} consultas "
+                f"(orçamento: {stats.budget})"
+            )
+            if settings.QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
@@ -0,0 +1,214 @@
+"""
+Relatórios acadêmicos agregados no banco
+"""
+from collections import defaultdict
+from typing import List, Optional
+from sqlalchemy import case, func, select, union
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Assessment, Class, Enrollment, EnrollmentSummary, Lesson, Student
+
+# Escala da média ponderada (notas normalizadas por max_grade)
+GRADE_SCALE = 10.0
+
+
+def normalized_weighted_grade():
+    """grade / max_grade * weight (max_grade ausente ou zero vale GRADE_SCALE)"""
+    max_grade = func.coalesce(func.nullif(Assessment.max_grade, 0), GRADE_SCALE)
+    return Assessment.grade / max_grade * func.coalesce(Assessment.weight, 1.0)
+
+
+def weighted_average(weighted_sum: Optional[float], weight_total: Optional[float]) -> Optional[float]:
+    if not weight_total:
+        return None
+    return round(weighted_sum / weight_total * GRADE_SCALE, 2)
+
+
+def attendance_rate(present: int, late: int, recorded: int) -> Optional[float]:
+    """Atrasos contam como presença"""
+    if not recorded:
+        return None
+    return round((present + late) / recorded, 4)
+
+
+async def student_report_rows(db: AsyncSession, student_id: int, teacher_id: Optional[int] = None) -> List:
+    """
+    Uma linha por turma do aluno (matrícula, chamada ou avaliação) lida dos resumos
+    por matrícula (enrollment_summaries), em uma única consulta sem varrer o histórico
+    """
+    summary = EnrollmentSummary
+    enrollments = (
+        select(
+            Enrollment.class_id.label("class_id"),
+            func.max(case((Enrollment.is_active == True, 1), else_=0)).label("active"),
+        )
+        .where(Enrollment.student_id == student_id)
+        .group_by(Enrollment.class_id)
+        .subquery()
+    )
+    class_ids = union(
+        select(enrollments.c.class_id),
+        select(summary.class_id).where(summary.student_id == student_id),
+    ).subquery()
+
+    query = (
+        select(
+            Class.id.label("class_id"),
+            Class.name.label("class_name"),
+            enrollments.c.active,
+            func.coalesce(summary.present_count + summary.absent_count + summary.late_count, 0).label("recorded"),
+            func.coalesce(summary.present_count, 0).label("present"),
+            func.coalesce(summary.absent_count, 0).label("absent"),
+            func.coalesce(summary.late_count, 0).label("late"),
+            func.coalesce(summary.assessments_count, 0).label("assessments"),
+            summary.weight_sum.label("weight_total"),
+            summary.weighted_grade_sum.label("weighted_sum"),
+        )
+        .join(class_ids, class_ids.c.class_id == Class.id)
+        .outerjoin(enrollments, enrollments.c.class_id == Class.id)
+        .outerjoin(summary, (summary.class_id == Class.id) & (summary.student_id == student_id))
+        .order_by(Class.name, Class.id)
+    )
+    if teacher_id is not None:
+        query = query.where(Class.teacher_id == teacher_id)
+
+    return (await db.execute(query)).all()
+
+
+def build_student_report(student, rows) -> dict:
+    """Monta o relatório por turma e os totais gerais a partir das linhas agregadas"""
+    classes = []
+    totals = {"recorded": 0, "present": 0, "absent": 0, "late": 0, "assessments": 0}
+    weight_total = weighted_sum = 0.0
+    for row in rows:
+        for key in totals:
+            totals[key] += row._mapping[key]
+        weight_total += row.weight_total or 0
+        weighted_sum += row.weighted_sum or 0
+        classes.append({
+            "class_id": row.class_id,
+            "class_name": row.class_name,
+            "enrollment_active": None if row.active is None else bool(row.active),
+            "attendance_recorded": row.recorded,
+            "present": row.present,
+            "absent": row.absent,
+            "late": row.late,
+            "attendance_rate": attendance_rate(row.present, row.late, row.recorded),
+            "assessments_count": row.assessments,
+            "weighted_average": weighted_average(row.weighted_sum, row.weight_total),
+        })
+
+    return {
+        "student_id": student.id,
+        "student_name": student.name,
+        "attendance_recorded": totals["recorded"],
+        "present": totals["present"],
+        "absent": totals["absent"],
+        "late": totals["late"],
+        "attendance_rate": attendance_rate(totals["present"], totals["late"], totals["recorded"]),
+        "assessments_count": totals["assessments"],
+        "weighted_average": weighted_average(weighted_sum, weight_total),
+        "classes": classes,
+    }
+
+
+async def class_gradebook_rows(db: AsyncSession, class_id: int) -> List:
+    """
+    Alunos da turma (matrícula ativa ou com nota lançada) com suas avaliações, em uma consulta;
+    alunos sem avaliação aparecem com colunas de avaliação nulas
+    """
+    class_assessments = (
+        select(Assessment)
+        .join(Lesson, Lesson.id == Assessment.lesson_id)
+        .where(Lesson.class_id == class_id)
+        .subquery()
+    )
+    roster = union(
+        select(Enrollment.student_id.label("student_id")).where(
+            Enrollment.class_id == class_id, Enrollment.is_active == True
+        ),
+        select(class_assessments.c.student_id),
+    ).subquery()
+
+    query = (
+        select(
+            Student.id.label("student_id"),
+            Student.name.label("student_name"),
+            class_assessments.c.id.label("assessment_id"),
+            class_assessments.c.lesson_id,
+            class_assessments.c.type,
+            class_assessments.c.assessment_date,
+            class_assessments.c.grade,
+            class_assessments.c.max_grade,
+            class_assessments.c.weight,
+        )
+        .join(roster, roster.c.student_id == Student.id)
+        .outerjoin(class_assessments, class_assessments.c.student_id == Student.id)
+        .order_by(Student.name, Student.id, class_assessments.c.id)
+    )
+    return (await db.execute(query)).all()
+
+
+def build_gradebook(class_obj, rows) -> dict:
+    """
+    Pivota as linhas (aluno, avaliação) em uma matriz densa com médias e estatísticas.
+    Uma coluna reúne as avaliações de mesma data, aula, tipo, nota máxima e peso; a segunda
+    avaliação de um aluno com a mesma chave vai para outra coluna, então toda nota que entra
+    na média aparece na matriz.
+    """
+    students: dict = {}
+    occurrences: dict = defaultdict(int)
+    cells = []
+    for row in rows:
+        students.setdefault(row.student_id, row.student_name)
+        if row.lesson_id is None:
+            continue
+        max_grade = row.max_grade or GRADE_SCALE
+        weight = 1.0 if row.weight is None else row.weight
+        base = (row.assessment_date, row.lesson_id, row.type, max_grade, weight)
+        occurrence = occurrences[(row.student_id, base)]
+        occurrences[(row.student_id, base)] += 1
+        cells.append((row.student_id, (*base, occurrence), row))
+
+    student_ids = list(students)
+    student_index = {student_id: i for i, student_id in enumerate(student_ids)}
+    column_keys = sorted(
+        {key for _, key, _ in cells},
+        key=lambda k: (k[0] is None, k[0] or 0, k[1], k[2] or "", k[5], k[3], k[4]),
+    )
+    column_index = {key: j for j, key in enumerate(column_keys)}
+
+    grades: List[List[Optional[float]]] = [[None] * len(column_keys) for _ in student_ids]
+    weight_totals = [0.0] * len(student_ids)
+    weighted_sums = [0.0] * len(student_ids)
+    for student_id, key, row in cells:
+        i, j = student_index[student_id], column_index[key]
+        grades[i][j] = row.grade
+        if row.grade is not None:
+            max_grade, weight = key[3], key[4]
+            weight_totals[i] += weight
+            weighted_sums[i] += row.grade / max_grade * weight
+
+    assessments = []
+    for j, key in enumerate(column_keys):
+        values = [grades[i][j] for i in range(len(student_ids)) if grades[i][j] is not None]
+        max_grade, weight = key[3], key[4]
+        assessments.append({
+            "assessment_date": key[0],
+            "lesson_id": key[1],
+            "type": key[2],
+            "max_grade": max_grade,
+            "weight": weight,
+            "count": len(values),
+            "average": round(sum(values) / len(values), 2) if values else None,
+            "min": min(values) if values else None,
+            "max": max(values) if values else None,
+        })
+
+    return {
+        "class_id": class_obj.id,
+        "class_name": class_obj.name,
+        "students": [{"id": student_id, "name": students[student_id]} for student_id in student_ids],
+        "assessments": assessments,
+        "grades": grades,
+        "averages": [weighted_average(weighted_sums[i], weight_totals[i]) for i in range(len(student_ids))],
+    }
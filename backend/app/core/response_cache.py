@@ -0,0 +1,177 @@
+"""
+Cache de respostas de rotas GET, invalidado por entidade (tabela)
+Backends: memória (LRU com TTL, por worker) ou Redis (compartilhado entre workers).
+Cada entrada é chaveada pela URL, pelo escopo do usuário (role/professor) e pelas versões
+das tabelas lidas pela rota em table_versions, os mesmos contadores das ETags: um commit
+que grava em uma tabela incrementa a versão dela no banco e as entradas antigas deixam
+de ser encontradas em todos os workers, e cache e ETag nunca divergem.
+"""
+import functools
+import hashlib
+import inspect
+import json
+from typing import Any, Dict, Optional, Tuple
+from fastapi import Depends, Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.database import get_async_db
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.versions import VERSIONED_TABLES, request_table_versions
+
+# Headers definidos pela rota que fazem parte da resposta cacheada
+CACHED_HEADERS = (NEXT_CURSOR_HEADER,)
+
+CachedResponse = Tuple[bytes, Dict[str, str]]
+
+
+class MemoryCacheBackend:
+    """LRU com TTL no processo; entradas de versões antigas só saem pelo TTL ou pelo LRU"""
+
+    def __init__(self, maxsize: int):
+        self._entries = TTLCache(ttl=settings.RESPONSE_CACHE_TTL_SECONDS, maxsize=maxsize)
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        return self._entries.get(key)
+
+    async def set(self, key: str, value: CachedResponse, ttl: int) -> None:
+        self._entries.set(key, value, ttl)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+
+
+class RedisCacheBackend:
+    """
+    Backend compartilhado entre workers. Aceita qualquer cliente assíncrono compatível com
+    redis.asyncio (get, set com ex), como um substituto em memória nos testes.
+    """
+
+    def __init__(self, client, prefix: str = "response-cache"):
+        self.client = client
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        raw = await self.client.get(f"{self.prefix}:{key}")
+        if raw is None:
+            return None
+        data = json.loads(raw)
+        return data["body"].encode("utf-8"), data["headers"]
+
+    async def set(self, key: str, value: CachedResponse, ttl: int) -> None:
+        body, headers = value
+        raw = json.dumps({"body": body.decode("utf-8"), "headers": headers})
+        await self.client.set(f"{self.prefix}:{key}", raw, ex=ttl)
+
+    async def clear(self) -> None:
+        async for key in self.client.scan_iter(match=f"{self.prefix}:*"):
+            await self.client.delete(key)
+
+
+def _create_backend():
+    url = settings.RESPONSE_CACHE_URL
+    if not url:
+        return MemoryCacheBackend(maxsize=settings.RESPONSE_CACHE_MAXSIZE)
+    try:
+        from redis import asyncio as redis_asyncio
+    except ImportError as exc:
+        raise RuntimeError(
+            "RESPONSE_CACHE_URL configurado, mas o pacote 'redis' não está instalado (pip install redis)"
+        ) from exc
+    return RedisCacheBackend(redis_asyncio.from_url(url))
+
+
+_backend = None
+
+
+def get_response_cache():
+    global _backend
+    if _backend is None:
+        _backend = _create_backend()
+    return _backend
+
+
+def set_response_cache(backend) -> None:
+    """Troca o backend (ex.: cliente Redis de testes); None volta ao padrão das configurações"""
+    global _backend
+    _backend = backend
+
+
+# ---- Decorator das rotas GET ----
+
+def _cache_key(request: Request, current_user, versions: Dict[str, int]) -> str:
+    raw = json.dumps([
+        request.url.path,
+        sorted(request.query_params.multi_items()),
+        getattr(getattr(current_user, "role", None), "value", None),
+        getattr(current_user, "teacher_id", None),
+        sorted(versions.items()),
+    ], separators=(",", ":"))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def cached_response(*entities: str, model: Any, ttl: Optional[int] = None):
+    """
+    Cacheia o JSON da rota GET, por URL e escopo do usuário (parâmetro `current_user`).
+    `entities` são as tabelas lidas pela rota (precisam estar em VERSIONED_TABLES);
+    gravações nelas mudam a versão e, com ela, a chave da entrada.
+    `model` é o mesmo tipo do response_model, usado para serializar o resultado.
+    Uso:
+        @router.get("/", response_model=List[ClassResponse])
+        @cached_response("classes", "schedules", model=List[ClassResponse])
+        async def list_classes(...)
+    """
+    unversioned = set(entities) - VERSIONED_TABLES
+    if unversioned:
+        raise ValueError(f"Tabelas sem versão em VERSIONED_TABLES: {', '.join(sorted(unversioned))}")
+    adapter = TypeAdapter(model)
+
+    def decorator(endpoint):
+        signature = inspect.signature(endpoint)
+        extra = [
+            inspect.Parameter(name, inspect.Parameter.KEYWORD_ONLY, annotation=annotation, default=default)
+            for name, annotation, default in (
+                ("request", Request, inspect.Parameter.empty),
+                ("response", Response, inspect.Parameter.empty),
+                ("db", AsyncSession, Depends(get_async_db)),
+            )
+            if name not in signature.parameters
+        ]
+
+        @functools.wraps(endpoint)
+        async def wrapper(**kwargs):
+            request: Request = kwargs["request"]
+            response: Response = kwargs["response"]
+            call_kwargs = {name: value for name, value in kwargs.items() if name in signature.parameters}
+
+            backend = get_response_cache()
+            # Mesmas versões da ETag da requisição (lidas uma única vez)
+            versions = await request_table_versions(request, kwargs["db"], entities)
+            key = _cache_key(request, kwargs.get("current_user"), versions)
+
+            cached = await backend.get(key)
+            if cached is None:
+                result = await endpoint(**call_kwargs)
+                body = adapter.dump_json(adapter.validate_python(result, from_attributes=True))
+                headers = {name.lower(): response.headers[name] for name in CACHED_HEADERS if name in response.headers}
+                cached = (body, headers)
+                await backend.set(key, cached, settings.RESPONSE_CACHE_TTL_SECONDS if ttl is None else ttl)
+                status = "MISS"
+            else:
+                status = "HIT"
+
+            # Headers de dependências (ex.: ETag) não são mesclados quando a rota devolve um Response
+            body, headers = cached
+            merged = {
+                name: value for name, value in response.headers.items()
+                if name.lower() not in ("content-length", "content-type")
+            }
+            merged.update(headers)
+            merged["x-cache"] = status
+            return Response(content=body, media_type="application/json", headers=merged)
+
+        wrapper.__signature__ = signature.replace(parameters=[*signature.parameters.values(), *extra])
+        return wrapper
+
+    return decorator
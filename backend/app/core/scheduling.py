@@ -0,0 +1,257 @@
+"""
+Conflitos de horário entre turmas
+Índice de intervalos por dia da semana, separado por sala e por professor
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import String, column, func, or_, select, values
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.intervals import IntervalIndex, free_intervals
+from app.models import Class, Schedule
+
+WEEKDAY_NAMES = ("Segunda", "Terça", "Quarta", "Quinta", "Sexta", "Sábado", "Domingo")
+
+# Tabelas que definem a ocupação das salas (chave do índice de salas em cache)
+ROOM_TABLES = ("classes", "schedules")
+
+# Índice com os horários de todas as salas, por versão de ROOM_TABLES (por processo/worker)
+_room_index_cache = TTLCache(ttl=settings.RESPONSE_CACHE_TTL_SECONDS, maxsize=4)
+
+
+def room_key(room: Optional[str]) -> Optional[str]:
+    """Salas são comparadas sem diferenciar maiúsculas e espaços nas pontas"""
+    return room.strip().lower() if room and room.strip() else None
+
+
+@dataclass(frozen=True)
+class ScheduleSlot:
+    class_id: Optional[int]
+    class_name: str
+    teacher_id: Optional[int]
+    weekday: int
+    start_time: time
+    end_time: time
+    room: Optional[str]
+
+    def describe(self) -> str:
+        return (
+            f"{WEEKDAY_NAMES[self.weekday]} "
+            f"{self.start_time.strftime('%H:%M')}-{self.end_time.strftime('%H:%M')}"
+        )
+
+
+class ScheduleIndex:
+    """Árvores de intervalos por (dia, sala) e (dia, professor)"""
+
+    def __init__(self, slots: Iterable[ScheduleSlot]):
+        self._by_room: Dict[Tuple[int, str], List[ScheduleSlot]] = defaultdict(list)
+        self._by_teacher: Dict[Tuple[int, int], List[ScheduleSlot]] = defaultdict(list)
+        self._trees: Dict[tuple, IntervalIndex] = {}
+        for slot in slots:
+            self.add(slot)
+
+    def add(self, slot: ScheduleSlot) -> None:
+        if room_key(slot.room):
+            self._by_room[(slot.weekday, room_key(slot.room))].append(slot)
+            self._trees.pop(("room", slot.weekday, room_key(slot.room)), None)
+        if slot.teacher_id:
+            self._by_teacher[(slot.weekday, slot.teacher_id)].append(slot)
+            self._trees.pop(("teacher", slot.weekday, slot.teacher_id), None)
+
+    def _tree(self, kind: str, weekday: int, key) -> IntervalIndex:
+        tree_key = (kind, weekday, key)
+        if tree_key not in self._trees:
+            source = self._by_room if kind == "room" else self._by_teacher
+            self._trees[tree_key] = IntervalIndex(
+                (slot.start_time, slot.end_time, slot) for slot in source.get((weekday, key), [])
+            )
+        return self._trees[tree_key]
+
+    def busy_room(self, weekday: int, room: str) -> List[Tuple[time, time]]:
+        return [(s.start_time, s.end_time) for s in self._by_room.get((weekday, room_key(room)), [])]
+
+    def rooms(self) -> List[str]:
+        """Salas conhecidas (um nome por sala, o menor entre as grafias usadas)"""
+        names: Dict[str, str] = {}
+        for (_, key), slots in self._by_room.items():
+            for slot in slots:
+                name = slot.room.strip()
+                if key not in names or name < names[key]:
+                    names[key] = name
+        return sorted(names.values())
+
+    def free_rooms(self, weekday: int, start_time: time, end_time: time) -> List[str]:
+        """Salas conhecidas sem horário sobreposto a [start_time, end_time) no dia"""
+        return [
+            room for room in self.rooms()
+            if not self._tree("room", weekday, room_key(room)).overlapping(start_time, end_time)
+        ]
+
+    def busy_teacher(self, weekday: int, teacher_id: int) -> List[Tuple[time, time]]:
+        return [(s.start_time, s.end_time) for s in self._by_teacher.get((weekday, teacher_id), [])]
+
+    def conflicts(self, slot: ScheduleSlot) -> List[str]:
+        """Mensagens de conflito do horário com salas e professores já indexados"""
+        messages = []
+        if room_key(slot.room):
+            for other in self._tree("room", slot.weekday, room_key(slot.room)).overlapping(slot.start_time, slot.end_time):
+                messages.append(f"Sala {slot.room.strip()} ocupada pela turma {other.class_name} ({other.describe()})")
+        if slot.teacher_id:
+            for other in self._tree("teacher", slot.weekday, slot.teacher_id).overlapping(slot.start_time, slot.end_time):
+                messages.append(f"Professor já leciona na turma {other.class_name} ({other.describe()})")
+        return messages
+
+
+async def load_schedule_index(
+    db: AsyncSession,
+    weekdays: Sequence[int],
+    rooms: Sequence[str] = (),
+    teacher_id: Optional[int] = None,
+    exclude_class_id: Optional[int] = None,
+) -> ScheduleIndex:
+    """
+    Horários de turmas ativas nos dias informados que usam as salas ou o professor dados
+    (uma consulta, atendida pelos índices schedules(weekday, lower(trim(room))) e classes(teacher_id))
+    """
+    filters = []
+    keys = sorted({room_key(room) for room in rooms if room_key(room)})
+    if keys:
+        filters.append(func.lower(func.trim(Schedule.room)).in_(keys))
+    if teacher_id:
+        filters.append(Class.teacher_id == teacher_id)
+    if not filters or not weekdays:
+        return ScheduleIndex([])
+
+    query = (
+        select(Schedule, Class.name, Class.teacher_id)
+        .join(Class, Class.id == Schedule.class_id)
+        .where(
+            Class.is_active == True,
+            Schedule.weekday.in_(sorted(set(weekdays))),
+            or_(*filters),
+        )
+    )
+    if exclude_class_id is not None:
+        query = query.where(Schedule.class_id != exclude_class_id)
+
+    rows = (await db.execute(query)).all()
+    slots = [
+        ScheduleSlot(
+            class_id=schedule.class_id,
+            class_name=class_name,
+            teacher_id=class_teacher_id,
+            weekday=schedule.weekday,
+            start_time=schedule.start_time,
+            end_time=schedule.end_time,
+            room=schedule.room,
+        )
+        for schedule, class_name, class_teacher_id in rows
+    ]
+    return ScheduleIndex(slots)
+
+
+async def load_room_index(db: AsyncSession, versions: Dict[str, int]) -> ScheduleIndex:
+    """
+    Horários com sala de todas as turmas ativas, recarregados só quando classes/schedules
+    mudam de versão: sem varrer a tabela de horários a cada consulta de salas livres
+    """
+    key = tuple(sorted(versions.items()))
+    index = _room_index_cache.get(key)
+    if index is None:
+        rows = (await db.execute(
+            select(Schedule, Class.name)
+            .join(Class, Class.id == Schedule.class_id)
+            .where(Class.is_active == True, Schedule.room.isnot(None))
+        )).all()
+        index = ScheduleIndex(
+            ScheduleSlot(
+                class_id=schedule.class_id,
+                class_name=class_name,
+                teacher_id=None,
+                weekday=schedule.weekday,
+                start_time=schedule.start_time,
+                end_time=schedule.end_time,
+                room=schedule.room,
+            )
+            for schedule, class_name in rows
+        )
+        _room_index_cache.set(key, index)
+    return index
+
+
+async def lock_schedule_slots(db: AsyncSession, teacher_id: Optional[int], schedules: Sequence) -> None:
+    """
+    Serializa verificação + escrita de horários até o fim da transação (advisory locks no Postgres;
+    SQLite já serializa escritas): um lock por (dia, sala) e por (dia, professor), em ordem fixa
+    para que turmas salvas ao mesmo tempo não entrem em deadlock
+    """
+    if db.bind.dialect.name != "postgresql":
+        return
+    keys = set()
+    for schedule in schedules:
+        if room_key(schedule.room):
+            keys.add(f"schedule:room:{schedule.weekday}:{room_key(schedule.room)}")
+        if teacher_id:
+            keys.add(f"schedule:teacher:{schedule.weekday}:{teacher_id}")
+    if not keys:
+        return
+    # Uma única consulta: a varredura de VALUES segue a ordem da lista
+    locked = values(column("key", String), name="schedule_locks").data([(key,) for key in sorted(keys)])
+    await db.execute(select(func.pg_advisory_xact_lock(func.hashtext(locked.c.key))))
+
+
+async def find_schedule_conflicts(
+    db: AsyncSession,
+    class_name: str,
+    teacher_id: Optional[int],
+    schedules: Sequence,
+    class_id: Optional[int] = None,
+) -> List[str]:
+    """
+    Verifica os horários de uma turma (objetos com weekday, start_time, end_time, room)
+    contra as demais turmas ativas e entre si.
+    Os locks tomados aqui valem até o commit: grave os horários na mesma transação.
+    """
+    if not schedules:
+        return []
+
+    # Outra transação salvando a mesma sala/professor espera até este commit
+    await lock_schedule_slots(db, teacher_id, schedules)
+    index = await load_schedule_index(
+        db,
+        weekdays=[s.weekday for s in schedules],
+        rooms=[s.room for s in schedules if s.room],
+        teacher_id=teacher_id,
+        exclude_class_id=class_id,
+    )
+
+    messages = []
+    for schedule in schedules:
+        slot = ScheduleSlot(
+            class_id=class_id,
+            class_name=class_name,
+            teacher_id=teacher_id,
+            weekday=schedule.weekday,
+            start_time=schedule.start_time,
+            end_time=schedule.end_time,
+            room=schedule.room,
+        )
+        messages.extend(index.conflicts(slot))
+        # Horários repetidos na própria turma também conflitam
+        index.add(slot)
+    return messages
+
+
+def free_slots(busy: Iterable[Tuple[time, time]], day_start: time, day_end: time, min_minutes: int) -> List[Tuple[time, time]]:
+    """Lacunas livres do dia com pelo menos `min_minutes` minutos"""
+    def minutes(value: time) -> int:
+        return value.hour * 60 + value.minute
+
+    return [
+        (start, end) for start, end in free_intervals(busy, day_start, day_end)
+        if minutes(end) - minutes(start) >= min_minutes
+    ]
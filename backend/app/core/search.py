@@ -0,0 +1,138 @@
+"""
+Busca de alunos por nome, CPF, email e responsável
+Postgres: pg_trgm + unaccent com índice GIN sobre o documento de busca;
+outros bancos (SQLite em testes): índice de trigramas em memória
+"""
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import case, func, literal_column, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Student
+
+# Similaridade mínima (por palavra) para considerar um resultado aproximado
+FUZZY_THRESHOLD = 0.5
+
+# Termo só com dígitos e pontuação de CPF (123.456.789-00): busca pelos dígitos
+CPF_QUERY = re.compile(r"\d[\d.\-\s]*")
+
+SPACE = literal_column("' '")
+EMPTY = literal_column("''")
+
+
+def normalize_text(value: Optional[str]) -> str:
+    """Minúsculas e sem acentos: 'Conceição' -> 'conceicao'"""
+    if not value:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", value)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower().strip()
+
+
+def trigrams(value: str) -> Set[str]:
+    """Trigramas no estilo do pg_trgm: cada palavra com dois espaços antes e um depois"""
+    grams: Set[str] = set()
+    for word in value.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def student_search_document():
+    """Mesma expressão do índice GIN idx_students_search_trgm"""
+    return func.f_unaccent(func.lower(
+        Student.name + SPACE + Student.cpf
+        + SPACE + func.coalesce(Student.email, EMPTY)
+        + SPACE + func.coalesce(Student.guardian_name, EMPTY)
+    ))
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class StudentSearchIndex:
+    """Índice invertido de trigramas em memória (fallback fora do Postgres)"""
+
+    def __init__(self, students: Iterable[Student]):
+        self._docs: Dict[int, Tuple[str, str]] = {}
+        self._grams: Dict[str, Set[int]] = defaultdict(set)
+        for student in students:
+            name = normalize_text(student.name)
+            doc = " ".join(filter(None, [
+                name, student.cpf, normalize_text(student.email), normalize_text(student.guardian_name),
+            ]))
+            self._docs[student.id] = (name, doc)
+            for gram in trigrams(doc):
+                self._grams[gram].add(student.id)
+
+    def search(self, query: str, limit: int) -> List[int]:
+        """Ids ordenados: prefixo do nome, depois ocorrência exata, depois similaridade"""
+        term = normalize_text(query)
+        if not term:
+            return []
+        term_grams = trigrams(term)
+        hits: Dict[int, int] = defaultdict(int)
+        for gram in term_grams:
+            for student_id in self._grams.get(gram, ()):
+                hits[student_id] += 1
+
+        scored = []
+        for student_id, (name, doc) in self._docs.items():
+            similarity = hits.get(student_id, 0) / len(term_grams) if term_grams else 0
+            if name.startswith(term) or any(word.startswith(term) for word in doc.split()):
+                rank = 0
+            elif term in doc:
+                rank = 1
+            elif similarity >= FUZZY_THRESHOLD:
+                rank = 2
+            else:
+                continue
+            scored.append((rank, -similarity, name, student_id))
+
+        scored.sort()
+        return [student_id for *_, student_id in scored[:limit]]
+
+
+async def search_students(
+    db: AsyncSession,
+    query: str,
+    limit: int = 20,
+    include_inactive: bool = False,
+) -> List[Student]:
+    """Busca por prefixo, sem acentos e aproximada (erros de digitação)"""
+    term = query.strip()
+    if not term:
+        return []
+    if CPF_QUERY.fullmatch(term):
+        term = re.sub(r"\D", "", term)
+
+    base = select(Student)
+    if not include_inactive:
+        base = base.where(Student.is_active == True)
+
+    if db.bind.dialect.name == "postgresql":
+        document = student_search_document()
+        normalized = func.f_unaccent(func.lower(term))
+        contains = document.like(func.concat("%", func.f_unaccent(func.lower(_escape_like(term))), "%"))
+        name_prefix = func.f_unaccent(func.lower(Student.name)).like(
+            func.concat(func.f_unaccent(func.lower(_escape_like(term))), "%")
+        )
+        conditions = [contains, normalized.op("<%")(document)]
+        if term.isdigit():
+            conditions.append(Student.cpf.like(f"{term}%"))
+
+        result = await db.scalars(
+            base.where(or_(*conditions)).order_by(
+                case((name_prefix, 0), else_=1),
+                func.word_similarity(normalized, document).desc(),
+                Student.name,
+                Student.id,
+            ).limit(limit)
+        )
+        return list(result.all())
+
+    students = (await db.scalars(base)).all()
+    ids = StudentSearchIndex(students).search(term, limit)
+    by_id = {student.id: student for student in students}
+    return [by_id[student_id] for student_id in ids]
@@ -1,9 +1,18 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 import bcrypt
 from app.core.config import settings
 
+# Pool dedicado ao bcrypt: o hash libera o GIL, então threads não travam o event loop
+_password_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash",
+)
+_pending_password_tasks = 0
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifica se a senha em texto plano corresponde ao hash"""
@@ -15,11 +24,41 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 def get_password_hash(password: str) -> str:
     """Gera hash da senha usando bcrypt"""
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
     return hashed.decode('utf-8')
 
 
+async def _run_in_password_pool(func, *args):
+    global _pending_password_tasks
+    loop = asyncio.get_running_loop()
+    _pending_password_tasks += 1
+    try:
+        return await loop.run_in_executor(_password_executor, func, *args)
+    finally:
+        _pending_password_tasks -= 1
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password executado no pool de hash (uso nas rotas async)"""
+    return await _run_in_password_pool(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash executado no pool de hash (uso nas rotas async)"""
+    return await _run_in_password_pool(get_password_hash, password)
+
+
+def get_password_pool_status() -> dict:
+    """Tarefas de hash em execução e aguardando na fila"""
+    workers = settings.PASSWORD_HASH_WORKERS
+    return {
+        "workers": workers,
+        "running": min(_pending_password_tasks, workers),
+        "queued": max(_pending_password_tasks - workers, 0),
+    }
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -35,6 +74,20 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
+def get_user_token_claims(user) -> dict:
+    """
+    Claims do JWT para um usuário: identidade, role e id do professor.
+    "tv" é a versão dos tokens do usuário; tokens com versão antiga são rejeitados.
+    """
+    return {
+        "sub": user.email,
+        "uid": user.id,
+        "role": user.role.value if hasattr(user.role, "value") else user.role,
+        "tid": user.teacher.id if user.teacher else None,
+        "tv": user.token_version or 0,
+    }
+
+
 def decode_access_token(token: str):
     try:
         payload = jwt.decode(
@@ -0,0 +1,50 @@
+"""
+Estatísticas do dashboard administrativo
+Todos os contadores em uma única consulta, com cache por worker invalidado
+quando turmas, professores, alunos ou aulas são alterados
+"""
+from datetime import date
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.write_tracking import on_tables_committed
+from app.models import Class, Teacher, Student, Lesson
+
+# Tabelas cujas escritas alteram os contadores
+STATS_TABLES = frozenset(model.__tablename__ for model in (Class, Teacher, Student, Lesson))
+
+_stats_cache = TTLCache(ttl=settings.DASHBOARD_STATS_TTL_SECONDS, maxsize=4)
+
+
+def invalidate_dashboard_stats() -> None:
+    _stats_cache.clear()
+
+
+def dashboard_stats_query(today: date):
+    """SELECT com um subselect escalar por contador (um único round-trip)"""
+    return select(
+        select(func.count(Class.id)).where(Class.is_active == True).scalar_subquery().label("total_classes"),
+        select(func.count(Teacher.id)).scalar_subquery().label("total_teachers"),
+        select(func.count(Student.id)).where(Student.is_active == True).scalar_subquery().label("total_students"),
+        select(func.count(Lesson.id)).where(Lesson.date == today).scalar_subquery().label("total_lessons_today"),
+    )
+
+
+async def get_dashboard_stats(db: AsyncSession) -> dict:
+    # A chave inclui a data: "aulas de hoje" muda na virada do dia
+    today = date.today()
+    cached = _stats_cache.get(today)
+    if cached is not None:
+        return cached
+
+    row = (await db.execute(dashboard_stats_query(today))).one()
+    stats = {key: value or 0 for key, value in row._mapping.items()}
+    _stats_cache.set(today, stats)
+    return stats
+
+
+@on_tables_committed
+def _invalidate_after_commit(session, tables):
+    if tables & STATS_TABLES:
+        invalidate_dashboard_stats()
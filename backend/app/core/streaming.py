@@ -0,0 +1,28 @@
+"""
+Respostas JSON serializadas sob demanda (StreamingResponse)
+Evita montar a lista inteira e o JSON completo em memória antes de enviar
+"""
+from typing import Iterable
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+STREAM_CHUNK_SIZE = 200  # itens por bloco enviado
+
+
+def stream_json_array(items: Iterable[BaseModel]) -> StreamingResponse:
+    """Envia uma lista de modelos pydantic como array JSON, em blocos"""
+    def body():
+        yield b"["
+        chunk = []
+        first = True
+        for item in items:
+            chunk.append(item.model_dump_json().encode("utf-8"))
+            if len(chunk) >= STREAM_CHUNK_SIZE:
+                yield (b"" if first else b",") + b",".join(chunk)
+                first = False
+                chunk = []
+        if chunk:
+            yield (b"" if first else b",") + b",".join(chunk)
+        yield b"]"
+
+    return StreamingResponse(body(), media_type="application/json")
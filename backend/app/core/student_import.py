@@ -0,0 +1,278 @@
+"""
+Importação de alunos em lote (CSV ou XLSX)
+O arquivo é lido linha a linha e processado em lotes: validação, uma consulta de
+unicidade (CPF/email) por lote e um único INSERT ... ON CONFLICT (cpf) DO UPDATE
+"""
+import codecs
+import csv
+import itertools
+import re
+from datetime import date, datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from fastapi import HTTPException, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy import func, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.search import normalize_text
+from app.models import Student
+from app.schemas import StudentCreate
+
+IMPORT_CHUNK_SIZE = 500
+
+# Cabeçalhos aceitos (sem acentos, minúsculos) -> campo de StudentCreate
+HEADER_ALIASES = {
+    "name": "name", "nome": "name", "nome_completo": "name",
+    "email": "email", "e-mail": "email",
+    "cpf": "cpf",
+    "birth_date": "birth_date", "data_nascimento": "birth_date", "data_de_nascimento": "birth_date", "nascimento": "birth_date",
+    "phone": "phone", "telefone": "phone", "celular": "phone",
+    "address": "address", "endereco": "address",
+    "guardian_name": "guardian_name", "responsavel": "guardian_name", "nome_responsavel": "guardian_name",
+    "guardian_phone": "guardian_phone", "telefone_responsavel": "guardian_phone",
+}
+
+RowErrors = List[dict]
+
+
+def _field_for(header) -> Optional[str]:
+    key = re.sub(r"\s+", "_", normalize_text(str(header or "")))
+    return HEADER_ALIASES.get(key)
+
+
+def _clean(field: str, value):
+    """Normaliza valores vindos da planilha (CPF só com dígitos, datas dd/mm/aaaa)"""
+    if value is None:
+        return None
+    if field == "cpf":
+        if isinstance(value, (int, float)):
+            value = str(int(value)).zfill(11)
+        return re.sub(r"\D", "", str(value)) or None
+    if field == "birth_date":
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        text = str(value).strip()
+        if re.fullmatch(r"\d{2}/\d{2}/\d{4}", text):
+            day, month, year = text.split("/")
+            return f"{year}-{month}-{day}"
+        return text or None
+    text = str(value).strip()
+    if field == "email":
+        text = text.lower()
+    return text or None
+
+
+def _map_header(headers) -> Dict[int, str]:
+    columns = {}
+    for index, header in enumerate(headers):
+        field = _field_for(header)
+        if field and field not in columns.values():
+            columns[index] = field
+    missing = {"name", "cpf"} - set(columns.values())
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Colunas obrigatórias ausentes no arquivo: {', '.join(sorted(missing))}",
+        )
+    return columns
+
+
+def _detect_encoding(head: bytes) -> str:
+    """UTF-8, ou Windows-1252 para CSVs salvos pelo Excel em português"""
+    try:
+        head.decode("utf-8")
+    except UnicodeDecodeError as exc:
+        # Um caractere multibyte cortado no fim da amostra não indica outra codificação
+        if exc.start < len(head) - 3:
+            return "cp1252"
+    return "utf-8-sig"
+
+
+def _iter_csv(upload: UploadFile) -> Iterator[Tuple[int, list]]:
+    head = upload.file.read(64 * 1024)
+    encoding = _detect_encoding(head)
+    try:
+        dialect = csv.Sniffer().sniff(head.decode(encoding, errors="ignore")[:4096], delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    # Reinicia a leitura depois da amostra usada para detectar codificação e separador
+    upload.file.seek(0)
+    text = codecs.getreader(encoding)(upload.file, errors="replace")
+    for line_number, values in enumerate(csv.reader(text, dialect), start=1):
+        yield line_number, values
+
+
+def _iter_xlsx(upload: UploadFile) -> Iterator[Tuple[int, list]]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Importação de XLSX indisponível (pacote openpyxl não instalado); envie um CSV",
+        )
+    # read_only lê a planilha sob demanda, sem carregar todas as células
+    workbook = load_workbook(upload.file, read_only=True, data_only=True)
+    try:
+        for line_number, values in enumerate(workbook.active.iter_rows(values_only=True), start=1):
+            yield line_number, list(values)
+    finally:
+        workbook.close()
+
+
+def iter_student_rows(upload: UploadFile) -> Iterator[Tuple[int, dict]]:
+    """(número da linha no arquivo, campos do aluno) para cada linha não vazia"""
+    filename = (upload.filename or "").lower()
+    rows = _iter_xlsx(upload) if filename.endswith(".xlsx") else _iter_csv(upload)
+
+    columns = None
+    for line_number, values in rows:
+        if not any(value not in (None, "") for value in values):
+            continue
+        if columns is None:
+            columns = _map_header(values)
+            continue
+        yield line_number, {
+            field: _clean(field, values[index] if index < len(values) else None)
+            for index, field in columns.items()
+        }
+
+    if columns is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Arquivo vazio",
+        )
+
+
+def _validation_messages(exc: ValidationError) -> List[str]:
+    return [f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in exc.errors()]
+
+
+class StudentImporter:
+    """Acumula linhas válidas e grava em lotes; linhas rejeitadas vão para `errors`"""
+
+    def __init__(self, db: AsyncSession, update_existing: bool = True):
+        self.db = db
+        self.update_existing = update_existing
+        self.total_rows = 0
+        self.created = 0
+        self.updated = 0
+        self.errors: RowErrors = []
+        self._chunk: List[Tuple[int, StudentCreate]] = []
+        # CPF/email já vistos no arquivo -> linha (duplicatas dentro do próprio arquivo)
+        self._seen_cpfs: Dict[str, int] = {}
+        self._seen_emails: Dict[str, int] = {}
+
+    def _reject(self, line_number: int, cpf: Optional[str], messages: List[str]) -> None:
+        self.errors.append({"row": line_number, "cpf": cpf, "errors": messages})
+
+    async def add(self, line_number: int, raw: dict) -> None:
+        self.total_rows += 1
+        try:
+            student = StudentCreate(**raw)
+        except ValidationError as exc:
+            self._reject(line_number, raw.get("cpf"), _validation_messages(exc))
+            return
+
+        messages = []
+        if student.cpf in self._seen_cpfs:
+            messages.append(f"CPF repetido no arquivo (linha {self._seen_cpfs[student.cpf]})")
+        if student.email and student.email in self._seen_emails:
+            messages.append(f"Email repetido no arquivo (linha {self._seen_emails[student.email]})")
+        if messages:
+            self._reject(line_number, student.cpf, messages)
+            return
+
+        self._seen_cpfs[student.cpf] = line_number
+        if student.email:
+            self._seen_emails[student.email] = line_number
+        self._chunk.append((line_number, student))
+        if len(self._chunk) >= IMPORT_CHUNK_SIZE:
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Grava o lote atual: uma consulta de unicidade + um upsert + commit"""
+        chunk, self._chunk = self._chunk, []
+        if not chunk:
+            return
+
+        cpfs = [student.cpf for _, student in chunk]
+        emails = [student.email for _, student in chunk if student.email]
+        conditions = [Student.cpf.in_(cpfs)]
+        if emails:
+            conditions.append(Student.email.in_(emails))
+        existing = (await self.db.execute(
+            select(Student.cpf, Student.email).where(or_(*conditions))
+        )).all()
+        existing_cpfs = {row.cpf for row in existing}
+        email_owner = {row.email: row.cpf for row in existing if row.email}
+
+        rows = []
+        for line_number, student in chunk:
+            if student.cpf in existing_cpfs and not self.update_existing:
+                self._reject(line_number, student.cpf, ["CPF já cadastrado"])
+                continue
+            owner = email_owner.get(student.email) if student.email else None
+            if owner is not None and owner != student.cpf:
+                self._reject(line_number, student.cpf, ["Email já cadastrado para outro aluno"])
+                continue
+            rows.append((line_number, student))
+        if not rows:
+            return
+
+        values = [student.dict() for _, student in rows]
+        dialect = postgresql if self.db.bind.dialect.name == "postgresql" else sqlite
+        stmt = dialect.insert(Student).values(values)
+        # Células vazias não apagam dados já cadastrados do aluno
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Student.cpf],
+            set_={
+                column: func.coalesce(stmt.excluded[column], Student.__table__.c[column])
+                for column in values[0] if column != "cpf"
+            },
+        )
+        try:
+            await self.db.execute(stmt)
+            await self.db.commit()
+        except IntegrityError:
+            # Conflito com gravação concorrente (ex.: email cadastrado entre a consulta e o upsert)
+            await self.db.rollback()
+            for line_number, student in rows:
+                self._reject(line_number, student.cpf, ["Conflito ao gravar o lote; reenvie estas linhas"])
+            return
+
+        updated = sum(1 for _, student in rows if student.cpf in existing_cpfs)
+        self.updated += updated
+        self.created += len(rows) - updated
+
+    def result(self) -> dict:
+        self.errors.sort(key=lambda error: error["row"])
+        return {
+            "total_rows": self.total_rows,
+            "created": self.created,
+            "updated": self.updated,
+            "failed": len(self.errors),
+            "errors": self.errors,
+        }
+
+
+def _next_rows(rows: Iterator[Tuple[int, dict]], size: int) -> List[Tuple[int, dict]]:
+    return list(itertools.islice(rows, size))
+
+
+async def import_students(db: AsyncSession, upload: UploadFile, update_existing: bool = True) -> dict:
+    importer = StudentImporter(db, update_existing=update_existing)
+    rows = iter_student_rows(upload)
+    # Leitura e parse do arquivo (CSV ou XLSX) em uma thread, um lote por vez:
+    # o event loop fica livre enquanto a planilha é lida
+    while True:
+        batch = await run_in_threadpool(_next_rows, rows, IMPORT_CHUNK_SIZE)
+        if not batch:
+            break
+        for line_number, raw in batch:
+            await importer.add(line_number, raw)
+    await importer.flush()
+    return importer.result()
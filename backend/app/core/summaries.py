@@ -0,0 +1,157 @@
+"""
+Resumo por matrícula (aluno, turma): contagens de presença, soma ponderada das notas
+e data da última aula, para que os relatórios não precisem varrer todo o histórico.
+As rotas de chamada e de avaliações recalculam os pares afetados na mesma transação,
+serializadas por par com um advisory lock (escritas concorrentes no mesmo par não se perdem);
+rebuild_enrollment_summaries() refaz a tabela inteira (backfill).
+"""
+from typing import Iterable, List, Set, Tuple
+from sqlalchemy import (
+    Float, Integer, case, cast, column, delete, func, insert, literal, null, select, tuple_, union_all, values,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.reports import normalized_weighted_grade
+from app.models import Assessment, Attendance, EnrollmentSummary, Lesson
+
+Pair = Tuple[int, int]  # (student_id, class_id)
+
+COUNTER_COLUMNS = (
+    "present_count", "absent_count", "late_count", "assessments_count",
+    "weighted_grade_sum", "weight_sum", "last_lesson_date",
+)
+
+
+def _status_flag(status: str):
+    return case((Attendance.status == status, 1), else_=0)
+
+
+def summary_source_query(pairs: Iterable[Pair] = ()):
+    """
+    Agregado (student_id, class_id, contadores...) a partir de presenças e avaliações,
+    restrito aos pares informados (todos, se vazio)
+    """
+    pairs = sorted(set(pairs))
+    attendance = (
+        select(
+            Attendance.student_id.label("student_id"),
+            Lesson.class_id.label("class_id"),
+            _status_flag("present").label("present"),
+            _status_flag("absent").label("absent"),
+            _status_flag("late").label("late"),
+            literal(0).label("assessments"),
+            cast(literal(0.0), Float).label("weighted"),
+            cast(literal(0.0), Float).label("weight"),
+            Lesson.date.label("lesson_date"),
+        )
+        .join(Lesson, Lesson.id == Attendance.lesson_id)
+    )
+    grades = (
+        select(
+            Assessment.student_id,
+            Lesson.class_id,
+            literal(0), literal(0), literal(0),
+            literal(1),
+            cast(normalized_weighted_grade(), Float),
+            cast(func.coalesce(Assessment.weight, 1.0), Float),
+            null(),
+        )
+        .join(Lesson, Lesson.id == Assessment.lesson_id)
+        .where(Assessment.grade.isnot(None))
+    )
+    if pairs:
+        attendance = attendance.where(tuple_(Attendance.student_id, Lesson.class_id).in_(pairs))
+        grades = grades.where(tuple_(Assessment.student_id, Lesson.class_id).in_(pairs))
+
+    rows = union_all(attendance, grades).subquery()
+    return (
+        select(
+            rows.c.student_id,
+            rows.c.class_id,
+            func.sum(rows.c.present).label("present_count"),
+            func.sum(rows.c.absent).label("absent_count"),
+            func.sum(rows.c.late).label("late_count"),
+            func.sum(rows.c.assessments).label("assessments_count"),
+            func.sum(rows.c.weighted).label("weighted_grade_sum"),
+            func.sum(rows.c.weight).label("weight_sum"),
+            func.max(rows.c.lesson_date).label("last_lesson_date"),
+        )
+        .where(rows.c.student_id.isnot(None), rows.c.class_id.isnot(None))
+        .group_by(rows.c.student_id, rows.c.class_id)
+    )
+
+
+async def lock_summary_pairs(db: AsyncSession, pairs: Iterable[Pair]) -> None:
+    """
+    Serializa o recálculo por par (aluno, turma) até o fim da transação (Postgres).
+    Quem espera o lock só agrega depois do commit da outra transação e, em READ COMMITTED,
+    enxerga as linhas dela. Ordem fixa dos pares evita deadlock entre escritas em lote.
+    """
+    if db.bind.dialect.name != "postgresql":
+        return
+    # Uma única consulta: a varredura de VALUES segue a ordem da lista
+    locked = values(
+        column("student_id", Integer), column("class_id", Integer), name="locked_pairs",
+    ).data(sorted(pairs))
+    await db.execute(select(func.pg_advisory_xact_lock(locked.c.student_id, locked.c.class_id)))
+
+
+async def refresh_enrollment_summaries(db: AsyncSession, pairs: Iterable[Pair]) -> None:
+    """
+    Recalcula os resumos dos pares (aluno, turma) afetados por uma escrita:
+    uma consulta agregada restrita aos pares + um upsert (e remoção dos que ficaram vazios).
+    Deve ser chamada antes do commit, na mesma transação da escrita.
+    """
+    pairs: Set[Pair] = {(s, c) for s, c in pairs if s is not None and c is not None}
+    if not pairs:
+        return
+
+    # Sem o lock, duas transações no mesmo par agregariam sem ver a escrita uma da outra
+    # e a última a gravar sobrescreveria o resumo com contagens incompletas
+    await lock_summary_pairs(db, pairs)
+    # A sessão assíncrona não usa autoflush: objetos adicionados precisam ir ao banco antes do agregado
+    await db.flush()
+    rows = [dict(row._mapping) for row in (await db.execute(summary_source_query(pairs))).all()]
+
+    empty = pairs - {(row["student_id"], row["class_id"]) for row in rows}
+    if empty:
+        await db.execute(
+            delete(EnrollmentSummary).where(
+                tuple_(EnrollmentSummary.student_id, EnrollmentSummary.class_id).in_(sorted(empty))
+            )
+        )
+
+    if rows:
+        dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+        stmt = dialect.insert(EnrollmentSummary).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[EnrollmentSummary.student_id, EnrollmentSummary.class_id],
+            set_={
+                **{column: stmt.excluded[column] for column in COUNTER_COLUMNS},
+                "updated_at": func.now(),
+            },
+        )
+        await db.execute(stmt)
+
+
+async def lesson_student_pairs(db: AsyncSession, lesson) -> List[Pair]:
+    """Pares (aluno, turma) com presença ou avaliação na aula (antes de removê-la)"""
+    student_ids = union_all(
+        select(Attendance.student_id).where(Attendance.lesson_id == lesson.id),
+        select(Assessment.student_id).where(Assessment.lesson_id == lesson.id),
+    )
+    return [(student_id, lesson.class_id) for student_id in (await db.scalars(student_ids)).all()]
+
+
+async def rebuild_enrollment_summaries(db: AsyncSession) -> int:
+    """Refaz toda a tabela a partir do histórico (INSERT ... SELECT); retorna o número de pares"""
+    source = summary_source_query()
+    await db.execute(delete(EnrollmentSummary))
+    await db.execute(
+        insert(EnrollmentSummary).from_select(
+            ["student_id", "class_id", *COUNTER_COLUMNS],
+            source,
+        )
+    )
+    await db.commit()
+    return await db.scalar(select(func.count()).select_from(EnrollmentSummary))
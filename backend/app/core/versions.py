@@ -0,0 +1,87 @@
+"""
+Versões por tabela (contador de escritas) para ETags de listagens
+Escritas via Session (flush de objetos ou update/delete/insert em massa) incrementam a
+versão das tabelas monitoradas logo após o commit, em uma transação curta e separada:
+a linha do contador fica bloqueada só durante o incremento, não durante a escrita.
+Qualquer worker lê a mesma versão.
+"""
+import hashlib
+import json
+import logging
+from typing import Dict, Iterable, Sequence, Set
+from fastapi import Request
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.write_tracking import on_tables_committed
+from app.models import TableVersion
+
+logger = logging.getLogger(__name__)
+
+# Tabelas lidas pelas listagens com ETag e pelas rotas com cache de respostas
+VERSIONED_TABLES = frozenset({
+    "books", "unit_contents", "users", "teachers", "classes", "schedules", "enrollments",
+    "class_book_assignments",
+})
+
+
+def _bump_versions(engine, tables: Set[str]) -> None:
+    dialect = postgresql if engine.dialect.name == "postgresql" else sqlite
+    # Ordem fixa: transações concorrentes bloqueiam as linhas na mesma sequência
+    stmt = dialect.insert(TableVersion).values([{"name": name, "version": 1} for name in sorted(tables)])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[TableVersion.name],
+        set_={"version": TableVersion.version + 1},
+    )
+    with engine.begin() as connection:
+        connection.execute(stmt)
+
+
+@on_tables_committed
+def _bump_after_commit(session, tables):
+    changed = tables & VERSIONED_TABLES
+    if not changed:
+        return
+    # Entre o commit e o incremento, uma leitura pode ver dados novos com a ETag antiga;
+    # a ETag muda logo em seguida e o cliente busca a listagem de novo
+    try:
+        _bump_versions(session.get_bind().engine, changed)
+    except Exception:
+        # A escrita já foi confirmada: não transforma a requisição em erro
+        logger.exception("Falha ao incrementar versões das tabelas %s", sorted(changed))
+
+
+async def table_versions(db: AsyncSession, tables: Sequence[str]) -> Dict[str, int]:
+    """Versão atual de cada tabela (0 se nunca alterada pela aplicação)"""
+    rows = await db.execute(
+        select(TableVersion.name, TableVersion.version).where(TableVersion.name.in_(tables))
+    )
+    versions = dict(rows.all())
+    return {name: versions.get(name, 0) for name in tables}
+
+
+async def request_table_versions(request: Request, db: AsyncSession, tables: Sequence[str]) -> Dict[str, int]:
+    """
+    table_versions lidas uma vez por requisição: a ETag e o cache de respostas da mesma
+    rota usam os mesmos valores (e uma única consulta)
+    """
+    known: Dict[str, int] = getattr(request.state, "table_versions", None) or {}
+    missing = [name for name in tables if name not in known]
+    if missing:
+        known.update(await table_versions(db, missing))
+        request.state.table_versions = known
+    return {name: known[name] for name in tables}
+
+
+def compute_etag(*parts: Iterable) -> str:
+    raw = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return '"' + hashlib.sha1(raw.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Comparação fraca do If-None-Match (lista separada por vírgulas, W/ ou *)"""
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
@@ -0,0 +1,57 @@
+"""
+Tabelas gravadas por sessão
+Registra as tabelas alteradas na transação (flush de objetos ou insert/update/delete em
+massa) e, quando ela é confirmada, entrega o conjunto aos assinantes; rollback descarta.
+Usado pelas estatísticas do dashboard, pelas versões das ETags e pelo cache de respostas.
+"""
+from typing import Callable, List, Optional, Set
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+CommitListener = Callable[[Session, Set[str]], None]
+
+_commit_listeners: List[CommitListener] = []
+
+
+def on_tables_committed(listener: CommitListener) -> CommitListener:
+    """
+    Registra `listener(session, tables)`, chamado após cada commit que gravou alguma tabela
+    Uso:
+        @on_tables_committed
+        def _invalidate(session, tables): ...
+    """
+    _commit_listeners.append(listener)
+    return listener
+
+
+def _mark_written(session, table_name: Optional[str]) -> None:
+    if table_name:
+        session.info.setdefault("written_tables", set()).add(table_name)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flush(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        _mark_written(session, getattr(obj, "__tablename__", None))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_bulk_writes(orm_execute_state):
+    # insert()/update()/delete() em massa não passam pelo flush
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None:
+            _mark_written(orm_execute_state.session, mapper.local_table.name)
+
+
+@event.listens_for(Session, "after_commit")
+def _notify_after_commit(session):
+    tables = session.info.pop("written_tables", None)
+    if tables:
+        for listener in _commit_listeners:
+            listener(session, tables)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop("written_tables", None)
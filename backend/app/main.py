@@ -1,7 +1,11 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
-from app.api.routes import auth, admin, teachers, students, classes, lessons, assessments, enrollments, activities, calendar, lesson_planning
+from app.core.database import get_pools_status, engine, async_engine
+from app.core.query_metrics import QueryMetricsMiddleware, instrument_engine
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.security import get_password_pool_status
+from app.api.routes import auth, admin, teachers, students, classes, lessons, assessments, enrollments, activities, calendar, lesson_planning, analytics, exports
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -9,6 +13,11 @@ app = FastAPI(
     openapi_url=f"{settings.API_V1_PREFIX}/openapi.json",
 )
 
+# Métricas de consultas SQL por requisição (headers X-DB-* e log)
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+app.add_middleware(QueryMetricsMiddleware)
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -16,6 +25,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # Routes
@@ -30,6 +40,8 @@ app.include_router(enrollments.router, prefix=f"{settings.API_V1_PREFIX}/enrollm
 app.include_router(activities.router, prefix=f"{settings.API_V1_PREFIX}/activities", tags=["activities"])
 app.include_router(calendar.router, prefix=f"{settings.API_V1_PREFIX}/calendar", tags=["calendar"])
 app.include_router(lesson_planning.router, prefix=f"{settings.API_V1_PREFIX}/planning", tags=["planning"])
+app.include_router(analytics.router, prefix=f"{settings.API_V1_PREFIX}/analytics", tags=["analytics"])
+app.include_router(exports.router, prefix=f"{settings.API_V1_PREFIX}/exports", tags=["exports"])
 
 
 @app.get("/")
@@ -44,3 +56,15 @@ async def root():
 @app.get("/health")
 async def health():
     return {"status": "ok"}
+
+
+@app.get("/health/db")
+async def health_db():
+    """Contadores do pool de conexões (em uso, ociosas, overflow)"""
+    return {"status": "ok", "pools": get_pools_status()}
+
+
+@app.get("/health/auth")
+async def health_auth():
+    """Ocupação do pool de hash de senhas (bcrypt)"""
+    return {"status": "ok", "password_hashing": get_password_pool_status()}
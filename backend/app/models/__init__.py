@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Boolean, Text, Date, Time, Float
+from sqlalchemy import BigInteger, Column, Integer, String, DateTime, ForeignKey, Enum, Boolean, Text, Date, Time, Float, UniqueConstraint, event, inspect
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -21,6 +21,7 @@ class User(Base):
     hashed_password = Column(String(255), nullable=False)
     role = Column(Enum(UserRole), nullable=False)
     is_active = Column(Boolean, default=True)
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")  # Incrementar invalida tokens emitidos (ex: troca de role)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -28,6 +29,22 @@ class User(Base):
     teacher = relationship("Teacher", back_populates="user", uselist=False)
 
 
+@event.listens_for(User.role, "set")
+@event.listens_for(User.is_active, "set")
+def _revoke_tokens_on_access_change(target, value, oldvalue, initiator):
+    """
+    Trocar a role ou o status de um usuário já gravado invalida os tokens emitidos para ele
+    (token_version + 1 no mesmo flush). O email fica em session.info["access_changed_emails"]
+    para que os caches de autenticação sejam limpos após o commit.
+    """
+    state = inspect(target)
+    if not state.has_identity or value == oldvalue:
+        return
+    target.token_version = (target.token_version or 0) + 1
+    if state.session is not None:
+        state.session.info.setdefault("access_changed_emails", set()).add(target.email)
+
+
 class Teacher(Base):
     __tablename__ = "teachers"
 
@@ -119,6 +136,10 @@ class Enrollment(Base):
 
 class Lesson(Base):
     __tablename__ = "lessons"
+    __table_args__ = (
+        # Uma aula por turma em cada data (chave da chamada em lote)
+        UniqueConstraint("class_id", "date", name="uq_lessons_class_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     class_id = Column(Integer, ForeignKey("classes.id"))
@@ -136,6 +157,10 @@ class Lesson(Base):
 
 class Attendance(Base):
     __tablename__ = "attendances"
+    __table_args__ = (
+        # Uma presença por aluno em cada aula (chave do upsert da chamada em lote)
+        UniqueConstraint("lesson_id", "student_id", name="uq_attendances_lesson_student"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     lesson_id = Column(Integer, ForeignKey("lessons.id"))
@@ -169,6 +194,33 @@ class Assessment(Base):
     student = relationship("Student")
 
 
+class EnrollmentSummary(Base):
+    """
+    Contadores de frequência e notas por aluno/turma, mantidos a cada gravação de
+    presença ou avaliação (ver app.core.summaries)
+    """
+    __tablename__ = "enrollment_summaries"
+
+    student_id = Column(Integer, ForeignKey("students.id"), primary_key=True)
+    class_id = Column(Integer, ForeignKey("classes.id"), primary_key=True)
+    present_count = Column(Integer, nullable=False, default=0)
+    absent_count = Column(Integer, nullable=False, default=0)
+    late_count = Column(Integer, nullable=False, default=0)
+    assessments_count = Column(Integer, nullable=False, default=0)
+    weighted_grade_sum = Column(Float, nullable=False, default=0.0)  # soma de grade / max_grade * weight
+    weight_sum = Column(Float, nullable=False, default=0.0)
+    last_lesson_date = Column(Date)  # última aula com chamada registrada
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class TableVersion(Base):
+    """Contador de escritas por tabela, usado nas ETags das listagens (ver app.core.versions)"""
+    __tablename__ = "table_versions"
+
+    name = Column(String(64), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+
+
 class Announcement(Base):
     __tablename__ = "announcements"
 
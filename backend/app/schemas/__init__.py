@@ -150,6 +150,7 @@ class ClassBase(BaseModel):
 
 class ClassCreate(ClassBase):
     teacher_id: Optional[int] = None
+    schedules: List[ScheduleBase] = []  # Horários validados contra conflitos de sala/professor
 
 
 class ClassUpdate(BaseModel):
@@ -161,6 +162,7 @@ class ClassUpdate(BaseModel):
     start_date: Optional[date] = None
     end_date: Optional[date] = None
     is_active: Optional[bool] = None
+    schedules: Optional[List[ScheduleBase]] = None  # Substitui todos os horários da turma
 
 
 class ClassResponse(ClassBase):
@@ -176,6 +178,19 @@ class ClassResponse(ClassBase):
         from_attributes = True
 
 
+class FreeRoomsResponse(BaseModel):
+    weekday: int
+    start_time: time
+    end_time: time
+    rooms: List[str] = []
+
+
+class FreeSlot(BaseModel):
+    weekday: int
+    start_time: time
+    end_time: time
+
+
 # Lesson Schemas
 class LessonBase(BaseModel):
     date: date
@@ -261,6 +276,21 @@ class EnrollmentResponse(EnrollmentBase):
         from_attributes = True
 
 
+class BulkEnrollmentCreate(BaseModel):
+    class_id: int
+    student_ids: List[int] = Field(..., min_length=1, max_length=500)
+    enrollment_date: Optional[date] = None
+
+
+class BulkEnrollmentResult(BaseModel):
+    class_id: int
+    created: List[int] = []  # alunos com nova matrícula
+    reactivated: List[int] = []  # alunos com matrícula inativa reativada
+    already_enrolled: List[int] = []
+    max_capacity: Optional[int] = None
+    roster: List[EnrollmentResponse] = []  # matrículas ativas da turma após a operação
+
+
 # Assessment Schemas
 class AssessmentBase(BaseModel):
     student_id: int
@@ -294,6 +324,103 @@ class AssessmentResponse(AssessmentBase):
         from_attributes = True
 
 
+# Student Import
+class StudentImportError(BaseModel):
+    row: int  # linha no arquivo (1 = cabeçalho)
+    cpf: Optional[str] = None
+    errors: List[str]
+
+
+class StudentImportResult(BaseModel):
+    total_rows: int
+    created: int
+    updated: int
+    failed: int
+    errors: List[StudentImportError] = []
+
+
+# Student Report
+class StudentClassReport(BaseModel):
+    class_id: int
+    class_name: str
+    enrollment_active: Optional[bool] = None
+    attendance_recorded: int = 0
+    present: int = 0
+    absent: int = 0
+    late: int = 0
+    attendance_rate: Optional[float] = None  # (presentes + atrasos) / chamadas, 0-1
+    assessments_count: int = 0
+    weighted_average: Optional[float] = None  # escala 0-10
+
+
+class StudentReport(BaseModel):
+    student_id: int
+    student_name: str
+    attendance_recorded: int = 0
+    present: int = 0
+    absent: int = 0
+    late: int = 0
+    attendance_rate: Optional[float] = None
+    assessments_count: int = 0
+    weighted_average: Optional[float] = None
+    classes: List[StudentClassReport] = []
+
+
+# Gradebook (matriz alunos x avaliações)
+class GradebookStudent(BaseModel):
+    id: int
+    name: str
+
+
+class GradebookColumn(BaseModel):
+    lesson_id: int
+    type: Optional[str] = None
+    assessment_date: Optional[date] = None
+    max_grade: float = 10.0
+    weight: float = 1.0
+    count: int = 0
+    average: Optional[float] = None
+    min: Optional[float] = None
+    max: Optional[float] = None
+
+
+class Gradebook(BaseModel):
+    class_id: int
+    class_name: str
+    students: List[GradebookStudent] = []
+    assessments: List[GradebookColumn] = []
+    grades: List[List[Optional[float]]] = []  # grades[i][j]: aluno i, avaliação j
+    averages: List[Optional[float]] = []  # média ponderada de cada aluno (0-10)
+
+
+# Attendance Analytics
+class StudentAttendanceRisk(BaseModel):
+    student_id: int
+    student_name: str
+    lessons_recorded: int
+    absences: int
+    absence_rate: float  # 0-1, todo o histórico
+    rolling_absence_rate: float  # 0-1, últimas `window` aulas
+    at_risk: bool
+
+
+class WeekdayAbsence(BaseModel):
+    weekday: int  # 0=Segunda ... 6=Domingo
+    lessons: int
+    records: int
+    absences: int
+    absence_rate: Optional[float] = None
+
+
+class AttendanceAnalytics(BaseModel):
+    class_id: int
+    window: int
+    threshold: float
+    students: List[StudentAttendanceRisk] = []
+    at_risk_count: int = 0
+    weekdays: List[WeekdayAbsence] = []
+
+
 # Dashboard Stats
 class DashboardStats(BaseModel):
     total_classes: int
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import date, time, datetime
 
 
@@ -85,3 +85,24 @@ class MaterialReservationResponse(MaterialReservationBase):
 
     class Config:
         from_attributes = True
+
+
+class MaterialReservationSlot(BaseModel):
+    id: int
+    start_time: time
+    end_time: time
+    quantity: int
+    reserved_by: int
+    status: str
+
+    class Config:
+        from_attributes = True
+
+
+class MaterialAvailabilityResponse(BaseModel):
+    material_name: str
+    reservation_date: date
+    start_time: time
+    end_time: time
+    available: bool
+    conflicts: List[MaterialReservationSlot] = []
@@ -0,0 +1,22 @@
+"""
+Script para recalcular os resumos por matrícula (enrollment_summaries)
+Use após importações em massa ou correções feitas direto no banco
+Execute: python rebuild_enrollment_summaries.py
+"""
+import asyncio
+from app.core.database import AsyncSessionLocal, async_engine
+from app.core.summaries import rebuild_enrollment_summaries
+
+
+async def main():
+    print("🔄 Recalculando resumos de frequência e notas por matrícula...")
+    try:
+        async with AsyncSessionLocal() as db:
+            total = await rebuild_enrollment_summaries(db)
+        print(f"✅ {total} resumos recalculados")
+    finally:
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
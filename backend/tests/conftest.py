@@ -0,0 +1,142 @@
+"""
+Fixtures dos testes da API: banco SQLite temporário (recriado a cada teste),
+cliente HTTP e usuários com token por role.
+As variáveis de ambiente precisam ser definidas antes de importar a aplicação.
+"""
+import os
+import tempfile
+from datetime import date, time
+
+# SQLite temporário por padrão; TEST_DATABASE_URL=postgresql://... roda a suíte no Postgres
+# (inclui os testes de concorrência, que precisam de locks reais)
+_db_dir = tempfile.mkdtemp(prefix="thehouse-tests-")
+os.environ["DATABASE_URL"] = os.environ.get("TEST_DATABASE_URL") or f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ["RESPONSE_CACHE_URL"] = ""
+os.environ["BCRYPT_ROUNDS"] = "4"
+# Rotas que excedem o orçamento de consultas declarado (query_budget) falham nos testes
+os.environ["QUERY_BUDGET_STRICT"] = "true"
+
+import pytest
+from fastapi.testclient import TestClient
+from app.api import dependencies
+from app.core import analytics, scheduling
+from app.core.database import Base, SessionLocal, async_engine, engine
+from app.core.response_cache import set_response_cache
+from app.core.security import create_access_token, get_password_hash, get_user_token_claims
+from app.core.stats import invalidate_dashboard_stats
+from app.main import app
+from app.models import Class, Enrollment, Schedule, Student, Teacher, User, UserRole
+from app.models import lesson_planning  # noqa: F401  (tabelas do planejamento)
+
+API = "/api/v1"
+
+# Locks e isolamento reais só existem no Postgres (SQLite serializa todas as escritas)
+postgres_only = pytest.mark.skipif(
+    engine.dialect.name != "postgresql", reason="requer Postgres (TEST_DATABASE_URL)",
+)
+# A busca no Postgres usa f_unaccent/pg_trgm, criados pelas migrations e não pelo create_all
+sqlite_search_only = pytest.mark.skipif(
+    engine.dialect.name == "postgresql", reason="busca do Postgres depende das extensões das migrations",
+)
+
+
+@pytest.fixture(autouse=True)
+def _reset_state():
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    # Caches por processo não podem vazar entre testes
+    dependencies._user_cache.clear()
+    dependencies._token_version_cache.clear()
+    analytics._analytics_cache.clear()
+    scheduling._room_index_cache.clear()
+    invalidate_dashboard_stats()
+    set_response_cache(None)
+    yield
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client():
+    # Um único event loop por teste: conexões do asyncpg ficam presas ao loop que as criou
+    with TestClient(app) as test_client:
+        yield test_client
+        test_client.portal.call(async_engine.dispose)
+
+
+@pytest.fixture
+def run_async(client):
+    """Executa uma corrotina no event loop da aplicação: run_async(func, *args)"""
+    return lambda func, *args: client.portal.call(func, *args)
+
+
+def auth_headers(user: User) -> dict:
+    return {"Authorization": "Bearer " + create_access_token(get_user_token_claims(user))}
+
+
+@pytest.fixture
+def make_user(db):
+    """Cria um usuário (e o Teacher, para a role TEACHER)"""
+    counter = iter(range(1, 10_000))
+
+    def factory(role: UserRole = UserRole.DIRECTOR, **fields) -> User:
+        number = next(counter)
+        user = User(
+            name=fields.pop("name", f"Usuário {number}"),
+            email=fields.pop("email", f"user{number}@example.com"),
+            hashed_password=get_password_hash("senha"),
+            role=role,
+            **fields,
+        )
+        db.add(user)
+        db.flush()
+        if role == UserRole.TEACHER:
+            db.add(Teacher(user_id=user.id, cpf=f"{number:011d}"))
+        db.commit()
+        db.refresh(user)
+        return user
+
+    return factory
+
+
+@pytest.fixture
+def director(make_user):
+    return make_user(UserRole.DIRECTOR)
+
+
+@pytest.fixture
+def director_headers(director):
+    return auth_headers(director)
+
+
+@pytest.fixture
+def make_class(db):
+    """Cria uma turma com `schedules` horários e `students` alunos matriculados"""
+    counter = iter(range(1, 10_000))
+
+    def factory(teacher_id=None, schedules: int = 1, students: int = 0, **fields) -> Class:
+        number = next(counter)
+        class_ = Class(name=fields.pop("name", f"Turma {number}"), teacher_id=teacher_id, **fields)
+        db.add(class_)
+        db.flush()
+        for index in range(schedules):
+            db.add(Schedule(
+                class_id=class_.id, weekday=index % 7,
+                start_time=time(8 + index // 7), end_time=time(9 + index // 7), room=f"Sala {number}",
+            ))
+        for index in range(students):
+            student = Student(name=f"Aluno {number}-{index}", cpf=f"{number:05d}{index:06d}")
+            db.add(student)
+            db.flush()
+            db.add(Enrollment(student_id=student.id, class_id=class_.id, enrollment_date=date.today()))
+        db.commit()
+        return class_
+
+    return factory
@@ -0,0 +1,69 @@
+import pytest
+from sqlalchemy import select
+from app.api.dependencies import update_user_access
+from app.core.database import AsyncSessionLocal
+from app.models import User, UserRole
+from conftest import API, auth_headers
+
+
+def _update_access(run_async, user_id: int, **changes) -> bool:
+    async def run():
+        async with AsyncSessionLocal() as session:
+            user = await session.scalar(select(User).where(User.id == user_id))
+            return await update_user_access(session, user, **changes)
+
+    return run_async(run)
+
+
+@pytest.mark.parametrize("changes", [{"role": UserRole.SECRETARY}, {"is_active": False}])
+def test_old_token_rejected_after_access_change(client, run_async, make_user, db, changes):
+    user = make_user(UserRole.DIRECTOR)
+    old_headers = auth_headers(user)
+    # Aquece os caches de autenticação (usuário e versão do token)
+    assert client.get(f"{API}/auth/me", headers=old_headers).status_code == 200
+    assert client.get(f"{API}/admin/dashboard/stats", headers=old_headers).status_code == 200
+
+    assert _update_access(run_async, user.id, **changes) is True
+
+    assert client.get(f"{API}/auth/me", headers=old_headers).status_code in (400, 401)
+    assert client.get(f"{API}/admin/dashboard/stats", headers=old_headers).status_code == 401
+
+    if changes.get("is_active") is False:
+        return
+    db.refresh(user)
+    new_headers = auth_headers(user)
+    assert client.get(f"{API}/auth/me", headers=new_headers).status_code == 200
+    # A role nova vem do token novo: secretaria também acessa o dashboard
+    assert client.get(f"{API}/admin/dashboard/stats", headers=new_headers).status_code == 200
+
+
+def test_update_without_changes_keeps_tokens(client, run_async, make_user):
+    user = make_user(UserRole.DIRECTOR)
+    headers = auth_headers(user)
+
+    assert _update_access(run_async, user.id, role=UserRole.DIRECTOR, is_active=True) is False
+    assert client.get(f"{API}/admin/dashboard/stats", headers=headers).status_code == 200
+
+
+@pytest.mark.parametrize("field, value", [("role", UserRole.COORDINATOR), ("is_active", False)])
+def test_direct_model_change_revokes_tokens(client, make_user, db, field, value):
+    user = make_user(UserRole.DIRECTOR)
+    assert user.token_version == 0
+    headers = auth_headers(user)
+    assert client.get(f"{API}/admin/dashboard/stats", headers=headers).status_code == 200
+
+    # Sem passar por update_user_access: o evento do modelo incrementa token_version
+    setattr(user, field, value)
+    db.commit()
+    assert user.token_version == 1
+
+    assert client.get(f"{API}/admin/dashboard/stats", headers=headers).status_code == 401
+
+
+def test_setting_same_access_keeps_token_version(make_user, db):
+    user = make_user(UserRole.DIRECTOR)
+    user.role = UserRole.DIRECTOR
+    user.is_active = True
+    user.name = "Outro nome"
+    db.commit()
+    assert user.token_version == 0
@@ -0,0 +1,82 @@
+from datetime import date, timedelta
+import pytest
+from conftest import API
+
+DAY = (date.today() + timedelta(days=1)).isoformat()
+RESERVATIONS = f"{API}/calendar/material-reservations"
+
+
+def _reserve(client, headers, start, end, material="Projetor", **fields):
+    return client.post(RESERVATIONS, headers=headers, json={
+        "material_name": material, "reservation_date": DAY, "start_time": start, "end_time": end, **fields,
+    })
+
+
+def _availability(client, headers, start, end, material="Projetor", **params):
+    return client.get(f"{RESERVATIONS}/availability", headers=headers, params={
+        "material_name": material, "reservation_date": DAY, "start_time": start, "end_time": end, **params,
+    })
+
+
+@pytest.fixture
+def booked(client, director_headers):
+    """Projetor reservado das 08:00 às 10:00"""
+    response = _reserve(client, director_headers, "08:00", "10:00")
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+@pytest.mark.parametrize("start, end, material", [
+    ("09:00", "11:00", "Projetor"),
+    ("07:00", "08:30", " projetor "),
+    ("08:30", "09:30", "PROJETOR"),
+    ("07:00", "11:00", "Projetor"),
+])
+def test_overlapping_reservation_rejected(client, director_headers, booked, start, end, material):
+    response = _reserve(client, director_headers, start, end, material=material)
+    assert response.status_code == 409, response.text
+    assert "08:00-10:00" in response.json()["detail"]
+
+
+@pytest.mark.parametrize("start, end", [("07:00", "08:00"), ("10:00", "11:00")])
+def test_adjacent_reservation_allowed(client, director_headers, booked, start, end):
+    assert _reserve(client, director_headers, start, end).status_code == 201
+
+
+def test_other_material_and_cancelled_reservation_do_not_block(client, director_headers, booked):
+    assert _reserve(client, director_headers, "08:00", "10:00", material="Caixa de som").status_code == 201
+
+    cancelled = client.patch(f"{RESERVATIONS}/{booked['id']}", headers=director_headers, json={"status": "cancelled"})
+    assert cancelled.status_code == 200, cancelled.text
+    assert _reserve(client, director_headers, "08:00", "10:00").status_code == 201
+
+
+def test_update_into_taken_slot_rejected(client, director_headers, booked):
+    later = _reserve(client, director_headers, "10:00", "11:00").json()
+    response = client.patch(f"{RESERVATIONS}/{later['id']}", headers=director_headers, json={"start_time": "09:30"})
+    assert response.status_code == 409, response.text
+    # Mover a própria reserva dentro do seu horário não conflita consigo mesma
+    response = client.patch(f"{RESERVATIONS}/{booked['id']}", headers=director_headers, json={"end_time": "09:00"})
+    assert response.status_code == 200, response.text
+
+
+def test_invalid_time_range_rejected(client, director_headers):
+    assert _reserve(client, director_headers, "10:00", "10:00").status_code == 400
+    assert _availability(client, director_headers, "10:00", "09:00").status_code == 400
+
+
+def test_availability_reports_conflicts(client, director_headers, booked):
+    taken = _availability(client, director_headers, "09:30", "10:30", material="projetor")
+    assert taken.status_code == 200, taken.text
+    body = taken.json()
+    assert body["available"] is False
+    assert [(slot["id"], slot["start_time"], slot["end_time"]) for slot in body["conflicts"]] == [
+        (booked["id"], "08:00:00", "10:00:00"),
+    ]
+
+    free = _availability(client, director_headers, "10:00", "11:00").json()
+    assert free["available"] is True and free["conflicts"] == []
+
+    # Ao editar, a própria reserva é ignorada
+    editing = _availability(client, director_headers, "08:00", "09:00", exclude_id=booked["id"]).json()
+    assert editing["available"] is True
@@ -0,0 +1,61 @@
+from app.models import UserRole
+from conftest import API, auth_headers
+
+
+def _query_count(response) -> int:
+    assert response.status_code == 200, response.text
+    return int(response.headers["x-db-query-count"])
+
+
+def _get_uncached(client, url, headers):
+    response = client.get(url, headers=headers)
+    # Turmas criadas pelo teste mudam a versão das tabelas: nunca é a resposta em cache
+    assert response.headers["x-cache"] == "MISS"
+    return response
+
+
+def _warm_auth_cache(client, headers):
+    # A primeira requisição do usuário também consulta a versão do token
+    assert client.get(f"{API}/classes/", headers=headers).status_code == 200
+
+
+def test_list_classes_query_count_is_constant(client, make_class, director_headers):
+    _warm_auth_cache(client, director_headers)
+    make_class(students=2)
+    single = _get_uncached(client, f"{API}/classes/", director_headers)
+    assert len(single.json()) == 1
+
+    for _ in range(8):
+        make_class(schedules=3, students=4)
+    many = _get_uncached(client, f"{API}/classes/", director_headers)
+    assert len(many.json()) == 9
+
+    assert _query_count(single) == _query_count(many)
+
+
+def test_list_classes_query_count_with_teachers(client, make_user, make_class):
+    teacher = make_user(UserRole.TEACHER)
+    headers = auth_headers(teacher)
+    _warm_auth_cache(client, headers)
+    make_class(teacher_id=teacher.teacher.id)
+    single = _get_uncached(client, f"{API}/classes/", headers)
+
+    for _ in range(5):
+        make_class(teacher_id=teacher.teacher.id, schedules=2, students=3)
+    many = _get_uncached(client, f"{API}/classes/", headers)
+    assert len(many.json()) == 6
+
+    assert _query_count(single) == _query_count(many)
+
+
+def test_get_class_query_count_is_constant(client, make_class, director_headers):
+    small = make_class(schedules=1, students=1)
+    large = make_class(schedules=6, students=12)
+    _warm_auth_cache(client, director_headers)
+
+    small_response = _get_uncached(client, f"{API}/classes/{small.id}", director_headers)
+    large_response = _get_uncached(client, f"{API}/classes/{large.id}", director_headers)
+
+    assert large_response.json()["current_students"] == 12
+    assert len(large_response.json()["schedules"]) == 6
+    assert _query_count(small_response) == _query_count(large_response)
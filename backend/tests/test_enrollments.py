@@ -0,0 +1,123 @@
+from datetime import date
+import pytest
+from sqlalchemy import func, select
+from app.models import Enrollment, Student
+from conftest import API
+
+ENROLLMENTS = f"{API}/enrollments"
+
+
+@pytest.fixture
+def make_student(db):
+    counter = iter(range(1, 10_000))
+
+    def factory(**fields) -> Student:
+        number = next(counter)
+        student = Student(name=fields.pop("name", f"Estudante {number:03d}"), cpf=f"9{number:010d}", **fields)
+        db.add(student)
+        db.commit()
+        return student
+
+    return factory
+
+
+def _enrollment_rows(db, class_id):
+    db.expire_all()
+    return db.execute(
+        select(Enrollment.student_id, Enrollment.is_active)
+        .where(Enrollment.class_id == class_id)
+        .order_by(Enrollment.student_id)
+    ).all()
+
+
+def _bulk(client, headers, class_id, student_ids):
+    return client.post(f"{ENROLLMENTS}/bulk", headers=headers, json={"class_id": class_id, "student_ids": student_ids})
+
+
+def test_bulk_enrollment_returns_roster(client, db, director_headers, make_class, make_student):
+    class_ = make_class(max_capacity=5)
+    zeca, ana = make_student(name="Zeca"), make_student(name="Ana")
+
+    response = _bulk(client, director_headers, class_.id, [zeca.id, ana.id, zeca.id])
+    assert response.status_code == 200, response.text
+    body = response.json()
+    # Ids repetidos no pedido contam uma vez
+    assert body["created"] == [zeca.id, ana.id]
+    assert body["reactivated"] == body["already_enrolled"] == []
+    assert body["max_capacity"] == 5
+    assert [entry["student"]["name"] for entry in body["roster"]] == ["Ana", "Zeca"]
+    assert _enrollment_rows(db, class_.id) == [(zeca.id, True), (ana.id, True)]
+
+
+def test_bulk_enrollment_reactivates_instead_of_duplicating(client, db, director_headers, make_class, make_student):
+    class_ = make_class(students=1)
+    enrolled = class_.enrollments[0].student_id
+    former, newcomer = make_student(), make_student()
+    db.add(Enrollment(student_id=former.id, class_id=class_.id, enrollment_date=date.today(), is_active=False))
+    db.commit()
+
+    response = _bulk(client, director_headers, class_.id, [enrolled, former.id, newcomer.id])
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert (body["created"], body["reactivated"], body["already_enrolled"]) == ([newcomer.id], [former.id], [enrolled])
+    assert {entry["student_id"] for entry in body["roster"]} == {enrolled, former.id, newcomer.id}
+    assert _enrollment_rows(db, class_.id) == [(enrolled, True), (former.id, True), (newcomer.id, True)]
+
+
+def test_bulk_enrollment_over_capacity_writes_nothing(client, db, director_headers, make_class, make_student):
+    class_ = make_class(students=1, max_capacity=2)
+    former, first, second = make_student(), make_student(), make_student()
+    db.add(Enrollment(student_id=former.id, class_id=class_.id, enrollment_date=date.today(), is_active=False))
+    db.commit()
+    before = _enrollment_rows(db, class_.id)
+
+    # 1 vaga: reativar `former` e criar duas matrículas não cabem
+    response = _bulk(client, director_headers, class_.id, [former.id, first.id, second.id])
+    assert response.status_code == 409, response.text
+    assert "1 vaga(s) disponível(is), 3 solicitada(s)" in response.json()["detail"]
+    assert _enrollment_rows(db, class_.id) == before
+
+    # Já matriculados não ocupam vaga nova
+    enrolled = class_.enrollments[0].student_id
+    assert _bulk(client, director_headers, class_.id, [enrolled, first.id]).status_code == 200
+
+
+@pytest.mark.parametrize("kind", ["unknown", "inactive"])
+def test_bulk_enrollment_rejects_missing_students(client, db, director_headers, make_class, make_student, kind):
+    class_ = make_class()
+    valid = make_student()
+    bad_id = make_student(is_active=False).id if kind == "inactive" else 99_999
+
+    response = _bulk(client, director_headers, class_.id, [valid.id, bad_id])
+    assert response.status_code == 404, response.text
+    assert str(bad_id) in response.json()["detail"]
+    assert db.scalar(select(func.count(Enrollment.id)).where(Enrollment.class_id == class_.id)) == 0
+
+
+def test_bulk_enrollment_unknown_class(client, director_headers, make_student):
+    assert _bulk(client, director_headers, 99_999, [make_student().id]).status_code == 404
+
+
+def test_single_enrollment_respects_capacity(client, db, director_headers, make_class, make_student):
+    class_ = make_class(students=1, max_capacity=2)
+    newcomer, late, former = make_student(), make_student(), make_student()
+    db.add(Enrollment(student_id=former.id, class_id=class_.id, enrollment_date=date.today(), is_active=False))
+    db.commit()
+
+    def enroll(student):
+        return client.post(f"{ENROLLMENTS}/", headers=director_headers, json={
+            "student_id": student.id, "class_id": class_.id, "enrollment_date": date.today().isoformat(),
+        })
+
+    assert enroll(newcomer).status_code == 201
+    assert enroll(newcomer).status_code == 400  # já matriculado
+    # Turma cheia: nem nova matrícula nem reativação
+    assert enroll(late).status_code == 409
+    assert enroll(former).status_code == 409
+    assert _enrollment_rows(db, class_.id)[-1] == (former.id, False)
+
+    assert client.delete(f"{ENROLLMENTS}/{class_.enrollments[0].id}", headers=director_headers).status_code == 204
+    response = enroll(former)
+    assert response.status_code == 201, response.text
+    assert response.json()["is_active"] is True
+    assert _enrollment_rows(db, class_.id).count((former.id, True)) == 1
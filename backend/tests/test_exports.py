@@ -0,0 +1,54 @@
+import csv
+import io
+from datetime import date
+import pyarrow.parquet as pq
+import pytest
+from app.core import exports
+from app.models import Assessment, Attendance, Lesson
+from conftest import API
+
+
+@pytest.fixture
+def graded_class(db, make_class):
+    class_ = make_class(students=3)
+    student_ids = [enrollment.student_id for enrollment in class_.enrollments]
+    for day in (5, 6):
+        lesson = Lesson(class_id=class_.id, date=date(2025, 5, day))
+        db.add(lesson)
+        db.flush()
+        for student_id in student_ids:
+            db.add(Attendance(lesson_id=lesson.id, student_id=student_id, status="present"))
+            db.add(Assessment(lesson_id=lesson.id, student_id=student_id, type="Prova", grade=7.5, assessment_date=lesson.date))
+    db.commit()
+    return class_
+
+
+def test_export_attendances_csv(client, director_headers, graded_class, monkeypatch):
+    monkeypatch.setattr(exports, "EXPORT_BATCH_SIZE", 2)
+    response = client.get(f"{API}/exports/attendances", headers=director_headers, params={"end_date": "2025-05-05"})
+
+    assert response.status_code == 200
+    assert response.headers["content-disposition"] == 'attachment; filename="presencas.csv"'
+    rows = list(csv.reader(io.StringIO(response.content.decode("utf-8-sig"))))
+    assert rows[0][:3] == ["attendance_id", "lesson_id", "lesson_date"]
+    assert len(rows) == 1 + 3
+    assert {row[2] for row in rows[1:]} == {"2025-05-05"}
+
+
+def test_export_assessments_parquet(client, director_headers, graded_class, monkeypatch):
+    monkeypatch.setattr(exports, "EXPORT_BATCH_SIZE", 2)
+    response = client.get(
+        f"{API}/exports/assessments", headers=director_headers,
+        params={"format": "parquet", "class_id": graded_class.id},
+    )
+
+    assert response.status_code == 200
+    parquet = pq.ParquetFile(io.BytesIO(response.content))
+    assert parquet.metadata.num_rows == 6
+    assert parquet.num_row_groups == 3  # um row group por lote do cursor
+    assert set(parquet.read().column("grade").to_pylist()) == {7.5}
+
+
+def test_export_rejects_unknown_format(client, director_headers):
+    response = client.get(f"{API}/exports/assessments", headers=director_headers, params={"format": "xls"})
+    assert response.status_code == 400
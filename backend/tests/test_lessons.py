@@ -0,0 +1,38 @@
+from datetime import date
+from sqlalchemy import func, select
+from app.models import Attendance, Lesson
+from conftest import API
+
+
+def test_bulk_attendance_reuses_lesson_of_same_date(client, db, make_class, director_headers):
+    class_ = make_class(students=2)
+    student_ids = [enrollment.student_id for enrollment in class_.enrollments]
+    payload = {
+        "class_id": class_.id,
+        "date": str(date.today()),
+        "attendances": [{"student_id": student_id, "status": "present"} for student_id in student_ids],
+    }
+
+    first = client.post(f"{API}/lessons/bulk-attendance", headers=director_headers, json=payload)
+    assert first.status_code == 201, first.text
+
+    payload["notes"] = "Reenvio"
+    payload["attendances"][0]["status"] = "absent"
+    second = client.post(f"{API}/lessons/bulk-attendance", headers=director_headers, json=payload)
+    assert second.status_code == 201, second.text
+
+    assert second.json()["lesson_id"] == first.json()["lesson_id"]
+    assert db.scalar(select(func.count(Lesson.id))) == 1
+    lesson = db.get(Lesson, first.json()["lesson_id"])
+    assert lesson.notes == "Reenvio"
+    statuses = dict(db.execute(select(Attendance.student_id, Attendance.status)).all())
+    assert statuses == {student_ids[0]: "absent", student_ids[1]: "present"}
+
+
+def test_create_lesson_rejects_same_class_and_date(client, make_class, director_headers):
+    class_ = make_class()
+    payload = {"class_id": class_.id, "date": str(date.today())}
+
+    assert client.post(f"{API}/lessons/", headers=director_headers, json=payload).status_code == 201
+    duplicate = client.post(f"{API}/lessons/", headers=director_headers, json=payload)
+    assert duplicate.status_code == 409
@@ -0,0 +1,92 @@
+from datetime import date, timedelta
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.database import async_engine, get_async_db
+from app.core.query_metrics import QueryBudgetExceeded, QueryMetricsMiddleware, query_budget
+from app.models import Assessment, Attendance, Lesson, UserRole
+from conftest import API, sqlite_search_only
+
+
+def _budget_app() -> FastAPI:
+    budget_app = FastAPI()
+    budget_app.add_middleware(QueryMetricsMiddleware)
+
+    @budget_app.get("/two-queries", dependencies=[Depends(query_budget(1))])
+    async def over_budget(db: AsyncSession = Depends(get_async_db)):
+        await db.execute(text("SELECT 1"))
+        await db.execute(text("SELECT 2"))
+        return {}
+
+    @budget_app.get("/one-query", dependencies=[Depends(query_budget(1))])
+    async def within_budget(db: AsyncSession = Depends(get_async_db)):
+        await db.execute(text("SELECT 1"))
+        return {}
+
+    return budget_app
+
+
+def test_strict_mode_enabled_in_tests():
+    assert settings.QUERY_BUDGET_STRICT is True
+
+
+@pytest.fixture
+def budget_client():
+    with TestClient(_budget_app()) as client:
+        yield client
+        client.portal.call(async_engine.dispose)
+
+
+def test_route_over_budget_fails(budget_client):
+    with pytest.raises(QueryBudgetExceeded, match="executou 2 consultas"):
+        budget_client.get("/two-queries")
+
+
+def test_route_within_budget_passes(budget_client):
+    response = budget_client.get("/one-query")
+    assert response.status_code == 200
+    assert response.headers["x-db-query-count"] == "1"
+
+
+@pytest.fixture
+def school(db, make_user, make_class):
+    """Turma com professor, alunos, aulas, presenças e notas"""
+    teacher = make_user(UserRole.TEACHER)
+    class_ = make_class(teacher_id=teacher.teacher.id, schedules=2, students=4)
+    student_ids = [enrollment.student_id for enrollment in class_.enrollments]
+    for offset in range(3):
+        lesson = Lesson(class_id=class_.id, date=date.today() - timedelta(days=offset))
+        db.add(lesson)
+        db.flush()
+        for student_id in student_ids:
+            db.add(Attendance(lesson_id=lesson.id, student_id=student_id, status="absent" if offset else "present"))
+            db.add(Assessment(lesson_id=lesson.id, student_id=student_id, type="Prova", grade=7, assessment_date=lesson.date))
+    db.commit()
+    return {"class_id": class_.id, "student_id": student_ids[0], "teacher_id": teacher.teacher.id}
+
+
+BUDGETED_ROUTES = [
+    "/admin/dashboard/stats",
+    "/activities/recent",
+    "/calendar/events",
+    "/calendar/material-reservations",
+    f"/calendar/material-reservations/availability?material_name=Projetor&reservation_date={date.today()}&start_time=08:00&end_time=09:00",
+    "/classes/",
+    "/classes/{class_id}",
+    "/classes/{class_id}/gradebook",
+    "/classes/free-rooms?weekday=0&start_time=08:00&end_time=09:00",
+    "/classes/free-slots?teacher_id={teacher_id}",
+    "/analytics/attendance?class_id={class_id}",
+    pytest.param("/students/search?q=Aluno", marks=sqlite_search_only),
+    "/students/{student_id}/report",
+]
+
+
+@pytest.mark.parametrize("path", BUDGETED_ROUTES)
+def test_routes_within_declared_budget(client, director_headers, school, path):
+    # Primeira requisição (caches de autenticação e de respostas frios)
+    response = client.get(API + path.format(**school), headers=director_headers)
+    assert response.status_code == 200, response.text
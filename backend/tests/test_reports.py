@@ -0,0 +1,43 @@
+from datetime import date
+from app.models import Assessment, Lesson
+from conftest import API
+
+
+def _gradebook(client, headers, class_id):
+    response = client.get(f"{API}/classes/{class_id}/gradebook", headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_gradebook_shows_every_grade_in_the_average(client, db, make_class, director_headers):
+    class_ = make_class(students=2)
+    first, second = sorted(enrollment.student_id for enrollment in class_.enrollments)
+    lesson = Lesson(class_id=class_.id, date=date(2025, 5, 5))
+    db.add(lesson)
+    db.flush()
+    # Duas avaliações do primeiro aluno com a mesma data, aula e tipo (pesos diferentes)
+    for student_id, grade, weight in ((first, 8.0, 2.0), (first, 4.0, 1.0), (second, 6.0, 2.0)):
+        db.add(Assessment(
+            lesson_id=lesson.id, student_id=student_id, type="Prova",
+            grade=grade, weight=weight, assessment_date=lesson.date,
+        ))
+    db.commit()
+
+    gradebook = _gradebook(client, director_headers, class_.id)
+
+    student_ids = [student["id"] for student in gradebook["students"]]
+    rows = dict(zip(student_ids, gradebook["grades"]))
+    columns = gradebook["assessments"]
+    assert len(columns) == 2
+    assert sorted(grade for grade in rows[first] if grade is not None) == [4.0, 8.0]
+    assert [grade for grade in rows[second] if grade is not None] == [6.0]
+
+    # A média de cada aluno é reproduzível a partir da matriz e dos pesos das colunas
+    for grades, average in zip(gradebook["grades"], gradebook["averages"]):
+        cells = [(grade, column) for grade, column in zip(grades, columns) if grade is not None]
+        weighted = sum(grade / column["max_grade"] * column["weight"] for grade, column in cells)
+        assert average == round(weighted / sum(column["weight"] for _, column in cells) * 10, 2)
+    assert gradebook["averages"][student_ids.index(first)] == 6.67
+
+    # count é o número de notas lançadas na coluna
+    assert sum(column["count"] for column in columns) == 3
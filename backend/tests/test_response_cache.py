@@ -0,0 +1,53 @@
+import pytest
+from app.core.response_cache import RedisCacheBackend, cached_response, set_response_cache
+from app.models import Class
+from conftest import API
+
+
+class FakeRedis:
+    """Subconjunto de redis.asyncio usado pelo RedisCacheBackend"""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+
+def test_hit_until_tables_change(client, db, make_class, director_headers):
+    make_class()
+    first = client.get(f"{API}/classes/", headers=director_headers)
+    second = client.get(f"{API}/classes/", headers=director_headers)
+    assert (first.headers["x-cache"], second.headers["x-cache"]) == ("MISS", "HIT")
+    assert second.headers["etag"] == first.headers["etag"]
+
+    # Escrita fora das rotas da API (script, outro worker): muda a versão no banco
+    db.add(Class(name="Criada por script"))
+    db.commit()
+
+    third = client.get(f"{API}/classes/", headers=director_headers)
+    assert third.headers["x-cache"] == "MISS"
+    assert third.headers["etag"] != first.headers["etag"]
+    assert len(third.json()) == 2
+
+
+def test_shared_backend_sees_writes_from_any_worker(client, db, make_class, director_headers):
+    set_response_cache(RedisCacheBackend(FakeRedis()))
+    class_ = make_class(name="Antes")
+    assert client.get(f"{API}/classes/{class_.id}", headers=director_headers).headers["x-cache"] == "MISS"
+    assert client.get(f"{API}/classes/{class_.id}", headers=director_headers).headers["x-cache"] == "HIT"
+
+    updated = client.put(f"{API}/classes/{class_.id}", headers=director_headers, json={"name": "Depois"})
+    assert updated.status_code == 200, updated.text
+
+    response = client.get(f"{API}/classes/{class_.id}", headers=director_headers)
+    assert response.headers["x-cache"] == "MISS"
+    assert response.json()["name"] == "Depois"
+
+
+def test_unversioned_entities_rejected():
+    with pytest.raises(ValueError, match="announcements"):
+        cached_response("classes", "announcements", model=dict)
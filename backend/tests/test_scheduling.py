@@ -0,0 +1,151 @@
+import asyncio
+from datetime import time
+from types import SimpleNamespace
+import pytest
+from app.core.database import AsyncSessionLocal
+from app.core.scheduling import find_schedule_conflicts
+from app.models import Class, Schedule, UserRole
+from conftest import API, postgres_only
+
+
+@postgres_only
+def test_concurrent_classes_cannot_book_same_room(run_async):
+    slot = SimpleNamespace(weekday=0, start_time=time(8), end_time=time(9), room="Sala 1")
+
+    async def race():
+        first_validated = asyncio.Event()
+
+        async def second_class():
+            await first_validated.wait()
+            async with AsyncSessionLocal() as session:
+                # Espera o commit da primeira turma e então enxerga o horário dela
+                return await find_schedule_conflicts(session, "Turma B", None, [SimpleNamespace(
+                    weekday=0, start_time=time(8, 30), end_time=time(9, 30), room=" sala 1 ",
+                )])
+
+        async with AsyncSessionLocal() as session:
+            second = asyncio.create_task(second_class())
+            assert await find_schedule_conflicts(session, "Turma A", None, [slot]) == []
+            first_validated.set()
+            await asyncio.sleep(0.2)
+            session.add(Class(name="Turma A", schedules=[Schedule(
+                weekday=slot.weekday, start_time=slot.start_time, end_time=slot.end_time, room=slot.room,
+            )]))
+            await session.commit()
+        return await second
+
+    conflicts = run_async(race)
+    assert len(conflicts) == 1
+    assert "Turma A" in conflicts[0]
+
+
+def test_free_rooms_reloads_schedules_only_after_writes(client, make_class, director_headers):
+    url = f"{API}/classes/free-rooms?weekday=0&start_time=08:00&end_time=09:00"
+    make_class(name="Manhã")
+    assert client.post(f"{API}/classes/", headers=director_headers, json={
+        "name": "Tarde",
+        "schedules": [{"weekday": 0, "start_time": "14:00", "end_time": "15:00", "room": "Sala B"}],
+    }).status_code == 201
+
+    first = client.get(url, headers=director_headers)
+    second = client.get(url, headers=director_headers)
+    assert first.json()["rooms"] == second.json()["rooms"] == ["Sala B"]
+    # Sem escritas, o índice das salas vem do cache: só a leitura das versões
+    assert int(second.headers["x-db-query-count"]) == int(first.headers["x-db-query-count"]) - 1
+
+    assert client.post(f"{API}/classes/", headers=director_headers, json={
+        "name": "Noite",
+        "schedules": [{"weekday": 0, "start_time": "08:30", "end_time": "09:30", "room": "sala b "}],
+    }).status_code == 201
+    assert client.get(url, headers=director_headers).json()["rooms"] == []
+
+
+def _schedule(start="08:00", end="09:00", room=None, weekday=0) -> dict:
+    return {"weekday": weekday, "start_time": start, "end_time": end, "room": room}
+
+
+@pytest.fixture
+def teacher_id(make_user):
+    return make_user(UserRole.TEACHER).teacher.id
+
+
+@pytest.fixture
+def busy_class(make_class, teacher_id):
+    """Turma ativa na segunda 08:00-09:00, Sala 1, com professor"""
+    return make_class(teacher_id=teacher_id, name="Ocupada")
+
+
+@pytest.mark.parametrize("schedule, teacher", [
+    (_schedule("08:30", "09:30", room="Sala 1"), False),
+    (_schedule("07:30", "08:30", room="  SALA 1 "), False),
+    (_schedule("08:00", "09:00", room="Sala 9"), True),
+])
+def test_create_class_rejects_room_or_teacher_clash(client, director_headers, busy_class, teacher_id, schedule, teacher):
+    response = client.post(f"{API}/classes/", headers=director_headers, json={
+        "name": "Nova", "teacher_id": teacher_id if teacher else None, "schedules": [schedule],
+    })
+    assert response.status_code == 409, response.text
+    assert "Ocupada" in response.json()["detail"]
+
+
+@pytest.mark.parametrize("clash", ["room", "teacher"])
+def test_update_class_rejects_room_or_teacher_clash(client, director_headers, make_class, busy_class, teacher_id, clash):
+    other = make_class(name="Outra")  # segunda 08:00-09:00 em outra sala, sem professor
+    changes = {"schedules": [_schedule(room=" sala 1")]} if clash == "room" else {"teacher_id": teacher_id}
+    response = client.put(f"{API}/classes/{other.id}", headers=director_headers, json=changes)
+    assert response.status_code == 409, response.text
+
+
+def test_adjacent_schedules_do_not_clash(client, director_headers, busy_class, teacher_id):
+    response = client.post(f"{API}/classes/", headers=director_headers, json={
+        "name": "Depois", "teacher_id": teacher_id, "schedules": [_schedule("09:00", "10:00", room="Sala 1")],
+    })
+    assert response.status_code == 201, response.text
+
+
+def test_reactivating_class_revalidates_schedules(client, director_headers, make_class, busy_class):
+    inactive = make_class(name="Antiga", is_active=False)
+    inactive_room = inactive.schedules[0].room
+    assert client.put(f"{API}/classes/{busy_class.id}", headers=director_headers, json={
+        "schedules": [_schedule(room=inactive_room.upper())],
+    }).status_code == 200
+
+    response = client.put(f"{API}/classes/{inactive.id}", headers=director_headers, json={"is_active": True})
+    assert response.status_code == 409, response.text
+
+
+def test_free_rooms_excludes_busy_room(client, director_headers, make_class):
+    make_class()  # Sala 1, segunda 08:00-09:00
+    make_class()  # Sala 2, segunda 08:00-09:00
+    response = client.get(
+        f"{API}/classes/free-rooms?weekday=0&start_time=08:30&end_time=10:00", headers=director_headers,
+    )
+    assert response.json()["rooms"] == []
+
+    response = client.get(
+        f"{API}/classes/free-rooms?weekday=0&start_time=09:00&end_time=10:00", headers=director_headers,
+    )
+    assert response.json()["rooms"] == ["Sala 1", "Sala 2"]
+
+
+def test_free_slots_returns_gaps(client, director_headers, busy_class, teacher_id):
+    assert client.post(f"{API}/classes/", headers=director_headers, json={
+        "name": "Segunda aula", "teacher_id": teacher_id, "schedules": [_schedule("10:00", "11:30", room="Sala 2")],
+    }).status_code == 201
+
+    response = client.get(
+        f"{API}/classes/free-slots?teacher_id={teacher_id}&weekday=0&day_start=07:00&day_end=12:00",
+        headers=director_headers,
+    )
+    assert response.status_code == 200, response.text
+    assert [(slot["start_time"], slot["end_time"]) for slot in response.json()] == [
+        ("07:00:00", "08:00:00"), ("09:00:00", "10:00:00"),
+    ]
+
+    response = client.get(
+        f"{API}/classes/free-slots?room= sala 1&weekday=0&day_start=07:00&day_end=12:00&min_minutes=30",
+        headers=director_headers,
+    )
+    assert [(slot["start_time"], slot["end_time"]) for slot in response.json()] == [
+        ("07:00:00", "08:00:00"), ("09:00:00", "12:00:00"),
+    ]
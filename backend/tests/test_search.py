@@ -0,0 +1,54 @@
+import pytest
+from app.models import Student
+from conftest import API, sqlite_search_only
+
+pytestmark = sqlite_search_only
+
+STUDENTS = [
+    ("José da Silva", "12345678900"),
+    ("Joana Pereira", "98765432100"),
+    ("Maria Conceição", "11122233344"),
+    ("Bernardo Albuquerque", "55566677788"),
+]
+
+
+@pytest.fixture
+def students(db):
+    db.add_all(Student(name=name, cpf=cpf) for name, cpf in STUDENTS)
+    db.add(Student(name="José Inativo", cpf="00011122233", is_active=False))
+    db.commit()
+
+
+def _names(client, headers, query, **params):
+    response = client.get(f"{API}/students/search", headers=headers, params={"q": query, **params})
+    assert response.status_code == 200, response.text
+    return [student["name"] for student in response.json()]
+
+
+@pytest.mark.parametrize("query", ["jose", "JOSÉ", "José"])
+def test_search_ignores_accents_and_case(client, director_headers, students, query):
+    assert _names(client, director_headers, query) == ["José da Silva"]
+
+
+def test_search_matches_accented_word_without_accents(client, director_headers, students):
+    assert _names(client, director_headers, "conceicao") == ["Maria Conceição"]
+
+
+def test_search_by_prefix_lists_name_prefix_first(client, director_headers, students):
+    assert _names(client, director_headers, "jo") == ["Joana Pereira", "José da Silva"]
+    assert _names(client, director_headers, "Per") == ["Joana Pereira"]
+
+
+def test_search_tolerates_one_typo(client, director_headers, students):
+    assert _names(client, director_headers, "albuquerqe") == ["Bernardo Albuquerque"]
+    assert _names(client, director_headers, "xyzw") == []
+
+
+@pytest.mark.parametrize("query", ["12345678900", "123.456.789-00", "123.456", " 123 456 789 00 "])
+def test_search_by_cpf_with_or_without_punctuation(client, director_headers, students, query):
+    assert _names(client, director_headers, query) == ["José da Silva"]
+
+
+def test_search_skips_inactive_unless_requested(client, director_headers, students):
+    assert _names(client, director_headers, "inativo") == []
+    assert _names(client, director_headers, "inativo", include_inactive=True) == ["José Inativo"]
@@ -0,0 +1,57 @@
+import io
+import threading
+from openpyxl import Workbook
+from sqlalchemy import select
+from app.core import student_import
+from app.models import Student
+from conftest import API
+
+
+def _import(client, headers, filename: str, content: bytes):
+    response = client.post(f"{API}/students/import", headers=headers, files={"file": (filename, content)})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_import_csv(client, db, director_headers):
+    content = "nome;cpf;data_nascimento\nAna Conceição;123.456.789-01;05/03/2010\nSem CPF;;\n".encode("cp1252")
+    result = _import(client, director_headers, "alunos.csv", content)
+
+    assert (result["created"], result["failed"]) == (1, 1)
+    assert result["errors"][0]["row"] == 3
+    student = db.scalar(select(Student).where(Student.cpf == "12345678901"))
+    assert student.name == "Ana Conceição"
+    assert str(student.birth_date) == "2010-03-05"
+
+
+def test_import_xlsx(client, db, director_headers):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(["Nome", "CPF", "E-mail"])
+    sheet.append(["Bruno", 98765432100, "Bruno@Example.com"])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+
+    result = _import(client, director_headers, "alunos.xlsx", buffer.getvalue())
+
+    assert result["created"] == 1, result
+    student = db.scalar(select(Student).where(Student.cpf == "98765432100"))
+    assert student.email == "bruno@example.com"
+
+
+def test_file_parsed_outside_event_loop_thread(client, director_headers, monkeypatch):
+    threads = set()
+    iter_csv = student_import._iter_csv
+
+    def tracking_iter_csv(upload):
+        for item in iter_csv(upload):
+            threads.add(threading.current_thread().name)
+            yield item
+
+    monkeypatch.setattr(student_import, "_iter_csv", tracking_iter_csv)
+    monkeypatch.setattr(student_import, "IMPORT_CHUNK_SIZE", 2)
+    rows = "".join(f"Aluno {i},{i:011d}\n" for i in range(5))
+    result = _import(client, director_headers, "alunos.csv", ("nome,cpf\n" + rows).encode())
+
+    assert result["created"] == 5
+    assert threads and all("AnyIO worker thread" in name for name in threads), threads
@@ -0,0 +1,52 @@
+import asyncio
+from datetime import date
+from sqlalchemy import select
+from app.core.database import AsyncSessionLocal
+from app.core.summaries import refresh_enrollment_summaries, summary_source_query
+from app.models import Assessment, Attendance, EnrollmentSummary, Lesson
+from conftest import postgres_only
+
+
+@postgres_only
+def test_concurrent_writes_on_same_pair_keep_both_counts(db, run_async, make_class):
+    class_ = make_class(students=1)
+    student_id = class_.enrollments[0].student_id
+    lesson = Lesson(class_id=class_.id, date=date.today())
+    db.add(lesson)
+    db.commit()
+    pair = (student_id, class_.id)
+
+    async def interleave():
+        attendance_written = asyncio.Event()
+
+        async def write_assessment():
+            await attendance_written.wait()
+            async with AsyncSessionLocal() as session:
+                session.add(Assessment(
+                    lesson_id=lesson.id, student_id=student_id, type="Prova", grade=8,
+                    assessment_date=lesson.date,
+                ))
+                # Espera a transação da chamada terminar; sem o lock agregaria sem a presença
+                await refresh_enrollment_summaries(session, [pair])
+                await session.commit()
+
+        async with AsyncSessionLocal() as session:
+            assessment_task = asyncio.create_task(write_assessment())
+            session.add(Attendance(lesson_id=lesson.id, student_id=student_id, status="present"))
+            await refresh_enrollment_summaries(session, [pair])
+            attendance_written.set()
+            await asyncio.sleep(0.2)
+            await session.commit()
+        await assessment_task
+
+        async with AsyncSessionLocal() as session:
+            summary = await session.scalar(select(EnrollmentSummary).where(
+                EnrollmentSummary.student_id == student_id, EnrollmentSummary.class_id == class_.id,
+            ))
+            expected = (await session.execute(summary_source_query([pair]))).one()
+            return summary, expected
+
+    summary, expected = run_async(interleave)
+    assert (summary.present_count, summary.assessments_count) == (1, 1)
+    assert summary.weighted_grade_sum == expected.weighted_grade_sum
+    assert summary.last_lesson_date == expected.last_lesson_date
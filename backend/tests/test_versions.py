@@ -0,0 +1,38 @@
+from sqlalchemy import select
+from app.models import Class, TableVersion
+from conftest import API
+
+
+def _version(db, name: str) -> int:
+    db.expire_all()
+    return db.scalar(select(TableVersion.version).where(TableVersion.name == name)) or 0
+
+
+def test_etag_changes_after_write(client, make_class, director_headers):
+    make_class()
+    first = client.get(f"{API}/classes/", headers=director_headers)
+    etag = first.headers["etag"]
+
+    unchanged = client.get(f"{API}/classes/", headers={**director_headers, "If-None-Match": etag})
+    assert unchanged.status_code == 304
+
+    created = client.post(f"{API}/classes/", headers=director_headers, json={"name": "Nova turma"})
+    assert created.status_code == 201, created.text
+
+    changed = client.get(f"{API}/classes/", headers={**director_headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert len(changed.json()) == 2
+
+
+def test_version_bumped_after_commit_only(db):
+    before = _version(db, "classes")
+
+    db.add(Class(name="Descartada"))
+    db.flush()
+    db.rollback()
+    assert _version(db, "classes") == before
+
+    db.add(Class(name="Gravada"))
+    db.commit()
+    assert _version(db, "classes") == before + 1
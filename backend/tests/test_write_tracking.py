@@ -0,0 +1,42 @@
+import pytest
+from sqlalchemy import update
+from app.core import write_tracking
+from app.models import Class, Student
+from conftest import API
+
+
+@pytest.fixture
+def committed():
+    calls = []
+    listener = write_tracking.on_tables_committed(lambda session, tables: calls.append(set(tables)))
+    yield calls
+    write_tracking._commit_listeners.remove(listener)
+
+
+def test_commit_notifies_written_tables(db, committed):
+    db.add(Class(name="Turma"))
+    db.flush()
+    db.execute(update(Student).values(phone="1"))
+    db.commit()
+
+    assert committed == [{"classes", "students"}]
+
+
+def test_rollback_discards_written_tables(db, committed):
+    db.add(Class(name="Turma"))
+    db.flush()
+    db.rollback()
+    db.commit()
+
+    assert committed == []
+
+
+def test_dashboard_stats_invalidated_on_commit(client, director_headers):
+    stats = client.get(f"{API}/admin/dashboard/stats", headers=director_headers).json()
+    assert stats["total_students"] == 0
+
+    created = client.post(f"{API}/students/", headers=director_headers, json={"name": "Novo", "cpf": "12345678901"})
+    assert created.status_code == 201, created.text
+
+    stats = client.get(f"{API}/admin/dashboard/stats", headers=director_headers).json()
+    assert stats["total_students"] == 1